@@ -0,0 +1,180 @@
+# This file contains a synthetic log generator for HobbyStats
+# It writes mileage, date and trip count logs in the same formats as the sample
+# logs, at any scale, so ingest and stats can be benchmarked on realistic sizes
+#
+# The output only depends on the seed and options, so two runs with the same
+# settings write byte-identical logs
+#
+# Author: Josh McIntyre
+#
+import argparse
+import os
+
+import numpy as np
+
+# Rows generated and written at a time, so memory stays flat at any scale
+CHUNK_ROWS = 1000000
+
+# Log types, assigned to hobbies round-robin
+LOG_TYPES = [ "mileage", "date", "tripcount" ]
+
+# Headers for each log type, matching the sample logs
+HEADERS = {
+            "mileage" : "Date,Location,Distance (mi)",
+            "date" : "Date,Location,Notes",
+            "tripcount" : "Years,Location,Trips,Equipment Type",
+          }
+
+LOCATIONS = [ "Local Trails", "State Park", "Backyard", "Local Resort", "Vacation", "Gym" ]
+
+# First day of generated history, and how many days it covers
+START_DAY = int(np.datetime64("2000-01-01", "D").astype("int64"))
+SPAN_DAYS = 25 * 365
+
+# This class defines the generator
+class LogGenerator:
+
+    # Initialize the generator
+    # rows is the total number of rows across every log, split evenly between hobbies
+    # dirty is the fraction of rows written with a bad date or value
+    # quoted is the fraction of rows with a quoted free text field containing a comma
+    def __init__(self, rows, hobbies=6, dirty=0.001, quoted=0.0, seed=1):
+
+        self.rows = rows
+        self.hobbies = hobbies
+        self.dirty = dirty
+        self.quoted = quoted
+        self.seed = seed
+
+    # Name and log type of each generated hobby
+    def hobby_logs(self):
+        return [ ( "synthetic_{}_{:03d}.csv".format(LOG_TYPES[i % len(LOG_TYPES)], i), LOG_TYPES[i % len(LOG_TYPES)] ) for i in range(self.hobbies) ]
+
+    # Write every log into a directory
+    # Returns the list of log paths written
+    def write_logs(self, outdir):
+
+        os.makedirs(outdir, exist_ok=True)
+        paths = []
+        for i, ( name, logtype ) in enumerate(self.hobby_logs()):
+            rows = self.rows // self.hobbies + (1 if i < self.rows % self.hobbies else 0)
+            path = os.path.join(outdir, name)
+            self.write_log(path, logtype, rows, np.random.default_rng([ self.seed, i ]))
+            paths.append(path)
+
+        return paths
+
+    # Write one log, a chunk of rows at a time
+    # Dates increase through the log like a real activity log, spread over the span
+    def write_log(self, path, logtype, rows, rng):
+
+        with open(path, "w", newline="") as f:
+            f.write(HEADERS[logtype] + "\n")
+            for start in range(0, rows, CHUNK_ROWS):
+                n = min(CHUNK_ROWS, rows - start)
+                first = START_DAY + SPAN_DAYS * start // max(rows, 1)
+                last = START_DAY + SPAN_DAYS * (start + n) // max(rows, 1)
+                days = np.sort(rng.integers(first, max(last, first + 1), size=n))
+
+                if logtype == "mileage":
+                    lines = self.mileage_rows(days, rng)
+                elif logtype == "date":
+                    lines = self.date_rows(days, rng)
+                else:
+                    lines = self.trip_rows(days, rng)
+
+                f.write("\n".join(lines))
+                f.write("\n")
+
+    # Rows for a mileage log
+    def mileage_rows(self, days, rng):
+
+        dates = self.date_strings(days)
+        miles = np.round(rng.gamma(2.0, 3.0, size=days.size), 2)
+        locations = self.locations(days.size, rng)
+
+        dirty = rng.random(days.size) < self.dirty
+        bad_date = dirty & (rng.random(days.size) < 0.5)
+        lines = [ "{},{},{}".format(d, l, m) for d, l, m in zip(dates, locations, miles.tolist()) ]
+        for i in np.flatnonzero(dirty):
+            lines[i] = "not a date,{},{}".format(locations[i], miles[i]) if bad_date[i] else "{},{},n/a".format(dates[i], locations[i])
+
+        return lines
+
+    # Rows for a date log
+    def date_rows(self, days, rng):
+
+        dates = self.date_strings(days)
+        locations = self.locations(days.size, rng)
+        notes = self.notes(days.size, rng)
+
+        lines = [ "{},{},{}".format(d, l, n) for d, l, n in zip(dates, locations, notes) ]
+        for i in np.flatnonzero(rng.random(days.size) < self.dirty):
+            lines[i] = "??,{},{}".format(locations[i], notes[i])
+
+        return lines
+
+    # Rows for a trip count log
+    # Most rows are a single year, with some winter seasons and year ranges
+    def trip_rows(self, days, rng):
+
+        years = (days.astype("datetime64[D]").astype("datetime64[Y]").astype("int64") + 1970).tolist()
+        trips = rng.integers(0, 40, size=days.size).tolist()
+        kinds = rng.random(days.size)
+        locations = self.locations(days.size, rng)
+        notes = self.notes(days.size, rng)
+
+        lines = []
+        for y, t, k, l, n in zip(years, trips, kinds.tolist(), locations, notes):
+            if k < self.dirty:
+                t = "many"
+            if k < 0.1:
+                y = "{}/{}".format(y - 1, y)
+            elif k < 0.15:
+                y = "{}-{}".format(y - 4, y)
+            lines.append("{},{},{},{}".format(y, l, t, n))
+
+        return lines
+
+    # Format day ordinals the way the sample logs write dates, ex: 6/1/2019
+    def date_strings(self, days):
+
+        dt = days.astype("datetime64[D]")
+        years = dt.astype("datetime64[Y]")
+        months = dt.astype("datetime64[M]")
+        y = (years.astype("int64") + 1970).tolist()
+        m = (months.astype("int64") % 12 + 1).tolist()
+        d = ((dt - months).astype("int64") + 1).tolist()
+
+        return [ "{}/{}/{}".format(*ymd) for ymd in zip(m, d, y) ]
+
+    # Random locations from a fixed list
+    def locations(self, n, rng):
+        return [ LOCATIONS[i] for i in rng.integers(0, len(LOCATIONS), size=n).tolist() ]
+
+    # Free text notes, some quoted with a comma inside
+    def notes(self, n, rng):
+
+        ids = rng.integers(0, 1000, size=n).tolist()
+        quoted = (rng.random(n) < self.quoted).tolist()
+        return [ "\"Note {}, continued\"".format(i) if q else "Note {}".format(i) for i, q in zip(ids, quoted) ]
+
+# Generate logs from the command line
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("outdir", help="The directory to write logs into")
+    parser.add_argument("--rows", type=int, default=100000, help="Total rows across every log")
+    parser.add_argument("--hobbies", type=int, default=6, help="Number of hobby logs, split between log types")
+    parser.add_argument("--dirty", type=float, default=0.001, help="Fraction of rows with bad data")
+    parser.add_argument("--quoted", type=float, default=0.0, help="Fraction of rows with a quoted free text field")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed")
+    args = parser.parse_args()
+
+    gen = LogGenerator(args.rows, hobbies=args.hobbies, dirty=args.dirty, quoted=args.quoted, seed=args.seed)
+    for path in gen.write_logs(args.outdir):
+        print(path)
+
+if __name__ == "__main__":
+
+    main()
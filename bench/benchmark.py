@@ -0,0 +1,269 @@
+# This file contains the HobbyStats benchmark suite
+# It generates synthetic logs, times ingest and every registered stat, and
+# records throughput and peak memory so runs can be compared over time
+#
+# Ex:
+#   python bench/benchmark.py --rows 1000000 --output baseline.json
+#   python bench/benchmark.py --rows 1000000 --baseline baseline.json --max-slowdown 10
+#
+# Author: Josh McIntyre
+#
+import argparse
+import builtins
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ os.path.join(ROOT, "src", "core"), os.path.join(ROOT, "src", "ui") ]
+
+import numpy as np
+
+from LogGenerator import LogGenerator
+from LogReader import LogReader
+from LogCache import LogCache
+from Timeline import Timeline
+from TripStats import TripStats
+from MileageStats import MileageStats
+from DateStats import DateStats
+from StatRegistry import STATS
+from ArrayBackend import use_backend, get_backend
+
+# Results format version, bumped if the layout changes
+FORMAT_VERSION = 1
+
+# Timings shorter than this are too noisy to flag as regressions, in seconds
+MIN_SECONDS = 0.001
+
+# Time a function, best of several runs
+# Returns the best time in seconds and the last result
+def best_time(func, repeat, setup=None):
+
+    best = None
+    result = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, result
+
+# Peak bytes allocated by a function in this process
+# Allocations in worker processes aren't seen here, see max_rss for those
+def peak_alloc(func, setup=None):
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# Count how many times each of a set of paths is opened while a function runs
+# Only opens in this process are seen, so run it with a single worker
+def count_opens(func, paths):
+
+    counts = dict.fromkeys(paths, 0)
+    real_open = builtins.open
+
+    def counting_open(file, *args, **kwargs):
+        if file in counts:
+            counts[file] += 1
+        return real_open(file, *args, **kwargs)
+
+    builtins.open = counting_open
+    try:
+        func()
+    finally:
+        builtins.open = real_open
+
+    return counts
+
+# Peak resident memory of this process and its finished children, in bytes
+def max_rss():
+
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+# This class defines the benchmark suite over one log directory
+class Benchmark:
+
+    # Initialize with the log directory to benchmark and run options
+    def __init__(self, logdir, repeat=3, workers=None, memory=True):
+
+        self.logdir = logdir
+        self.repeat = repeat
+        self.workers = workers
+        self.memory = memory
+        self.results = {}
+
+        self.files = [ os.path.join(logdir, f) for f in sorted(os.listdir(logdir)) if os.path.isfile(os.path.join(logdir, f)) ]
+        self.bytes = sum( os.path.getsize(f) for f in self.files )
+        self.rows = sum( self.count_rows(f) for f in self.files )
+
+    # Data rows in a log, not counting the header
+    def count_rows(self, logfile):
+
+        with open(logfile, "rb") as f:
+            return max(sum( chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"") ) - 1, 0)
+
+    # Record one benchmark
+    # rows and nbytes are the work done, used for throughput
+    def record(self, name, func, rows=None, nbytes=None, setup=None):
+
+        seconds, result = best_time(func, self.repeat, setup)
+        entry = { "seconds" : seconds }
+        if rows:
+            entry["rows_per_s"] = rows / seconds if seconds else None
+        if nbytes:
+            entry["mb_per_s"] = nbytes / seconds / 1e6 if seconds else None
+        if self.memory:
+            entry["peak_alloc_bytes"] = peak_alloc(func, setup)
+
+        self.results[name] = entry
+        print("{:<48} {:>10.4f}s".format(name, seconds), file=sys.stderr)
+        return result
+
+    # Run every benchmark
+    def run(self):
+
+        lr = LogReader(self.logdir, workers=self.workers)
+        self.record("detect_type", lambda: [ lr.detect_type(f) for f in self.files ])
+        self.record("get_logs", lr.get_logs)
+        data = self.record("read_logs", lr.read_logs, rows=self.rows, nbytes=self.bytes)
+
+        # Cached reads, with the cache written once up front
+        with tempfile.TemporaryDirectory() as cachedir:
+            cold = count_opens(lambda: LogReader(self.logdir, cache=LogCache(cachedir), workers=1).read_logs(), self.files)
+            cached = LogReader(self.logdir, cache=LogCache(cachedir), workers=self.workers)
+            self.record("read_logs_cached", cached.read_logs, rows=self.rows, nbytes=self.bytes)
+            warm = count_opens(lambda: LogReader(self.logdir, cache=LogCache(cachedir), workers=1).read_logs(), self.files)
+
+        # Opens of each log during a whole load, from listing to cache store
+        self.results["read_logs"]["opens_per_log"] = sum(cold.values()) / max(len(self.files), 1)
+        self.results["read_logs_cached"]["opens_per_log"] = sum(warm.values()) / max(len(self.files), 1)
+        print("{:<48} {:>10.2f} cold, {:.2f} cached".format("opens per log", self.results["read_logs"]["opens_per_log"], self.results["read_logs_cached"]["opens_per_log"]), file=sys.stderr)
+
+        timeline = self.record("timeline", lambda: Timeline(data))
+        entries = int(timeline.dates.size)
+        processors = {
+                        "trip" : TripStats(data, timeline=timeline),
+                        "mileage" : MileageStats(data, timeline=timeline),
+                        "date" : DateStats(data, timeline=timeline),
+                     }
+
+        # Each stat is timed cold - the memo, and the calendar and date subsets
+        # the timeline builds on first use, are cleared before every run
+        def clear():
+            timeline.memo.invalidate()
+            timeline.subsets = {}
+            timeline.dates_calendar = None
+
+        for stat_type in STATS:
+            for i, stat_proc in enumerate(processors[stat_type].funcs):
+                name = "stat.{}.{}.{}".format(stat_type, i, STATS[stat_type][i][1])
+                self.record(name, stat_proc[1], rows=entries, setup=clear)
+
+        return self.results
+
+    # Everything needed to compare runs
+    def report(self, meta=None):
+
+        return {
+                    "version" : FORMAT_VERSION,
+                    "meta" : dict(meta or {}, **{
+                                "files" : len(self.files),
+                                "rows" : self.rows,
+                                "bytes" : self.bytes,
+                                "repeat" : self.repeat,
+                                "max_rss_bytes" : max_rss(),
+                                "python" : platform.python_version(),
+                                "numpy" : np.__version__,
+                                "machine" : platform.machine(),
+                                "cpus" : os.cpu_count(),
+                                "backend" : get_backend().name,
+                            }),
+                    "results" : self.results,
+               }
+
+# Compare results against a baseline
+# Returns a list of ( name, baseline seconds, seconds ) for benchmarks that got
+# more than max_slowdown percent slower
+def compare(results, baseline, max_slowdown, min_seconds=MIN_SECONDS):
+
+    regressions = []
+    for name, entry in results.items():
+        base = baseline.get(name)
+        if base is None or max(base["seconds"], entry["seconds"]) < min_seconds:
+            continue
+        if entry["seconds"] > base["seconds"] * (1 + max_slowdown / 100):
+            regressions.append( ( name, base["seconds"], entry["seconds"] ) )
+
+    return regressions
+
+# Run the benchmarks from the command line
+def main():
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logdir", help="Benchmark an existing log directory instead of generating one")
+    parser.add_argument("--rows", type=int, default=100000, help="Total rows to generate")
+    parser.add_argument("--hobbies", type=int, default=6, help="Number of hobby logs to generate")
+    parser.add_argument("--dirty", type=float, default=0.001, help="Fraction of generated rows with bad data")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for generated logs")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark, the best is kept")
+    parser.add_argument("--workers", type=int, help="Worker processes for log parsing")
+    parser.add_argument("--backend", help="Array backend for the stat reductions, see ArrayBackend")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak allocation pass")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved in this JSON file")
+    parser.add_argument("--max-slowdown", type=float, default=10.0, help="Percent slower than the baseline that fails the run")
+    args = parser.parse_args()
+    if args.backend:
+        use_backend(args.backend)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        meta = {}
+        logdir = args.logdir
+        if logdir is None:
+            logdir = os.path.join(tmp, "logs")
+            LogGenerator(args.rows, hobbies=args.hobbies, dirty=args.dirty, seed=args.seed).write_logs(logdir)
+            meta = { "generated" : { "rows" : args.rows, "hobbies" : args.hobbies, "dirty" : args.dirty, "seed" : args.seed } }
+
+        bench = Benchmark(logdir, repeat=args.repeat, workers=args.workers, memory=not args.no_memory)
+        bench.run()
+        report = bench.report(meta)
+
+    doc = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(doc + "\n")
+    else:
+        print(doc)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("rows") != report["meta"]["rows"]:
+            print("Warning: baseline was run on {} rows, this run on {}".format(baseline.get("meta", {}).get("rows"), report["meta"]["rows"]), file=sys.stderr)
+
+        regressions = compare(report["results"], baseline["results"], args.max_slowdown)
+        for name, base, now in regressions:
+            print("Regression: {} {:.4f}s -> {:.4f}s ({:+.1f}%)".format(name, base, now, (now / base - 1) * 100), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+
+    main()
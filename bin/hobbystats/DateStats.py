@@ -0,0 +1,80 @@
+# This code defines classes for calculating overall date/trip statistics for multiple hobbies
+# This will take data pulled from logs by the log reader and process it
+#
+# Author: Josh McIntyre
+#
+from npimporter import np
+from Timeline import Timeline
+from StatMemo import memoized
+from StatRegistry import bind_funcs
+import math
+import datetime
+
+# Time delta defs for doing raw unix timestamp operations
+SECONDS_IN_DAY = 86400
+
+# Hobby types with real dates, rather than years of trip counts
+DATED_TYPES = [ "date", "mileage" ]
+
+# This class defines processing methods for date statistics
+class DateStats:
+
+    # Load the data on initialization
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, all_data, timeline=None):
+
+        self.load_data(all_data, timeline)
+
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("date", self)
+
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, all_data, timeline=None):
+
+        # Get the date data
+        self.timeline = timeline if timeline is not None else Timeline(all_data)
+        self.memo = self.timeline.memo
+        self.date_data = { hobby : self.timeline.hobby_dates(hobby) for hobby in self.timeline.hobbies_of(DATED_TYPES) }
+
+    # Define individual methods for processing each desired statistic
+
+    # Multi-activity days
+    @memoized
+    def multi_activity_days(self):
+
+        # Format data - every dated datestamp, already sorted in the index
+        all_data = self.timeline.sorted_dates_of(DATED_TYPES)
+
+        # Find multi-activity days - count each run of equal datestamps
+        run_starts = np.flatnonzero(np.diff(all_data, prepend=-1, append=-1))
+        counts = np.diff(run_starts)
+        multi_days = int(np.count_nonzero((counts > 1) & (counts < 4)))
+
+        ret = { "multi trip days" : multi_days }
+        return ret
+
+    # Average day between trips
+    @memoized
+    def average_days_between(self):
+
+        ret = {}
+        for sport, data in self.date_data.items():
+            # Each hobby's dates are already sorted in the index
+            diffs = np.diff(data)
+            avg = np.average(diffs)
+            ret[sport] = math.floor(avg / SECONDS_IN_DAY)
+
+        return ret
+        
+    # Max days between trips
+    @memoized
+    def max_days_between(self):
+
+        ret = {}
+        for sport, data in self.date_data.items():
+            diffs = np.diff(data)
+            max = np.max(diffs)
+            ret[sport] = math.floor(max / SECONDS_IN_DAY)
+
+        return ret
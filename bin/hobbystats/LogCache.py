@@ -0,0 +1,296 @@
+# This file defines an on-disk cache of parsed hobby logs
+# Each log's arrays are stored as raw binary columns that can be memory mapped
+# straight back in, so unchanged logs never need to be parsed again
+#
+# Author: Josh McIntyre
+#
+import hashlib
+import json
+import mmap
+import os
+from npimporter import np
+
+# Default cache directory name, created inside the log directory
+CACHE_DIR_NAME = ".hobbystats_cache"
+MANIFEST_NAME = "manifest.json"
+
+# Columns we know how to store, with the dtype each is saved as
+COLUMN_DTYPES = { "dates" : "uint32", "mileage" : "float32", "weights" : "uint32" }
+
+# Layout of the parsed data, bumped whenever the parser output changes
+# Entries stored under another format are treated as misses and re-parsed
+# 2 - trip count logs store one weighted date per season
+FORMAT = 2
+
+# Block size for hashing log contents
+HASH_BLOCK_SIZE = 1 << 20
+
+# Bytes just before the stored offset that must be unchanged for an append
+TAIL_WINDOW = 4096
+
+# This class defines a columnar cache for parsed logs
+#
+# The manifest maps each log path to its fingerprint and stored columns
+# Ex:
+# {
+#   "/home/me/logs/trail_mtb.csv" : {
+#                                      "size" : 1024,
+#                                      "mtime_ns" : 1700000000000000000,
+#                                      "hash" : "ab12...",
+#                                      "type" : "mileage",
+#                                      "format" : 2,
+#                                      "hobby" : "Trail Mtb",
+#                                      "columns" : { "dates" : 42, "mileage" : 42 },
+#                                      "offset" : 1024,
+#                                      "header" : "Date,Location,Distance (mi)",
+#                                      "tail_hash" : "cd34..."
+#                                   }
+# }
+#
+# Column data lives next to it as <key>.<column>.bin in native byte order
+#
+# The offset, header and tail hash support append-only logs. The offset is how
+# far the cached arrays cover, and is only set when the log ended on a complete
+# row. The tail hash covers the bytes just before it, so a rewrite of the end of
+# the log is caught without rereading the whole history
+class LogCache:
+
+    # Initialize the cache with the directory it lives in
+    def __init__(self, cachedir):
+
+        self.cachedir = cachedir
+        self.manifest_path = os.path.join(cachedir, MANIFEST_NAME)
+        self.manifest = self.load_manifest()
+        self.dirty = False
+
+    # Build a cache for a log directory, using the default location inside it
+    @classmethod
+    def for_logdir(cls, logdir):
+        return cls(os.path.join(logdir, CACHE_DIR_NAME))
+
+    # Load the manifest, starting fresh if it's missing or unreadable
+    def load_manifest(self):
+
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    # Write the manifest back out if anything changed
+    # Write to a temp file and swap it in so a crash never leaves a torn manifest
+    def save(self):
+
+        if not self.dirty:
+            return
+
+        os.makedirs(self.cachedir, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+        self.dirty = False
+
+    # Look up a log in the cache
+    # Returns the data entry with memory mapped columns, or None on a miss
+    #
+    # Size and mtime are checked first since they're free. If only the mtime
+    # moved, the content hash decides whether the log really changed
+    # Pass the log's stat result if it's already known, ex: from a directory scan
+    def lookup(self, logfile, st=None):
+
+        entry = self.manifest.get(self.cache_key(logfile))
+        if entry is None or entry.get("format") != FORMAT:
+            return None
+
+        try:
+            st = st or os.stat(logfile)
+        except OSError:
+            return None
+
+        if st.st_size != entry["size"]:
+            return None
+        if st.st_mtime_ns != entry["mtime_ns"]:
+            if entry["hash"] is None or self.content_hash(logfile) != entry["hash"]:
+                return None
+            entry["mtime_ns"] = st.st_mtime_ns
+            self.dirty = True
+
+        try:
+            return self.load_columns(logfile, entry)
+        except (OSError, ValueError):
+            return None
+
+    # The cached type of a log, if its size and mtime haven't changed
+    # This never opens the log, so unchanged logs can skip type detection
+    def cached_type(self, logfile, st):
+
+        entry = self.manifest.get(self.cache_key(logfile))
+        if entry is None or entry.get("format") != FORMAT:
+            return None
+        if st.st_size != entry["size"] or st.st_mtime_ns != entry["mtime_ns"]:
+            return None
+
+        return entry["type"]
+
+    # Store freshly parsed data for a log, replacing anything cached before
+    # Pass a fingerprint made from the log's contents while it was being
+    # parsed to save reading it again, and the date format it was parsed with
+    def store(self, logfile, hobby, data_entry, fingerprint=None, date_format=None):
+
+        os.makedirs(self.cachedir, exist_ok=True)
+
+        columns = {}
+        for column, dtype in COLUMN_DTYPES.items():
+            if column not in data_entry:
+                continue
+            values = np.ascontiguousarray(data_entry[column], dtype=dtype)
+            with open(self.column_path(logfile, column), "wb") as f:
+                f.write(values.tobytes())
+            columns[column] = int(values.size)
+
+        if fingerprint is None:
+            with open(logfile, "rb") as f:
+                st = os.fstat(f.fileno())
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+            fingerprint = self.fingerprint(data, st)
+            if st.st_size:
+                data.close()
+
+        entry = {
+                    "type" : data_entry["type"],
+                    "format" : FORMAT,
+                    "hobby" : hobby,
+                    "columns" : columns,
+                    "date_format" : date_format,
+                }
+        entry.update(fingerprint)
+        self.manifest[self.cache_key(logfile)] = entry
+        self.dirty = True
+
+    # Check whether a log has only had rows appended since it was cached
+    # Returns the ( offset, header, date format, type ) to resume parsing from,
+    # or None if the log shrank, was rewritten, or was never cached at a row boundary
+    # A type of None accepts the cached type - the header must be unchanged anyway
+    def append_state(self, logfile, logtype=None):
+
+        entry = self.manifest.get(self.cache_key(logfile))
+        if entry is None or entry.get("format") != FORMAT or entry.get("offset") is None:
+            return None
+        if logtype is not None and entry["type"] != logtype:
+            return None
+
+        try:
+            size = os.stat(logfile).st_size
+        except OSError:
+            return None
+
+        if size < entry["offset"]:
+            return None
+
+        current = self.append_fingerprint(logfile, entry["offset"])
+        if current["header"] != entry["header"] or current["tail_hash"] != entry["tail_hash"]:
+            return None
+
+        return entry["offset"], entry["header"], entry.get("date_format"), entry["type"]
+
+    # Append newly parsed rows onto a cached log's columns
+    # The offset is where the newly parsed data ended in the log
+    # Only the new rows are written; the full arrays are then mapped back in
+    # The full content hash is dropped rather than recomputed over the whole
+    # log, so a later touch without a size change is treated as a miss
+    # Pass the bytes just before the offset, if already read, to save reading them again
+    def append(self, logfile, data_entry, offset, tail=None):
+
+        entry = self.manifest[self.cache_key(logfile)]
+        st = os.stat(logfile)
+
+        for column, count in entry["columns"].items():
+            values = np.ascontiguousarray(data_entry[column], dtype=COLUMN_DTYPES[column])
+            with open(self.column_path(logfile, column), "ab") as f:
+                f.write(values.tobytes())
+            entry["columns"][column] = count + int(values.size)
+
+        entry["size"] = offset
+        entry["mtime_ns"] = st.st_mtime_ns
+        entry["hash"] = None
+        if tail is None:
+            entry.update(self.append_fingerprint(logfile, offset))
+        else:
+            entry.update(self.tail_fingerprint(entry["header"].encode(), tail[-TAIL_WINDOW:], offset))
+        self.dirty = True
+
+        return self.load_columns(logfile, entry)
+
+    # Fingerprint a log from its contents and stat result
+    # data is the whole log, as bytes or a memory map
+    def fingerprint(self, data, st):
+
+        header = data[:data.find(b"\n") + 1 or len(data)]
+        tail = data[max(len(data) - TAIL_WINDOW, 0):len(data)]
+
+        fingerprint = {
+                        "size" : st.st_size,
+                        "mtime_ns" : st.st_mtime_ns,
+                        "hash" : hashlib.blake2b(data).hexdigest(),
+                      }
+        fingerprint.update(self.tail_fingerprint(header, tail, len(data)))
+        return fingerprint
+
+    # Fingerprint the parts of a log that must not change for appends to be safe
+    # The offset is only recorded when the data up to it ends on a full row
+    def append_fingerprint(self, logfile, offset):
+
+        with open(logfile, "rb") as f:
+            header = f.readline()
+            start = max(offset - TAIL_WINDOW, 0)
+            f.seek(start)
+            tail = f.read(offset - start)
+
+        return self.tail_fingerprint(header, tail, offset)
+
+    # Append fingerprint from the header line and the bytes just before the offset
+    def tail_fingerprint(self, header, tail, offset):
+
+        if not tail.endswith(b"\n"):
+            return { "offset" : None, "header" : None, "tail_hash" : None }
+
+        return {
+                    "offset" : offset,
+                    "header" : header.decode().rstrip("\r\n"),
+                    "tail_hash" : hashlib.blake2b(tail).hexdigest(),
+               }
+
+    # Memory map each stored column back into a read-only numpy array
+    def load_columns(self, logfile, entry):
+
+        data_entry = { "type" : entry["type"] }
+        for column, count in entry["columns"].items():
+            dtype = COLUMN_DTYPES[column]
+            if count == 0:
+                # mmap can't map an empty file
+                data_entry[column] = np.empty(0, dtype=dtype)
+            else:
+                data_entry[column] = np.memmap(self.column_path(logfile, column), dtype=dtype, mode="r", shape=(count,))
+
+        return data_entry
+
+    # Manifest key for a log - the absolute path
+    def cache_key(self, logfile):
+        return os.path.abspath(logfile)
+
+    # Path of the binary file holding one column of a log
+    def column_path(self, logfile, column):
+
+        digest = hashlib.blake2b(self.cache_key(logfile).encode(), digest_size=8).hexdigest()
+        return os.path.join(self.cachedir, "{}.{}.bin".format(digest, column))
+
+    # Hash the full contents of a log
+    def content_hash(self, logfile):
+
+        h = hashlib.blake2b()
+        with open(logfile, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                h.update(block)
+
+        return h.hexdigest()
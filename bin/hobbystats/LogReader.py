@@ -0,0 +1,215 @@
+# This file defines classes a class for reading hobby data from file and putting
+# it into a standard format format later processing
+#
+# Author: Josh McIntyre
+#
+import csv
+import io
+import os
+import datetime
+import logging
+from npimporter import np
+from LogParser import LogParser, LOG_TYPES
+from LogFinder import LogFinder
+from LogCache import TAIL_WINDOW
+from ParallelReader import ParallelReader
+from Profiler import PROFILER
+
+# Define a generic/high level log reader class
+# This class will pull in all the logs in a specified dir and pull out
+# dates/years for later processing
+class LogReader:
+
+    # Initialize the hobby reader with the log directory
+    # Optionally pass a LogCache to skip re-parsing logs that haven't changed
+    # With incremental set, logs that only grew since they were cached have just
+    # their new rows parsed and appended to the cached arrays
+    # Parsing runs on a pool of worker processes, one per core unless set
+    # recursive, include and exclude control which logs are found, see LogFinder
+    def __init__(self, logdir, cache=None, incremental=False, workers=None, recursive=False, include=None, exclude=None):
+
+        # Fetch log info for later processing
+        self.logdir = logdir
+        self.cache = cache
+        self.incremental = incremental
+        self.workers = workers
+        self.finder = LogFinder(logdir, recursive=recursive, include=include, exclude=exclude)
+        self.get_logs()
+
+    # Get all the logs from the specified directory
+    # Logs aren't opened here. A log's type is taken from the cache if it's
+    # unchanged, and is otherwise None until the log is opened to be parsed
+    def get_logs(self):
+
+        with PROFILER.span("list_dir"):
+            found = self.finder.find()
+
+        log_file_info = []
+        for f, st in found:
+            logtype = self.cache.cached_type(f, st) if self.cache is not None else None
+            log_file_info.append( ( f, logtype ) )
+
+        self.log_file_info = log_file_info
+        self.log_stats = dict(found)
+
+    # Read logs by processing each individually and loading the relevant
+    # data for each log in to a dictionary of numpy lists
+    # This will be a "standard format" the processor can read
+    #
+    # Ex:
+    # {
+    #   "trail_mtb" : {
+    #                    "dates" : [ timestamp, timestamp2, timestamp3 ],
+    #                    "mileage" : [ miles1, miles2, miles3 ],
+    #                    "type" : "mileage"
+    #                 }
+    #   "snowsports" : {
+    #                     "dates" : [ timestamp, timestamp2, timestamp3 ],
+    #                     "type" : "tripcount"
+    #                  }
+    # }
+    #
+    # Specific dates will be used as possible, but for trip counter
+    # only logs, we'll just use the year for every trip taken, like
+    # 3 trips = 3 2019 timestamps in the list
+    # We'll be using timestamps for this, and dateutil.parser uses today at midnight
+    # if only the year is included. This shouldn't effect most stats.
+    #
+    # If a cache is set, unchanged logs are memory mapped from it instead of
+    # being parsed, and anything parsed fresh is written back to it
+    # Pass a list of log paths to only read those logs
+    def read_logs(self, logfiles=None):
+
+        data = {}
+        to_parse = []
+        for logfile, logtype in self.log_file_info:
+                if logfiles is not None and logfile not in logfiles:
+                    continue
+                if self.cache is not None:
+                    with PROFILER.span("cache_lookup", file=logfile):
+                        cached = self.cache.lookup(logfile, self.log_stats.get(logfile))
+                    if cached is not None and logtype in ( None, cached["type"] ):
+                        data[self.pretty_hobby(logfile)] = cached
+                        continue
+
+                    if self.incremental and cached is None:
+                        with PROFILER.span("append_rows", file=logfile):
+                            appended = self.load_appended_rows(logfile, logtype)
+                        if appended is not None:
+                            data[self.pretty_hobby(logfile)] = appended
+                            continue
+
+                to_parse.append( ( logfile, logtype ) )
+
+        # Parse everything else across the worker pool
+        # Types are detected as each log is opened to be parsed
+        pr = ParallelReader(self.workers)
+        with PROFILER.span("parse_logs"):
+            parsed = pr.read(to_parse, fingerprint=self.cache.fingerprint if self.cache is not None else None)
+        for logfile, logtype in pr.types.items():
+            if logtype not in LOG_TYPES:
+                print(f"Error, invalid log type for logfile: {logfile}, {logtype}")
+        for logfile, entry in parsed.items():
+            data[self.pretty_hobby(logfile)] = entry
+
+        # Write freshly parsed logs back to the cache
+        if self.cache is not None:
+            with PROFILER.span("cache_store"):
+                for logfile in parsed:
+                    hobby = self.pretty_hobby(logfile)
+                    if hobby in data:
+                        self.cache.store(logfile, hobby, data[hobby], pr.fingerprints[logfile], pr.formats[logfile])
+                self.cache.save()
+
+        return data
+    
+    # Stream every mileage log into per-hobby accumulators
+    # This is the out-of-core path - logs are parsed in fixed-size chunks and
+    # only running summaries are kept, so memory stays flat however big they get
+    # Returns a dictionary of hobby to MileageAccumulator
+    def accumulate_mileage(self):
+
+        logs = [ ( logfile, logtype ) for logfile, logtype in self.log_file_info if logtype in ( "mileage", None ) ]
+        accs = ParallelReader(self.workers).accumulate(logs)
+
+        return { self.pretty_hobby(logfile) : acc for logfile, acc in accs.items() }
+
+    # Helper that loads mileage type logs
+    def load_mileage_log(self, logfile, logtype, data):
+
+        with open(logfile) as f:
+            entry = LogParser.for_log(logfile).parse_mileage_rows(csv.DictReader(f), logfile, logtype)
+
+        # Load the parsed data into the global data dictionary
+        data[self.pretty_hobby(logfile)] = entry
+
+    # Helper that loads date type logs
+    def load_date_log(self, logfile, logtype, data):
+
+        with open(logfile) as f:
+            entry = LogParser.for_log(logfile).parse_date_rows(csv.DictReader(f), logfile, logtype)
+
+        data[self.pretty_hobby(logfile)] = entry
+        return entry["dates"]
+
+    # Helper that loads trip counter type logs
+    def load_trip_log(self, logfile, logtype, data):
+
+        with open(logfile) as f:
+            entry = LogParser().parse_trip_rows(csv.DictReader(f), logfile, logtype)
+
+        data[self.pretty_hobby(logfile)] = entry
+
+    # Parse only the rows appended to a log since it was last cached
+    # The cache remembers the byte offset it read up to, the header line and the
+    # date format. The log is read once, from just before the offset so the
+    # cache can fingerprint the new tail without reading it again
+    # If the log was truncated or rewritten, or the new data ends mid-row, this
+    # returns None and the caller falls back to a full parse
+    def load_appended_rows(self, logfile, logtype=None):
+
+        state = self.cache.append_state(logfile, logtype)
+        if state is None:
+            return None
+
+        offset, header, date_format, logtype = state
+        start = max(offset - TAIL_WINDOW, 0)
+        with open(logfile, "rb") as f:
+            f.seek(start)
+            buf = f.read()
+        raw = buf[offset - start:]
+
+        if raw and not raw.endswith(b"\n"):
+            return None
+
+        fieldnames = next(csv.reader([ header ]))
+        dr = csv.DictReader(io.StringIO(raw.decode()), fieldnames=fieldnames)
+        parser = LogParser(date_format) if date_format is not None else LogParser.for_log(logfile)
+        entry = parser.parse_rows(dr, logfile, logtype)
+
+        return self.cache.append(logfile, entry, offset + len(raw), tail=buf)
+
+    # Determine the type of hobby log we're dealing with
+    # Reading logs detects types from the header as they're parsed, this is
+    # for checking a single log on its own
+    def detect_type(self, logfile):
+
+        with open(logfile) as f:
+            dr = csv.DictReader(f)
+            try:
+                fn = dr.fieldnames
+            except Exception as e:
+                print("Error determining type for log {}: ".format(logfile))
+                return "unknown"
+            return LogParser.type_of(fn)
+
+    # Pretty hobby name from the file path
+    def pretty_hobby(self, logfile):
+
+        strip_path = logfile.split("/")[-1]
+        strip_path = strip_path.split("\\")[-1]
+        strip_ext = strip_path.replace(".csv", "")
+        strip_under = strip_ext.replace("_", " ")
+        title = strip_under.title()
+
+        return title
@@ -0,0 +1,68 @@
+# This file defines a mergeable accumulator for per-hobby mileage statistics
+# Accumulators are fed chunks of a log at a time, so a log never has to be
+# held in memory as a whole, and partial results from separate chunks or
+# worker processes merge into the same totals
+#
+# Author: Josh McIntyre
+#
+import math
+
+# This class defines a running summary of one hobby's mileage
+class MileageAccumulator:
+
+    # Start out empty
+    def __init__(self):
+
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.first_date = None
+        self.last_date = None
+
+    # The mean mileage so far
+    @property
+    def mean(self):
+
+        if self.count == 0:
+            return math.nan
+        return self.total / self.count
+
+    # Fold a parsed chunk into the summary
+    # The chunk is a data entry like the log reader produces, with "dates"
+    # and "mileage" arrays of the same length
+    def update(self, entry):
+
+        mileage = entry["mileage"]
+        dates = entry["dates"]
+        if mileage.size == 0:
+            return
+
+        self.count += int(mileage.size)
+        self.total += float(mileage.sum(dtype="float64"))
+        self.min = min(self.min, float(mileage.min()))
+        self.max = max(self.max, float(mileage.max()))
+        self.merge_dates(int(dates.min()), int(dates.max()))
+
+    # Fold another accumulator into this one
+    # The order things are merged in doesn't matter
+    def merge(self, other):
+
+        if other.count == 0:
+            return self
+
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.merge_dates(other.first_date, other.last_date)
+
+        return self
+
+    # Widen the date range to cover the given first and last dates
+    def merge_dates(self, first_date, last_date):
+
+        if self.first_date is None or first_date < self.first_date:
+            self.first_date = first_date
+        if self.last_date is None or last_date > self.last_date:
+            self.last_date = last_date
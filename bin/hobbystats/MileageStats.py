@@ -0,0 +1,147 @@
+# This code defines classes for calculating mileage statistics for hobbies
+# This will take data pulled from logs by the log reader and process it
+#
+# Author: Josh McIntyre
+#
+from npimporter import np
+from Timeline import Timeline
+from StatMemo import memoized
+from StatRegistry import bind_funcs
+
+# Time delta defs for doing raw unix timestamp operations
+SECONDS_IN_YEAR = 31536000
+
+# This class defines processing methods for mileage statistics
+class MileageStats:
+
+    # Load the data on initialization
+    # In streaming mode, pass per-hobby MileageAccumulators from
+    # LogReader.accumulate_mileage instead, and stats are answered from those
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, date_data=None, accumulators=None, timeline=None):
+
+        self.load_data(date_data, accumulators, timeline)
+
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("mileage", self)
+
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, date_data=None, accumulators=None, timeline=None):
+
+        # Load the date data for the module
+        self.date_data = date_data if date_data is not None else {}
+        self.accumulators = accumulators
+        self.timeline = timeline if timeline is not None else Timeline(self.date_data)
+        self.memo = self.timeline.memo
+
+    # Define individual methods for processing each desired statistic
+
+    # Total mileage overall
+    @memoized
+    def total_mileage(self):
+
+        if self.accumulators is not None:
+            total_mileage = sum( acc.total for acc in self.accumulators.values() )
+            ret = { "total mileage" : round(total_mileage, 2) }
+            return ret
+
+        # Total mileage - just sum the mileage column of the index
+        total_mileage = self.timeline.mileage.sum()
+        float_mileage = float(total_mileage)
+        rounded_mileage = round(float_mileage, 2)
+
+        ret = { "total mileage" : rounded_mileage }
+        return ret
+
+    # Total years overall
+    @memoized
+    def total_years(self):
+
+        if self.accumulators is not None:
+            accs = [ acc for acc in self.accumulators.values() if acc.count > 0 ]
+            diff = max( acc.last_date for acc in accs ) - min( acc.first_date for acc in accs )
+            ret = { "total years" : int( diff / SECONDS_IN_YEAR ) }
+            return ret
+
+        # Format data - every mileage hobby's datestamps, as a view of the index
+        all_data_dates = self.timeline.mileage_dates()
+
+        # Total years - subtract the oldest from the latest datestamp
+        # Then, divide by seconds per year to get the total years logged
+        diff = all_data_dates.max() - all_data_dates.min()
+        years = int( diff / SECONDS_IN_YEAR )
+
+        ret = { "total years" : years }
+        return ret
+
+    # Total mileage for each hobby
+    def total_mileage_hobby(self):
+        return self.samm_mileage_hobby("sum")
+
+    # Average mileage for each hobby
+    def avg_mileage_hobby(self):
+        return self.samm_mileage_hobby("avg")
+
+    # Maximum mileage for each hobby
+    def max_mileage_hobby(self):
+        return self.samm_mileage_hobby("max")
+
+    # Minimum mileage for each hobby
+    def min_mileage_hobby(self):
+        return self.samm_mileage_hobby("min")
+
+    # We can use a generic method for dealing with SAMM (Sum, Avg, Min, Max) statistics
+    @memoized
+    def samm_mileage_hobby(self, desired_stat):
+
+        if self.accumulators is not None:
+            return self.samm_mileage_accumulated(desired_stat)
+
+        ret = {}
+        # Only mileage logs have a mileage column
+        for hobby in self.timeline.hobbies_of([ "mileage" ]):
+
+            mileage = self.timeline.hobby_mileage(hobby)
+            if desired_stat == "sum":
+                raw_stat = mileage.sum()
+            elif desired_stat == "avg":
+                raw_stat = np.mean(mileage)
+            elif desired_stat == "max":
+                raw_stat = mileage.max()
+            elif desired_stat == "min":
+                raw_stat = mileage.min()
+            else:
+                raise Exception("Invalid desired stat: should be sum, avg, max, min")
+
+            float_stat = float(raw_stat)
+            rounded_sum = round(float_stat, 2)
+
+            ret[hobby] = rounded_sum
+
+        return ret
+
+    # SAMM statistics answered from streaming accumulators
+    def samm_mileage_accumulated(self, desired_stat):
+
+        ret = {}
+        for hobby, acc in self.accumulators.items():
+
+            # Skip logs that had no usable rows
+            if acc.count == 0:
+                continue
+
+            if desired_stat == "sum":
+                raw_stat = acc.total
+            elif desired_stat == "avg":
+                raw_stat = acc.mean
+            elif desired_stat == "max":
+                raw_stat = acc.max
+            elif desired_stat == "min":
+                raw_stat = acc.min
+            else:
+                raise Exception("Invalid desired stat: should be sum, avg, max, min")
+
+            ret[hobby] = round(raw_stat, 2)
+
+        return ret
@@ -0,0 +1,251 @@
+# This file defines lightweight instrumentation for HobbyStats
+# Named spans are wrapped around each stage of loading and around each stat,
+# with per-file row and byte counts, so a slow run shows where the time went
+#
+# Profiling is off unless enabled, and a span is then a shared no-op object,
+# so leaving the spans in place costs one function call each
+#
+# Author: Josh McIntyre
+#
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+# This class is the span used while profiling is off
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+# This class defines one timed span
+# With memory tracking on, it also records the peak bytes allocated while it
+# was open, including the peaks of any spans nested inside it
+class Span:
+
+    def __init__(self, profiler, name, fields):
+
+        self.profiler = profiler
+        self.name = name
+        self.fields = fields
+        self.peak = 0
+
+    def __enter__(self):
+
+        stack = self.profiler.call_stack()
+        if self.profiler.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.base = current
+            self.peak = current
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+
+        end = time.perf_counter()
+        stack = self.profiler.call_stack()
+        stack.pop()
+
+        event = {
+                    "name" : self.name,
+                    "start" : self.start,
+                    "duration" : end - self.start,
+                    "depth" : len(stack),
+                    "pid" : os.getpid(),
+                    "tid" : threading.get_ident(),
+                    "fields" : self.fields,
+                }
+        if self.profiler.memory:
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            event["peak_alloc"] = self.peak - self.base
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, self.peak)
+
+        self.profiler.record(event)
+        return False
+
+# This class collects spans and counters for one run
+class Profiler:
+
+    # Start out disabled
+    def __init__(self):
+
+        self.enabled = False
+        self.memory = False
+        self.events = []
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    # Start collecting, optionally tracking peak allocations with tracemalloc
+    # Memory tracking slows everything down, so timings are best read without it
+    def enable(self, memory=False):
+
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    # Stop collecting, keeping what was collected
+    def disable(self):
+
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.enabled = False
+        self.memory = False
+
+    # Drop everything collected so far
+    def reset(self):
+
+        with self.lock:
+            self.events = []
+            self.counters = {}
+
+    # Open a named span, ex:
+    # with PROFILER.span("parse_dates", file=logfile):
+    #     ...
+    def span(self, name, **fields):
+
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, fields)
+
+    # Add to the counters for a key, ex: count(logfile, rows=100, bytes=4096)
+    def count(self, key, **values):
+
+        if not self.enabled:
+            return
+        with self.lock:
+            counters = self.counters.setdefault(key, {})
+            for name, value in values.items():
+                counters[name] = counters.get(name, 0) + value
+
+    # Wrap a function so each call is a span
+    # Whether profiling is on is checked per call, so functions can be wrapped
+    # before it's enabled
+    def wrap(self, name, func, **fields):
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            with self.span(name, **fields):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    # The spans open on this thread, innermost last
+    def call_stack(self):
+
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    # Store a finished span
+    def record(self, event):
+
+        with self.lock:
+            self.events.append(event)
+
+    # Everything collected, in a form that can be sent back from a worker process
+    def export(self):
+
+        with self.lock:
+            return { "events" : list(self.events), "counters" : dict(self.counters) }
+
+    # Fold in what a worker process collected
+    def merge(self, profile):
+
+        with self.lock:
+            self.events.extend(profile["events"])
+        for key, values in profile["counters"].items():
+            self.count(key, **values)
+
+    # Aggregate spans by name, in the order each name was first seen
+    # Returns a list of ( name, calls, total seconds, peak bytes or None )
+    def stages(self):
+
+        totals = {}
+        for event in sorted(self.events, key=lambda e: e["start"]):
+            calls, seconds, peak = totals.get(event["name"], ( 0, 0.0, None ))
+            if "peak_alloc" in event:
+                peak = max(peak or 0, event["peak_alloc"])
+            totals[event["name"]] = ( calls + 1, seconds + event["duration"], peak )
+
+        return [ ( name, ) + totals[name] for name in totals ]
+
+    # A readable summary of the stages and per-file counters
+    # Times for stages run in worker processes are summed across workers
+    def summary(self):
+
+        lines = [ "{:<36} {:>7} {:>11} {:>11} {:>12}".format("Stage", "Calls", "Total s", "Mean ms", "Peak alloc") ]
+        for name, calls, seconds, peak in self.stages():
+            peak = "-" if peak is None else format_bytes(peak)
+            lines.append("{:<36} {:>7} {:>11.4f} {:>11.3f} {:>12}".format(name, calls, seconds, seconds / calls * 1000, peak))
+
+        if self.counters:
+            lines.append("")
+            lines.append("{:<48} {:>12} {:>12}".format("Log", "Rows", "Bytes"))
+            for key in sorted(self.counters):
+                counters = self.counters[key]
+                lines.append("{:<48} {:>12} {:>12}".format(key, counters.get("rows", 0), format_bytes(counters.get("bytes", 0))))
+
+        return "\n".join(lines)
+
+    # A machine-readable trace in the Chrome trace event format
+    # Load it in chrome://tracing or Perfetto to see the stages on a timeline
+    def trace(self):
+
+        base = min(( e["start"] for e in self.events ), default=0.0)
+        events = []
+        for e in self.events:
+            args = dict(e["fields"])
+            if "peak_alloc" in e:
+                args["peak_alloc"] = e["peak_alloc"]
+            events.append({
+                            "name" : e["name"],
+                            "ph" : "X",
+                            "ts" : (e["start"] - base) * 1e6,
+                            "dur" : e["duration"] * 1e6,
+                            "pid" : e["pid"],
+                            "tid" : e["tid"],
+                            "args" : args,
+                          })
+
+        return { "traceEvents" : events, "counters" : self.counters }
+
+# Format a byte count for the summary
+def format_bytes(n):
+
+    for unit in [ "B", "KiB", "MiB" ]:
+        if abs(n) < 1024:
+            return "{:.1f} {}".format(n, unit) if unit != "B" else "{} B".format(n)
+        n /= 1024
+
+    return "{:.1f} GiB".format(n)
+
+# Run a task in a worker process with profiling on, and send back what it collected
+# Used by the process pools when the parent is profiling
+def profiled_call(func, memory, task):
+
+    PROFILER.reset()
+    PROFILER.enable(memory)
+    try:
+        result = func(task)
+    finally:
+        PROFILER.disable()
+
+    return result, PROFILER.export()
+
+# The profiler shared by the whole program
+PROFILER = Profiler()
@@ -0,0 +1,42 @@
+# This file defines the registry of available stats for each stat class
+# It's kept free of numpy and the stat classes themselves, so listing the
+# available stats doesn't have to load any of them
+#
+# Author: Josh McIntyre
+#
+from Profiler import PROFILER
+
+# Each stat is registered as ( format string, method name, title )
+# The order here is the stat index used on the command line
+STATS = {
+            "trip" : [
+                        ( "Overall {}: {}", "total_trips", "Overall trips" ),
+                        ( "Overall {}: {}", "total_years", "Overall years" ),
+                        ( "Total trips for hobby {}: {}", "total_trips_per_hobby", "Total trips for hobby" ),
+                        ( "Total trips in {}: {}", "total_trips_per_year", "Total trips in year" ),
+                        ( "Percentage active days per year {}: {}%", "pct_active_year", "Percentage active days per year" ),
+                        ( "Percentage of total trips for {}: {}%", "pct_hobby_total", "Percentage of total trips for activity" ),
+                        ( "Percentage of total trips in {}: {}%", "pct_year_total", "Percentage of total trips in year" ),
+                        ( "Total trips in {}: {}", "total_trips_per_month", "Total trips in month" ),
+                        ( "Total trips in {}: {}", "total_trips_per_week", "Total trips in week" ),
+                     ],
+            "mileage" : [
+                        ( "Overall {}: {}", "total_mileage", "Total overall mileage" ),
+                        ( "Overall {}: {}", "total_years", "Total overall years" ),
+                        ( "Total mileage for {}: {}", "total_mileage_hobby", "Total mileage for activity" ),
+                        ( "Average mileage for {}: {}", "avg_mileage_hobby", "Average mileage for activity" ),
+                        ( "Maximum mileage for {}: {}", "max_mileage_hobby", "Maximum mileage for activity" ),
+                        ( "Minimum mileage for {}: {}", "min_mileage_hobby", "Minimum mileage for activity" ),
+                     ],
+            "date" : [
+                        ( "Overall {} : {}", "multi_activity_days", "Overall multi-activity days" ),
+                        ( "Average days between trips for {}: {}", "average_days_between", "Average days between trips for activity" ),
+                        ( "Max days between trips for {}: {}", "max_days_between", "Maximum days between trips for activity" ),
+                     ],
+        }
+
+# Bind the registered stats of one type to a stat processor object
+# Returns the ( format string, method, title ) list the processors expose as funcs
+# Each method is wrapped in a profiling span named after the stat, ex: stat.trip.total_trips
+def bind_funcs(stat_type, processor):
+    return [ ( fmt, PROFILER.wrap("stat.{}.{}".format(stat_type, name), getattr(processor, name)), title ) for fmt, name, title in STATS[stat_type] ]
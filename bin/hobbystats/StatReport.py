@@ -0,0 +1,86 @@
+# This file contains code that evaluates many stats in one pass and builds a
+# machine-readable report of the results
+#
+# Author: Josh McIntyre
+#
+import json
+import numbers
+
+# The stat types, in report order
+STAT_TYPES = [ "trip", "mileage", "date" ]
+
+# This class builds a report over a set of stat processor classes
+# The processors should share one Timeline, so every stat in the report reuses
+# the same sorted dates, calendar buckets and memoized totals
+class StatReport:
+
+    # Initialize with a dictionary of stat type to stat processor, ex:
+    # { "trip" : TripStats(...), "mileage" : MileageStats(...), "date" : DateStats(...) }
+    def __init__(self, processors):
+
+        self.processors = processors
+
+    # Parse a selection string into ( stat type, index ) pairs
+    # Ex: "trip:0,trip:3,mileage" is trip stats 0 and 3, and every mileage stat
+    # An empty selection is every registered stat
+    def parse_selection(self, selection):
+
+        if not selection:
+            return [ ( t, i ) for t in STAT_TYPES for i in range(len(self.processors[t].funcs)) ]
+
+        chosen = []
+        for item in selection.split(","):
+            stat_type, _, index = item.strip().partition(":")
+            if stat_type not in self.processors:
+                raise ValueError("Invalid stat type in selection: {}".format(item))
+            if not index:
+                chosen.extend( ( stat_type, i ) for i in range(len(self.processors[stat_type].funcs)) )
+                continue
+            if not index.isdigit() or int(index) >= len(self.processors[stat_type].funcs):
+                raise ValueError("Invalid stat index in selection: {}".format(item))
+            chosen.append( ( stat_type, int(index) ) )
+
+        return chosen
+
+    # Evaluate the selected stats and build the report
+    # Ex:
+    # {
+    #   "trip" : [ { "index" : 0, "title" : "Overall trips", "result" : { "total trips" : 42 } } ],
+    #   "mileage" : [ ... ],
+    #   "date" : [ ... ]
+    # }
+    def build(self, selection=None):
+
+        report = { t : [] for t in STAT_TYPES if t in self.processors }
+        for stat_type, index in self.parse_selection(selection):
+            stat_proc = self.processors[stat_type].funcs[index]
+            report[stat_type].append({
+                                        "index" : index,
+                                        "title" : stat_proc[2],
+                                        "result" : to_jsonable(stat_proc[1]()),
+                                     })
+
+        return report
+
+    # Build the report as a JSON string
+    def dumps(self, selection=None):
+        return json.dumps(self.build(selection), indent=2)
+
+# Convert a stat result into plain JSON types
+# Stat results use numpy scalars and integer keys, which json can't write as is
+def to_jsonable(value):
+
+    if isinstance(value, dict):
+        return { str(k) : to_jsonable(v) for k, v in value.items() }
+    if isinstance(value, ( list, tuple )):
+        return [ to_jsonable(v) for v in value ]
+    if hasattr(value, "tolist"):
+        return to_jsonable(value.tolist())
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        return float(value)
+
+    return str(value)
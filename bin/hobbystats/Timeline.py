@@ -0,0 +1,172 @@
+# This file defines a shared timeline index over all loaded hobby data
+# It's built once after the logs are read, and every stat class reads from it
+# through views instead of collapsing and sorting the data again on each call
+#
+# Author: Josh McIntyre
+#
+from npimporter import np
+from Calendar import Calendar
+from StatMemo import StatMemo
+
+# Hobby types in the order they're laid out in the index
+# Grouping them this way makes the mileage hobbies, and the hobbies with real
+# dates (mileage and date logs), contiguous prefixes of the date column
+TYPE_ORDER = [ "mileage", "date", "tripcount" ]
+
+# This class defines the timeline index
+#
+# Ex, for a mileage hobby "Trail Mtb" and a trip count hobby "Snowsports":
+#   hobbies      = [ "Trail Mtb", "Snowsports" ]
+#   dates        = [ t1, t3, t7, | s1, s1, s2 ]     - each hobby's slice is sorted
+#   mileage      = [ m1, m3, m7 ]                   - lines up with the mileage prefix
+#   starts, ends = [ 0, 3 ], [ 3, 6 ]               - each hobby's slice of dates
+#   sorted_dates = [ s1, s1, s2, t1, t3, t7 ]      - every date, globally sorted
+#   sorted_ids   = [ 1, 1, 1, 0, 0, 0 ]             - which hobby each sorted date is from
+#
+# Trip count logs store one date per season with a weight, the number of trips
+# If any hobby has weights, weights lines up with dates and is 1 everywhere else
+# Otherwise it's None, and every date counts once
+class Timeline:
+
+    # Build the index from the log reader's data dictionary
+    def __init__(self, all_data):
+
+        self.hobbies = list(all_data.keys())
+        self.types = [ all_data[h]["type"] for h in self.hobbies ]
+        self.ids = { h : i for i, h in enumerate(self.hobbies) }
+
+        # Lay the hobbies out grouped by type, keeping their order within a type
+        layout = sorted(range(len(self.hobbies)), key=self.type_rank)
+
+        dates = []
+        mileage = []
+        weights = []
+        weighted = any( "weights" in all_data[h] for h in self.hobbies )
+        self.starts = np.zeros(len(self.hobbies), dtype="int64")
+        self.ends = np.zeros(len(self.hobbies), dtype="int64")
+        self.type_ends = {}
+        position = 0
+        for i in layout:
+            data = all_data[self.hobbies[i]]
+
+            # Dates are kept as whole-second timestamps, as the original uint32 arrays were
+            hobby_dates = np.asarray(data["dates"]).astype("int64")
+            order = self.sort_order(hobby_dates)
+            dates.append(hobby_dates[order])
+            if self.types[i] == "mileage":
+                mileage.append(np.asarray(data["mileage"], dtype="float32")[order])
+            if weighted:
+                if "weights" in data:
+                    weights.append(np.asarray(data["weights"]).astype("int64")[order])
+                else:
+                    weights.append(np.ones(hobby_dates.size, dtype="int64"))
+
+            self.starts[i] = position
+            position += hobby_dates.size
+            self.ends[i] = position
+            self.type_ends[self.types[i]] = position
+
+        self.dates = np.concatenate(dates) if dates else np.empty(0, dtype="int64")
+        self.mileage = np.concatenate(mileage) if mileage else np.empty(0, dtype="float32")
+        self.weights = (np.concatenate(weights) if weights else np.empty(0, dtype="int64")) if weighted else None
+
+        # Fill in prefix ends for types with no hobbies
+        end = 0
+        for logtype in TYPE_ORDER:
+            end = self.type_ends.setdefault(logtype, end)
+
+        # Global sort, with a compact hobby id alongside each date
+        segment_ids = np.repeat(np.array(layout, dtype="int64"), (self.ends - self.starts)[layout])
+        order = np.argsort(self.dates, kind="stable")
+        self.sorted_dates = self.dates[order]
+        self.sorted_ids = segment_ids[order].astype(self.id_dtype())
+
+        self.subsets = {}
+        self.dates_calendar = None
+
+        # Stat results computed from this dataset
+        self.memo = StatMemo()
+
+    # Layout rank of a hobby - its type's place in TYPE_ORDER, unknown types last
+    def type_rank(self, i):
+
+        if self.types[i] in TYPE_ORDER:
+            return TYPE_ORDER.index(self.types[i])
+        return len(TYPE_ORDER)
+
+    # Sort order for one hobby's dates, skipping the sort if already in order
+    def sort_order(self, dates):
+
+        if dates.size < 2 or np.all(dates[1:] >= dates[:-1]):
+            return np.arange(dates.size)
+        return np.argsort(dates, kind="stable")
+
+    # Smallest dtype that can hold every hobby id
+    def id_dtype(self):
+
+        if len(self.hobbies) <= np.iinfo("uint8").max:
+            return "uint8"
+        elif len(self.hobbies) <= np.iinfo("uint16").max:
+            return "uint16"
+        return "int32"
+
+    # Hobbies of the given types, in load order
+    def hobbies_of(self, types):
+        return [ h for h, t in zip(self.hobbies, self.types) if t in types ]
+
+    # Sorted dates for one hobby - a view into the date column
+    def hobby_dates(self, hobby):
+
+        i = self.ids[hobby]
+        return self.dates[self.starts[i]:self.ends[i]]
+
+    # Number of trips for one hobby - its weights summed, or its number of dates
+    def hobby_trips(self, hobby):
+
+        i = self.ids[hobby]
+        if self.weights is None:
+            return int(self.ends[i] - self.starts[i])
+        return int(self.weights[self.starts[i]:self.ends[i]].sum())
+
+    # Number of trips across every hobby
+    def total_trips(self):
+
+        if self.weights is None:
+            return int(self.dates.size)
+        return int(self.weights.sum())
+
+    # Mileage for one mileage hobby, lined up with hobby_dates - a view
+    def hobby_mileage(self, hobby):
+
+        i = self.ids[hobby]
+        return self.mileage[self.starts[i]:self.ends[i]]
+
+    # Dates for every mileage hobby - a view, not sorted across hobbies
+    def mileage_dates(self):
+        return self.dates[:self.type_ends["mileage"]]
+
+    # Dates for every hobby with real dates (mileage and date logs) - a view
+    def dated_dates(self):
+        return self.dates[:self.type_ends["date"]]
+
+    # Globally sorted dates for only the hobbies of the given types
+    # Every type is just the sorted column; anything narrower is filtered out
+    # of it once and kept, so it's never sorted again
+    def sorted_dates_of(self, types):
+
+        types = frozenset(types)
+        if types.issuperset(self.types):
+            return self.sorted_dates
+
+        if types not in self.subsets:
+            ids = [ i for i, t in enumerate(self.types) if t in types ]
+            self.subsets[types] = self.sorted_dates[np.isin(self.sorted_ids, ids)]
+
+        return self.subsets[types]
+
+    # Calendar buckets for the whole date column, built on first use
+    def calendar(self):
+
+        if self.dates_calendar is None:
+            self.dates_calendar = Calendar(self.dates, self.weights)
+        return self.dates_calendar
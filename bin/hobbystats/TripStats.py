@@ -0,0 +1,135 @@
+# This code defines classes for calculating overall date/trip statistics for multiple hobbies
+# This will take data pulled from logs by the log reader and process it
+#
+# Author: Josh McIntyre
+#
+from npimporter import np
+from Timeline import Timeline
+from StatMemo import memoized
+from StatRegistry import bind_funcs
+import math
+
+# Time delta defs for doing raw unix timestamp operations
+SECONDS_IN_YEAR = 31536000
+
+# This class defines processing methods for date/trip statistics
+class TripStats:
+
+    # Load the data on initialization
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, all_data, timeline=None):
+
+        self.load_data(all_data, timeline)
+
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("trip", self)
+
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, all_data, timeline=None):
+
+        # Get the date data
+        self.timeline = timeline if timeline is not None else Timeline(all_data)
+        self.memo = self.timeline.memo
+        self.date_data = { hobby : self.timeline.hobby_dates(hobby) for hobby in self.timeline.hobbies }
+
+    # Define individual methods for processing each desired statistic
+
+    # Total trips and total years
+    @memoized
+    def total_trips(self):
+
+        # Total trips - the size of the date column, with trip count seasons weighted
+        total_trips = self.timeline.total_trips()
+
+        ret = { "total trips" : total_trips}
+        return ret
+
+    # Total years
+    @memoized
+    def total_years(self):
+
+        # Total years - subtract the oldest from the latest datestamp in the sorted index
+        # Then, divide by seconds per year to get the total years logged
+        all_data = self.timeline.sorted_dates
+        diff = all_data[-1] - all_data[0]
+        years = int( diff / SECONDS_IN_YEAR ) + 1
+
+        ret = { "total years" : years }
+        return ret
+
+    # Total trips per hobby
+    @memoized
+    def total_trips_per_hobby(self):
+
+        ret = {}
+        for sport in self.date_data:
+            ret[sport] = self.timeline.hobby_trips(sport)
+
+        return ret
+
+    # Total trips per year
+    @memoized
+    def total_trips_per_year(self):
+
+        # Bucket every timestamp by its local year and count each year
+        ret = self.timeline.calendar().count_by_year()
+
+        return ret
+
+    # Total trips per month
+    @memoized
+    def total_trips_per_month(self):
+
+        ret = self.timeline.calendar().count_by_month()
+
+        return ret
+
+    # Total trips per ISO week
+    @memoized
+    def total_trips_per_week(self):
+
+        ret = self.timeline.calendar().count_by_week()
+
+        return ret
+
+    # Percentage of active days per year
+    @memoized
+    def pct_active_year(self):
+
+        year_data = self.total_trips_per_year()
+
+        ret = {}
+        for year, trips in year_data.items():
+            pct = (trips / 365) * 100
+            ret[year] = round(pct, 2)
+
+        return ret
+
+
+    # Percentage hobby total
+    @memoized
+    def pct_hobby_total(self):
+
+        total_trips = self.total_trips()["total trips"]
+
+        ret = {}
+        for sport in self.date_data:
+            pct = (self.timeline.hobby_trips(sport) / total_trips) * 100
+            ret[sport] = round(pct, 2)
+
+        return ret
+
+    # Percentage year total
+    @memoized
+    def pct_year_total(self):
+
+        total_trips = self.total_trips()["total trips"]
+        year_data = self.total_trips_per_year()
+
+        ret = {}
+        for year, trips in year_data.items():
+            pct = (trips / total_trips) * 100
+            ret[year] = round(pct, 2)
+
+        return ret
@@ -0,0 +1,163 @@
+# This file defines main stat processing code
+# It is the main entry point for the program
+#
+# Only lightweight modules are imported up front. The log reader, the stat
+# classes (and with them numpy), dateutil and matplotlib are imported when a
+# command actually needs them, so listing stats stays fast
+import argparse
+import atexit
+import json
+import sys
+
+from StatRegistry import STATS
+from StatPrinter import StatPrinter
+from Profiler import PROFILER
+
+# Usage string helper
+# This only reads the registry, so it needs no data and no numpy
+def usage():
+
+    # Print the stat options
+    print("Available stats:\n")
+    print("-----Overall Trip Stats-----")
+    for i, stat in enumerate(STATS["trip"]):
+        print(f"{i}) {stat[2]}")
+
+    print("-----Mileage Stats-----")
+    for i, stat in enumerate(STATS["mileage"]):
+        print(f"{i}) {stat[2]}")
+
+    print("-----Date Stats-----")
+    for i, stat in enumerate(STATS["date"]):
+        print(f"{i}) {stat[2]}")
+
+# Log discovery options from the command line, see LogFinder
+def finder_args(args):
+    return { "recursive" : args.recursive, "include" : args.include, "exclude" : args.exclude }
+
+# Read the logs and set up the stat processor classes
+# Returns a dictionary of stat type to stat processor
+def load_stats(args):
+
+    from LogReader import LogReader
+    from LogCache import LogCache
+    from Timeline import Timeline
+    from TripStats import TripStats
+    from MileageStats import MileageStats
+    from DateStats import DateStats
+
+    # Read generic date trip data
+    # In streaming mode, mileage logs are folded into running summaries instead
+    cache = None if args.no_cache else LogCache.for_logdir("logs")
+    lr = LogReader("logs", cache=cache, incremental=args.incremental and cache is not None, **finder_args(args))
+    with PROFILER.span("load_logs"):
+        if args.stream:
+            date_data = {}
+            accumulators = lr.accumulate_mileage()
+        else:
+            date_data = lr.read_logs()
+            accumulators = None
+
+    # Build the shared timeline index once, then initial the stat processor classes
+    with PROFILER.span("timeline"):
+        timeline = Timeline(date_data)
+    return {
+                "trip" : TripStats(date_data, timeline=timeline),
+                "mileage" : MileageStats(date_data, accumulators=accumulators, timeline=timeline),
+                "date" : DateStats(date_data, timeline=timeline),
+           }
+
+# Print the profile summary, and write the trace if asked for
+# This runs at exit, so it also covers runs that end with sys.exit
+def report_profile(trace_path=None):
+
+    PROFILER.disable()
+    print(PROFILER.summary(), file=sys.stderr)
+    if trace_path:
+        with open(trace_path, "w") as f:
+            json.dump(PROFILER.trace(), f)
+
+# This function is the main entry point for the program
+def main():
+
+    # Define the argparser
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stat_type", help="The stat type: trip, mileage, date", choices=["trip", "mileage", "date"])
+    parser.add_argument("--stat", type=int, help="The statistic number to process and display")
+    parser.add_argument("--stats", action="store_true", help="List available stats and indexes")
+    parser.add_argument("--graph", action="store_true", help="Also show the stat as a bar graph")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every log instead of loading unchanged ones from the cache")
+    parser.add_argument("--incremental", action="store_true", help="Only parse rows appended to cached logs since the last run")
+    parser.add_argument("--recursive", action="store_true", help="Also read logs in subdirectories of the log directory")
+    parser.add_argument("--include", action="append", help="Only read logs matching this glob pattern, ex: *.csv. Can be repeated")
+    parser.add_argument("--exclude", action="append", help="Skip logs matching this glob pattern. Can be repeated")
+    parser.add_argument("--stream", action="store_true", help="Stream mileage logs in chunks instead of loading them into memory")
+    parser.add_argument("--all", action="store_true", help="Compute every stat in one pass and print a JSON report")
+    parser.add_argument("--select", help="Compute only these stats for the JSON report, ex: trip:0,trip:3,mileage")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of the console")
+    parser.add_argument("--serve", action="store_true", help="Keep the logs loaded and serve stats over HTTP, reloading logs as they change")
+    parser.add_argument("--host", default="127.0.0.1", help="The address to serve stats on")
+    parser.add_argument("--port", type=int, default=8080, help="The port to serve stats on")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between checks for changed logs when serving")
+    parser.add_argument("--profile", action="store_true", help="Time each stage of the run and print a summary when done")
+    parser.add_argument("--profile-memory", action="store_true", help="Also track peak allocations for each stage, this slows the run down")
+    parser.add_argument("--profile-trace", help="Write a Chrome trace of the profiled stages to this file")
+    args = parser.parse_args()
+
+    # Listing stats needs no data at all
+    if args.stats:
+        usage()
+        sys.exit(0)
+
+    # Serving keeps everything loaded and answers stats until interrupted
+    if args.serve:
+        from LogCache import LogCache
+        from StatServer import StatServer
+
+        cache = None if args.no_cache else LogCache.for_logdir("logs")
+        server = StatServer("logs", cache=cache, incremental=args.incremental and cache is not None, poll_interval=args.poll, **finder_args(args))
+        server.serve_forever(args.host, args.port)
+        sys.exit(0)
+
+    batch = args.all or args.select
+    if not batch and (args.stat_type is None or args.stat is None):
+        print("Stat type and index required")
+        sys.exit(1)
+    if args.stream and (batch or args.stat_type != "mileage"):
+        print("Streaming mode only supports mileage stats")
+        sys.exit(1)
+
+    # Execute desired commands
+    if args.profile or args.profile_memory or args.profile_trace:
+        PROFILER.enable(memory=args.profile_memory)
+        atexit.register(report_profile, args.profile_trace)
+
+    processors = load_stats(args)
+    if batch:
+        from StatReport import StatReport
+
+        report = StatReport(processors)
+        try:
+            doc = report.dumps(args.select)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(doc + "\n")
+        else:
+            print(doc)
+        sys.exit(0)
+
+    tp = StatPrinter()
+    stat_proc = processors[args.stat_type].funcs[args.stat]
+    data = stat_proc[1]()
+    tp.print_kv_stats(stat_proc[0], data)
+
+    if args.graph:
+        from StatBarGraph import graph_stats_bar
+        graph_stats_bar(data, stat_proc[2], "", "")
+
+if __name__ == "__main__":
+
+    main()
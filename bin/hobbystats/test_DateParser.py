@@ -0,0 +1,42 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import dateutil.parser
+
+from npimporter import np
+import DateParser
+
+# Set up a basic data set
+TEST_DATES = [ "1/1/2019", "1/3/2019", "12/25/2020", "1/1/2019" ]
+MIXED_DATES = [ "1/1/2019", "June 3 2019", "not a date", "2019-06-04" ]
+
+# Test format inference
+def test_infer_format():
+    dp = DateParser.DateParser()
+
+    assert dp.infer_format(TEST_DATES) == "%m/%d/%Y"
+    assert dp.infer_format([ "2019-01-05", "2020-12-31" ]) == "%Y-%m-%d"
+
+def test_infer_format_ambiguous():
+    dp = DateParser.DateParser()
+
+    # Two digit years are left to dateutil
+    assert dp.infer_format([ "1/1/19" ]) is None
+
+# Test bulk parsing
+def test_parse_matches_dateutil():
+    dp = DateParser.DateParser()
+    ts, valid = dp.parse(TEST_DATES)
+
+    expected = [ dateutil.parser.parse(s).timestamp() for s in TEST_DATES ]
+    assert valid.all()
+    assert np.array_equal(ts, np.array(expected))
+
+def test_parse_fallback():
+    dp = DateParser.DateParser()
+    ts, valid = dp.parse(MIXED_DATES)
+
+    assert list(valid) == [ True, True, False, True ]
+    assert ts[1] == dateutil.parser.parse("June 3 2019").timestamp()
+    assert ts[3] == dateutil.parser.parse("2019-06-04").timestamp()
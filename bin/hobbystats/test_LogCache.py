@@ -0,0 +1,77 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import os
+
+from npimporter import np
+import LogCache
+import LogReader
+
+# Set up a basic data set
+TEST_LOG = "Date,Location,Distance (mi)\n6/1/2019,Local Trails,5.12\n6/2/2019,State Park,10\n"
+APPENDED_ROW = "6/3/2020,Local Trails,6.22\n"
+
+def write_log(tmp_path, contents):
+    path = tmp_path / "trail_mtb.csv"
+    path.write_text(contents)
+    return str(path)
+
+def read(tmp_path):
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    return LogReader.LogReader(str(tmp_path), cache=cache).read_logs()
+
+# Test cache behavior
+def test_cache_roundtrip(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    fresh = read(tmp_path)
+    cached = read(tmp_path)
+
+    assert isinstance(cached["Trail Mtb"]["dates"], np.memmap)
+    assert np.array_equal(fresh["Trail Mtb"]["dates"], cached["Trail Mtb"]["dates"])
+    assert np.array_equal(fresh["Trail Mtb"]["mileage"], cached["Trail Mtb"]["mileage"])
+
+def test_cache_touch_without_change(tmp_path):
+    path = write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    os.utime(path, ns=(0, 0))
+
+    cached = read(tmp_path)
+    assert isinstance(cached["Trail Mtb"]["dates"], np.memmap)
+
+def test_cache_invalidated_on_change(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    write_log(tmp_path, TEST_LOG + APPENDED_ROW)
+
+    data = read(tmp_path)
+    assert data["Trail Mtb"]["mileage"].size == 3
+
+# Test incremental appends
+def read_incremental(tmp_path):
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    return LogReader.LogReader(str(tmp_path), cache=cache, incremental=True).read_logs()
+
+def test_incremental_append(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read_incremental(tmp_path)
+    write_log(tmp_path, TEST_LOG + APPENDED_ROW)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.append_state(str(tmp_path / "trail_mtb.csv"), "mileage") is not None
+
+    data = read_incremental(tmp_path)
+    full = LogReader.LogReader(str(tmp_path)).read_logs()
+    assert np.array_equal(data["Trail Mtb"]["dates"], full["Trail Mtb"]["dates"])
+    assert np.array_equal(data["Trail Mtb"]["mileage"], full["Trail Mtb"]["mileage"])
+
+def test_incremental_rewrite(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read_incremental(tmp_path)
+    write_log(tmp_path, TEST_LOG.replace("10", "12") + APPENDED_ROW)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.append_state(str(tmp_path / "trail_mtb.csv"), "mileage") is None
+
+    data = read_incremental(tmp_path)
+    assert np.array_equal(data["Trail Mtb"]["mileage"], np.array([ 5.12, 12.0, 6.22 ], dtype="float32"))
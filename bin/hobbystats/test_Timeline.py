@@ -0,0 +1,41 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+from npimporter import np
+import Timeline
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_trips":
+                {
+                    "dates" : [ DATE, DATE, DATE ],
+                    "type" : "tripcount"
+                },
+
+                "test_activity":
+                {
+                    "dates" : np.array([ DATE + (SECONDS_PER_DAY * 2), DATE, DATE + SECONDS_PER_DAY ], dtype="uint32"),
+                    "mileage" : np.array([ 5.0, 2.0, 3.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+            }
+
+# Test the index layout
+def test_hobby_slices_sorted():
+    tl = Timeline.Timeline(TEST_DATA)
+
+    assert tl.hobbies == [ "test_trips", "test_activity" ]
+    assert list(tl.hobby_dates("test_activity")) == [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ]
+    assert list(tl.hobby_mileage("test_activity")) == [ 2.0, 3.0, 5.0 ]
+    assert list(tl.mileage_dates()) == list(tl.hobby_dates("test_activity"))
+
+def test_global_sort():
+    tl = Timeline.Timeline(TEST_DATA)
+
+    assert np.all(np.diff(tl.sorted_dates) >= 0)
+    assert tl.sorted_dates.size == 6
+    assert sorted(tl.sorted_ids[:4]) == [ 0, 0, 0, 1 ]
+    assert list(tl.sorted_dates_of([ "mileage" ])) == list(tl.hobby_dates("test_activity"))
@@ -0,0 +1,50 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import time
+
+from npimporter import np
+import TripStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {   
+                "test_activity": 
+                {
+                    "dates" : [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ],
+                    "type" : "date"
+                },
+                
+                "test_activity_2": 
+                {
+                    "dates" : [ DATE, DATE, DATE ],
+                    "type" : "tripcount"
+                },
+                
+            }
+            
+# Test statistics
+def test_total_trips():
+    ms = TripStats.TripStats(TEST_DATA)
+    ret = ms.total_trips()
+
+    assert ret["total trips"] == 6
+    
+def test_total_years():
+    ms = TripStats.TripStats(TEST_DATA)
+    ret = ms.total_years()
+
+    assert ret["total years"] == 1
+    
+
+# Trip count seasons stored as weighted dates count the same as repeated dates
+def test_weighted_trips():
+    weighted = dict(TEST_DATA)
+    weighted["test_activity_2"] = { "dates" : np.array([ DATE ], dtype="uint32"), "weights" : np.array([ 3 ], dtype="uint32"), "type" : "tripcount" }
+    expanded = TripStats.TripStats(TEST_DATA)
+    ms = TripStats.TripStats(weighted)
+
+    for i in range(len(ms.funcs)):
+        assert ms.funcs[i][1]() == expanded.funcs[i][1]()
@@ -0,0 +1,221 @@
+# This file defines the array backends the stat classes run their reductions on
+# The loaded data always lives in numpy arrays; a backend decides how sums,
+# extremes and counts over those arrays are computed - in place with numpy,
+# split across cores, or on a GPU with cupy
+#
+# The backend is picked by name, from the --backend flag or the
+# HOBBYSTATS_BACKEND environment variable, and defaults to numpy
+#
+# Author: Josh McIntyre
+#
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Environment variable naming the backend to use
+ENV_VAR = "HOBBYSTATS_BACKEND"
+DEFAULT_BACKEND = "numpy"
+
+# Elements per chunk for the chunked backend
+# Arrays no bigger than one chunk are reduced directly
+CHUNK_SIZE = 1 << 20
+
+# This class defines the plain numpy backend
+# Every other backend has the same methods, so the stat classes can use any of
+# them without knowing which one they have
+class NumpyBackend:
+
+    name = "numpy"
+    xp = np
+
+    # Whether the backend can be used on this machine
+    @classmethod
+    def available(cls):
+        return True
+
+    # Sum of an array
+    def sum(self, a):
+        return self.xp.asarray(a).sum()
+
+    # Mean of an array
+    def mean(self, a):
+        return self.xp.mean(self.xp.asarray(a))
+
+    # Largest value in an array
+    def max(self, a):
+        return self.xp.asarray(a).max()
+
+    # Smallest value in an array
+    def min(self, a):
+        return self.xp.asarray(a).min()
+
+    # Number of nonzero values in an array
+    def count_nonzero(self, a):
+        return self.xp.count_nonzero(self.xp.asarray(a))
+
+    # Count of each non-negative integer key, or the sum of its weights
+    def bincount(self, keys, weights=None):
+
+        keys = self.xp.asarray(keys)
+        if weights is not None:
+            weights = self.xp.asarray(weights)
+        return self.xp.bincount(keys, weights=weights)
+
+    # Copy a backend array back into numpy
+    def to_host(self, a):
+        return a
+
+# This class defines a multi-core CPU backend
+# Large arrays are split into fixed-size chunks, each chunk is reduced on a
+# thread pool - numpy releases the GIL while it works - and the partial
+# results are combined. Chunk boundaries only depend on the chunk size, so
+# results are the same however many cores there are
+# Float sums are accumulated in float64, so they can differ from numpy's
+# float32 sums in the last few bits
+class ChunkedBackend(NumpyBackend):
+
+    name = "chunked"
+
+    # Initialize with the number of threads, one per core unless set
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE):
+
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pool = None
+
+    # Apply a function to matching chunks of one or more arrays
+    # Returns a list of the partial results, in chunk order
+    def map_chunks(self, func, *arrays):
+
+        starts = range(0, arrays[0].size, self.chunk_size)
+        chunks = [ [ a[s:s + self.chunk_size] for s in starts ] for a in arrays ]
+        if self.workers == 1:
+            return list(map(func, *chunks))
+
+        if self.pool is None:
+            self.pool = ThreadPoolExecutor(self.workers)
+        return list(self.pool.map(func, *chunks))
+
+    # Whether an array is small enough to reduce directly
+    def small(self, a):
+        return a.size <= self.chunk_size
+
+    def sum(self, a):
+
+        a = np.asarray(a)
+        if self.small(a):
+            return super().sum(a)
+
+        dtype = "float64" if a.dtype.kind == "f" else None
+        return np.sum(self.map_chunks(lambda c: c.sum(dtype=dtype), a))
+
+    def mean(self, a):
+
+        a = np.asarray(a)
+        if self.small(a):
+            return super().mean(a)
+        return self.sum(a) / a.size
+
+    def max(self, a):
+
+        a = np.asarray(a)
+        if self.small(a):
+            return super().max(a)
+        return max(self.map_chunks(np.max, a))
+
+    def min(self, a):
+
+        a = np.asarray(a)
+        if self.small(a):
+            return super().min(a)
+        return min(self.map_chunks(np.min, a))
+
+    def count_nonzero(self, a):
+
+        a = np.asarray(a)
+        if self.small(a):
+            return super().count_nonzero(a)
+        return sum(self.map_chunks(np.count_nonzero, a))
+
+    # Each chunk is counted into a full-length array, and the partial counts summed
+    def bincount(self, keys, weights=None):
+
+        keys = np.asarray(keys)
+        if self.small(keys):
+            return super().bincount(keys, weights)
+
+        length = int(self.max(keys)) + 1
+        if weights is None:
+            partials = self.map_chunks(lambda k: np.bincount(k, minlength=length), keys)
+        else:
+            partials = self.map_chunks(lambda k, w: np.bincount(k, weights=w, minlength=length), keys, np.asarray(weights))
+        return np.sum(partials, axis=0)
+
+# This class defines a GPU backend on cupy
+# Arrays are copied to the device for each reduction, so it only pays off on
+# very large datasets. cupy is only imported if this backend is picked
+class CupyBackend(NumpyBackend):
+
+    name = "cupy"
+
+    @classmethod
+    def available(cls):
+
+        try:
+            import cupy
+            return cupy.cuda.runtime.getDeviceCount() > 0
+        except Exception:
+            return False
+
+    def __init__(self):
+
+        import cupy
+        self.xp = cupy
+
+    def to_host(self, a):
+        return self.xp.asnumpy(a)
+
+# Registered backends, by name
+BACKENDS = {}
+
+# Register a backend class under its name
+# Usable as a class decorator for backends defined elsewhere
+def register(cls):
+
+    BACKENDS[cls.name] = cls
+    return cls
+
+for backend in [ NumpyBackend, ChunkedBackend, CupyBackend ]:
+    register(backend)
+
+# Names of the registered backends that can run on this machine
+def available_backends():
+    return [ name for name, cls in BACKENDS.items() if cls.available() ]
+
+# Create a backend by name
+def make_backend(name):
+
+    if name not in BACKENDS:
+        raise ValueError("Unknown array backend: {}, should be one of {}".format(name, ", ".join(BACKENDS)))
+    if not BACKENDS[name].available():
+        raise ValueError("Array backend {} isn't available on this machine".format(name))
+
+    return BACKENDS[name]()
+
+# The backend in use, created on first use
+ACTIVE = None
+
+# Pick the backend the stat classes use from now on
+def use_backend(name):
+
+    global ACTIVE
+    ACTIVE = make_backend(name)
+    return ACTIVE
+
+# The backend in use - the one picked with use_backend, or else the one named
+# by the environment, or numpy
+def get_backend():
+
+    if ACTIVE is None:
+        use_backend(os.environ.get(ENV_VAR) or DEFAULT_BACKEND)
+    return ACTIVE
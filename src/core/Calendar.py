@@ -0,0 +1,232 @@
+# This file defines a vectorized calendar bucketing engine
+# It converts whole arrays of Unix timestamps into local calendar days, years,
+# months and ISO weeks in one pass, instead of a datetime per timestamp
+#
+# Author: Josh McIntyre
+#
+import datetime
+import time
+import numpy as np
+from ArrayBackend import get_backend
+
+# Time delta defs for doing raw unix timestamp operations
+SECONDS_IN_DAY = 86400
+
+# Days from 0000-03-01 to 1970-01-01 in the proleptic Gregorian calendar
+# Used by the civil date conversions below, which count years from March
+EPOCH_SHIFT = 719468
+DAYS_IN_ERA = 146097
+
+# Convert timestamps to local day numbers, counted from 1970-01-01
+# This matches datetime.date.fromtimestamp, which uses local time
+def local_days(timestamps):
+
+    ts = np.asarray(timestamps).astype("int64")
+    if ts.size == 0:
+        return np.empty(0, dtype="int64")
+
+    return (ts + utc_offsets(ts)) // SECONDS_IN_DAY
+
+# Look up the local UTC offset for every timestamp
+#
+# Offsets only change at DST and zone transitions, so rather than asking the
+# OS about each timestamp, probe the offset once a day across the covered span,
+# binary search each change down to the exact second, then assign offsets to
+# every timestamp with one searchsorted. If there are fewer timestamps than
+# days in the span, it's cheaper to just look each one up
+def utc_offsets(ts):
+
+    low = int(ts.min())
+    high = int(ts.max())
+    probes = list(range(low, high + SECONDS_IN_DAY, SECONDS_IN_DAY))
+    if ts.size <= len(probes):
+        return np.array([ time.localtime(t).tm_gmtoff for t in ts.tolist() ], dtype="int64")
+
+    probe_offsets = [ time.localtime(p).tm_gmtoff for p in probes ]
+    transitions = []
+    offsets = [ probe_offsets[0] ]
+    for i in range(len(probes) - 1):
+        if probe_offsets[i] != probe_offsets[i + 1]:
+            transitions.append(find_transition(probes[i], probes[i + 1]))
+            offsets.append(probe_offsets[i + 1])
+
+    index = np.searchsorted(np.array(transitions, dtype="int64"), ts, side="right")
+    return np.array(offsets, dtype="int64")[index]
+
+# Find the first second after start where the UTC offset differs from start's
+# The offset at end must already be known to differ
+def find_transition(start, end):
+
+    before = time.localtime(start).tm_gmtoff
+    while end - start > 1:
+        mid = (start + end) // 2
+        if time.localtime(mid).tm_gmtoff == before:
+            start = mid
+        else:
+            end = mid
+
+    return end
+
+# Timestamps bounding a range of local calendar days
+# first and last are ISO dates, ex: 2023-01-01, and either can be None
+# Returns ( start, end ), the local midnight starting the first day and the
+# one ending the last day, or None for a missing bound
+# Raises ValueError for a badly formatted date
+def date_window(first=None, last=None):
+
+    start = None
+    end = None
+    if first is not None:
+        start = int(time.mktime(datetime.date.fromisoformat(first).timetuple()))
+    if last is not None:
+        end = int(time.mktime((datetime.date.fromisoformat(last) + datetime.timedelta(days=1)).timetuple()))
+
+    return start, end
+
+# Convert day numbers to ( year, month, day ) arrays
+# Vectorized form of the days-to-civil algorithm from Howard Hinnant's
+# "chrono-Compatible Low-Level Date Algorithms"
+def civil_from_days(days):
+
+    z = np.asarray(days, dtype="int64") + EPOCH_SHIFT
+    era = z // DAYS_IN_ERA
+    doe = z - era * DAYS_IN_ERA
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+
+    return year, month, day
+
+# Convert ( year, month, day ) arrays to day numbers - the inverse of the above
+def days_from_civil(year, month, day):
+
+    year = np.asarray(year, dtype="int64") - (np.asarray(month) <= 2)
+    month = np.asarray(month, dtype="int64")
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + np.asarray(day, dtype="int64") - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+
+    return era * DAYS_IN_ERA + doe - EPOCH_SHIFT
+
+# Convert day numbers to ( ISO year, ISO week ) arrays
+# An ISO week belongs to the year its Thursday falls in
+def iso_weeks(days):
+
+    days = np.asarray(days, dtype="int64")
+
+    # 1970-01-01 was a Thursday, so day 0 has ISO weekday 4 (Monday is 1)
+    weekday = (days + 3) % 7 + 1
+    thursday = days - weekday + 4
+    iso_year, _, _ = civil_from_days(thursday)
+    week = (thursday - days_from_civil(iso_year, 1, 1)) // 7 + 1
+
+    return iso_year, week
+
+# Count occurrences of each integer key, returning only keys that occur
+# Keys are offset by their minimum so bincount stays small for any range
+# The counting runs on the given ArrayBackend, or the one in use
+def count_keys(keys, weights=None, backend=None):
+
+    if keys.size == 0:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype="int64")
+
+    backend = backend if backend is not None else get_backend()
+    low = int(backend.min(keys))
+    counts = backend.to_host(backend.bincount(keys - low, weights))
+    if weights is not None and weights.dtype.kind in "iu":
+        counts = counts.astype(weights.dtype)
+    present = np.flatnonzero(counts)
+
+    return present + low, counts[present]
+
+# This class defines calendar buckets for one array of timestamps
+# The local day conversion is done once, and every bucketing reuses it
+# With weights, each timestamp counts as its weight instead of once
+class Calendar:
+
+    # Convert the timestamps on initialization
+    # Counts are done on the given ArrayBackend, or the one in use
+    def __init__(self, timestamps, weights=None, backend=None):
+
+        self.days = local_days(timestamps)
+        self.weights = weights
+        self.backend = backend
+        self.civil = None
+        self.weeks = None
+
+    # Calendar over day numbers that were already worked out, ex: the days of
+    # another Calendar shared from another process
+    @classmethod
+    def from_days(cls, days, weights=None, backend=None):
+
+        calendar = cls.__new__(cls)
+        calendar.days = days
+        calendar.weights = weights
+        calendar.backend = backend
+        calendar.civil = None
+        calendar.weeks = None
+        return calendar
+
+    # Calendar over just the first count timestamps, ex: the dated hobbies at
+    # the front of a Timeline. Conversions already done are sliced, not redone
+    def head(self, count):
+
+        calendar = Calendar.from_days(self.days[:count], None if self.weights is None else self.weights[:count], self.backend)
+        if self.civil is not None:
+            calendar.civil = tuple( a[:count] for a in self.civil )
+        if self.weeks is not None:
+            calendar.weeks = tuple( a[:count] for a in self.weeks )
+        return calendar
+
+    # Year, month and day of every timestamp
+    def year_month_day(self):
+
+        if self.civil is None:
+            self.civil = civil_from_days(self.days)
+        return self.civil
+
+    # ISO year and week of every timestamp
+    def iso_year_week(self):
+
+        if self.weeks is None:
+            self.weeks = iso_weeks(self.days)
+        return self.weeks
+
+    # Count timestamps per year
+    # Returns a dictionary of year to count, in year order
+    def count_by_year(self):
+
+        year, _, _ = self.year_month_day()
+        keys, counts = count_keys(year, self.weights, self.backend)
+
+        return { int(k) : c for k, c in zip(keys, counts) }
+
+    # Count timestamps per month
+    # Returns a dictionary of "YYYY-MM" to count, in month order
+    def count_by_month(self):
+
+        year, month, _ = self.year_month_day()
+        keys, counts = count_keys(year * 12 + month - 1, self.weights, self.backend)
+
+        return { "{:04d}-{:02d}".format(int(k // 12), int(k % 12) + 1) : c for k, c in zip(keys, counts) }
+
+    # Count timestamps per ISO week
+    # Returns a dictionary of "YYYY-Www" to count, in week order
+    def count_by_week(self):
+
+        iso_year, week = self.iso_year_week()
+        keys, counts = count_keys(iso_year * 53 + week - 1, self.weights, self.backend)
+
+        return { "{:04d}-W{:02d}".format(int(k // 53), int(k % 53) + 1) : c for k, c in zip(keys, counts) }
+
+    # Count timestamps per local day
+    # Returns a dictionary of day number (days since 1970-01-01) to count
+    def count_by_day(self):
+
+        keys, counts = count_keys(self.days, self.weights, self.backend)
+
+        return { int(k) : c for k, c in zip(keys, counts) }
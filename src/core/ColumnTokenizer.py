@@ -0,0 +1,143 @@
+# This file defines a column-projected tokenizer for hobby logs
+# The stats only ever read a few columns - Date, Distance (mi), Years and Trips -
+# so instead of building a dict of every column for every row, this finds the
+# field boundaries for a whole block of rows at once and pulls out just the
+# columns that are needed, straight into numpy arrays
+#
+# Author: Josh McIntyre
+#
+import csv
+import io
+import numpy as np
+
+# Columns the parser reads, for each log type
+COLUMNS = {
+            "mileage" : [ "Date", "Distance (mi)" ],
+            "date" : [ "Date" ],
+            "tripcount" : [ "Years", "Trips" ],
+          }
+
+# Byte values the fast path looks for
+COMMA = ord(",")
+NEWLINE = ord("\n")
+
+# Widest field the fast path gathers. Every value of a column is padded to the
+# widest one, so a block with a longer wanted field goes through csv.reader
+MAX_FIELD_WIDTH = 256
+
+# This class defines a tokenizer for the rows of one log
+#
+# Blocks without quotes or carriage returns take the fast path. Newline and comma
+# positions are found with numpy, and as long as every row has the same number of
+# fields as the header, each wanted field is gathered into a fixed width bytes
+# array without touching the other columns
+# Anything else - quoted fields with commas or newlines, CRLF line endings, ragged
+# rows, wanted fields over MAX_FIELD_WIDTH - goes through csv.reader, still only
+# keeping the wanted columns
+class ColumnTokenizer:
+
+    # Initialize with the log's header fields and the columns to keep
+    def __init__(self, fieldnames, columns):
+
+        self.fieldnames = list(fieldnames)
+        self.columns = list(columns)
+        self.indices = { c : self.fieldnames.index(c) for c in self.columns if c in self.fieldnames }
+
+    # Tokenizer for the columns a log type needs
+    @classmethod
+    def for_type(cls, fieldnames, logtype):
+        return cls(fieldnames, COLUMNS.get(logtype, []))
+
+    # Split a block of whole rows into the wanted columns
+    # Returns a dictionary of column name to array of field values, one per row
+    # Fast path columns are bytes arrays, csv path columns are str arrays
+    # Columns missing from the header are all empty strings
+    def tokenize(self, raw):
+
+        columns = None
+        if b'"' not in raw and b"\r" not in raw:
+            columns = self.tokenize_plain(raw)
+        if columns is None:
+            columns = self.tokenize_csv(raw)
+
+        return columns
+
+    # The fast path, for blocks with no quoting
+    # Returns None if any row has the wrong number of fields, or a wanted
+    # field is too wide
+    def tokenize_plain(self, raw):
+
+        buf = np.frombuffer(raw, dtype="uint8")
+        ends = np.flatnonzero(buf == NEWLINE)
+        if buf.size and buf[-1] != NEWLINE:
+            ends = np.append(ends, buf.size)
+        starts = np.concatenate(( [ 0 ], ends[:-1] + 1 )).astype("int64")
+
+        # Blank lines are skipped, as csv.DictReader skips them
+        keep = ends > starts
+        starts = starts[keep]
+        ends = ends[keep]
+
+        width = len(self.fieldnames)
+        if width == 0:
+            return None
+        commas = np.flatnonzero(buf == COMMA)
+        counts = np.searchsorted(commas, ends) - np.searchsorted(commas, starts)
+        if np.any(counts != width - 1):
+            return None
+        commas = commas.reshape(starts.size, width - 1)
+
+        columns = {}
+        for column in self.columns:
+            i = self.indices.get(column)
+            if i is None:
+                columns[column] = np.zeros(starts.size, dtype="S1")
+                continue
+            field_starts = starts if i == 0 else commas[:, i - 1] + 1
+            field_ends = ends if i == width - 1 else commas[:, i]
+            columns[column] = self.gather(buf, field_starts, field_ends)
+            if columns[column] is None:
+                return None
+
+        return columns
+
+    # Copy byte ranges out of a buffer into a fixed width bytes array
+    # The output is allocated once and filled one byte position at a time, from
+    # the rows whose field is that long, so the only other memory used is a row
+    # index per position rather than rows times the widest field
+    # Returns None if a field is wider than MAX_FIELD_WIDTH
+    def gather(self, buf, starts, ends):
+
+        lengths = ends - starts
+        size = int(lengths.max()) if lengths.size else 0
+        if size == 0:
+            return np.zeros(starts.size, dtype="S1")
+        if size > MAX_FIELD_WIDTH:
+            return None
+
+        fields = np.zeros(( starts.size, size ), dtype="uint8")
+        for k in range(size):
+            rows = np.flatnonzero(lengths > k)
+            fields[rows, k] = buf[starts[rows] + k]
+
+        return fields.view("S{}".format(size)).reshape(-1)
+
+    # The general path, with full csv quoting rules
+    def tokenize_csv(self, raw):
+
+        values = { c : [] for c in self.columns }
+        wanted = [ ( c, self.indices.get(c) ) for c in self.columns ]
+        for row in csv.reader(io.StringIO(raw.decode())):
+            if not row:
+                continue
+            for c, i in wanted:
+                values[c].append(row[i] if i is not None and i < len(row) else "")
+
+        return { c : np.array(v, dtype="str") for c, v in values.items() }
+
+# Convert a tokenized column to a list of str
+def as_str(values):
+
+    if values.dtype.kind == "S":
+        return [ v.decode() for v in values.tolist() ]
+    return values.tolist()
@@ -0,0 +1,121 @@
+# This file defines a bulk date parser for hobby logs
+# Instead of running dateutil on every row, it infers the date format once per
+# log from a sample of the column, then parses the whole column in one pass
+#
+# Author: Josh McIntyre
+#
+import datetime
+import numpy as np
+
+# Candidate formats for the inferred fast path, tried in order
+# Each one must agree with dateutil on the sample before it's used, so
+# ambiguous formats (day first, two digit years) are left to the fallback
+DATE_FORMATS = [
+                    "%m/%d/%Y",
+                    "%Y-%m-%d",
+                    "%Y/%m/%d",
+                    "%m-%d-%Y",
+                    "%m.%d.%Y",
+                    "%b %d %Y",
+                    "%B %d %Y",
+                    "%d %b %Y",
+                    "%d %B %Y",
+                    "%Y-%m-%d %H:%M:%S",
+                    "%Y-%m-%dT%H:%M:%S",
+                    "%m/%d/%Y %H:%M",
+                    "%m/%d/%Y %H:%M:%S",
+                ]
+
+# Number of rows from the top of the column used to infer the format
+SAMPLE_SIZE = 64
+
+# This class defines a date parser that handles an entire log column at a time
+class DateParser:
+
+    # Set up the candidate formats on initialization
+    def __init__(self, formats=DATE_FORMATS):
+
+        self.formats = formats
+
+    # Infer the date format from a sample of date strings
+    # A format is accepted only if it parses every non-blank sample value
+    # to exactly what dateutil would produce. Returns None if none match
+    def infer_format(self, sample):
+
+        sample = [ s.strip() for s in sample if s and s.strip() ]
+        if not sample:
+            return None
+
+        expected = []
+        for s in sample:
+            try:
+                expected.append(self.fallback_parse(s))
+            except (ValueError, OverflowError):
+                expected.append(None)
+
+        for fmt in self.formats:
+            try:
+                parsed = [ datetime.datetime.strptime(s, fmt) for s in sample ]
+            except ValueError:
+                continue
+            if all( e is None or p == e for p, e in zip(parsed, expected) ):
+                return fmt
+
+        return None
+
+    # Parse a whole column of date strings into Unix timestamps
+    # The format is inferred from the head of the column unless given
+    # Each distinct string is only parsed once, then scattered back to the
+    # rows it came from with a single vectorized take
+    # A numpy bytes array works too, and only its distinct values are decoded
+    # Returns a float64 timestamp array and a boolean mask of rows that parsed
+    def parse(self, strings, fmt=None):
+
+        if len(strings) == 0:
+            return np.empty(0, dtype="float64"), np.empty(0, dtype="bool")
+
+        values = np.asarray(strings)
+        if values.dtype.kind != "S":
+            values = values.astype("str")
+
+        if fmt is None:
+            fmt = self.infer_format([ decode(s) for s in values[:SAMPLE_SIZE].tolist() ])
+
+        unique, inverse = np.unique(values, return_inverse=True)
+
+        unique_ts = np.empty(unique.size, dtype="float64")
+        for i, s in enumerate(unique.tolist()):
+            unique_ts[i] = self.parse_one(decode(s), fmt)
+
+        timestamps = unique_ts[inverse.reshape(-1)]
+        valid = ~np.isnan(timestamps)
+
+        return timestamps, valid
+
+    # Parse a single date string, trying the inferred format before dateutil
+    # Naive datetimes are treated as local time, as dateutil results always were
+    # Returns NaN for strings that neither can parse
+    def parse_one(self, s, fmt):
+
+        s = s.strip()
+        if fmt is not None:
+            try:
+                return datetime.datetime.strptime(s, fmt).timestamp()
+            except ValueError:
+                pass
+
+        try:
+            return self.fallback_parse(s).timestamp()
+        except (ValueError, OverflowError):
+            return float("nan")
+
+    # The slow but flexible path for rows that don't match the inferred format
+    # dateutil is imported here so logs in a known format never need it
+    def fallback_parse(self, s):
+
+        import dateutil.parser
+        return dateutil.parser.parse(s)
+
+# Decode a bytes value from a bytes array, leaving str alone
+def decode(s):
+    return s.decode() if isinstance(s, bytes) else s
@@ -3,73 +3,205 @@
 #
 # Author: Josh McIntyre
 #
-from npimporter import np
+from Timeline import Timeline
+from GapIndex import GapIndex, day_string
+from DayBitmap import DayBitmap
+from StatMemo import memoized
+from StatRegistry import bind_funcs
 import math
-import datetime
 
 # Time delta defs for doing raw unix timestamp operations
 SECONDS_IN_DAY = 86400
 
+# Hobby types with real dates, rather than years of trip counts
+DATED_TYPES = [ "date", "mileage" ]
+
 # This class defines processing methods for date statistics
 class DateStats:
 
-    # Load the data on initialization
-    def __init__(self, all_data):
+    # Load the data on initialization, from a HobbySet or the log reader's
+    # data dictionary
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, all_data, timeline=None):
 
-        # Get the date data
-        date_data = {}
-        for hobby, data_dict in all_data.items():
-            if data_dict["type"] == "date" or data_dict["type"] == "mileage":
-                date_data[hobby] = data_dict["dates"]
+        self.load_data(all_data, timeline)
 
-        self.date_data = date_data
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("date", self)
 
-        # Register the functions with titles
-        self.funcs = [
-                        ( "Overall {} : {}", self.multi_activity_days, "Overall multi-activity days" ),
-                        ( "Average days between trips for {}: {}", self.average_days_between, "Average days between trips for activity" ),
-                        ( "Max days between trips for {}: {}", self.max_days_between, "Maximum days between trips for activity" ),
-                    ]
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, all_data, timeline=None):
+
+        # Get the date data
+        self.timeline = timeline if timeline is not None else Timeline(all_data)
+        self.memo = self.timeline.memo
+        self.date_data = { hobby : self.timeline.hobby_dates(hobby) for hobby in self.timeline.hobbies_of(DATED_TYPES) }
+
+    # The dated hobbies, or only those in the given tuple, in load order
+    def hobbies(self, only=None):
+        return [ h for h in self.date_data if only is None or h in only ]
 
     # Define individual methods for processing each desired statistic
 
+    # Day by hobby bitmap over every dated hobby, built on first use
+    # Multi-activity and co-occurrence stats are answered from it
+    @memoized
+    def day_bitmap(self):
+
+        hobbies = list(self.date_data)
+        return DayBitmap(hobbies, [ self.timeline.hobby_days(h) for h in hobbies ])
+
+    # Number of days both hobbies were done
+    def days_with(self, a, b):
+        return self.day_bitmap().days_with(a, b)
+
+    # Number of days hobby a was done but hobby b wasn't
+    def days_without(self, a, b):
+        return self.day_bitmap().days_without(a, b)
+
     # Multi-activity days
+    # Days with two or more different hobbies - a hobby logged twice in one
+    # day is still one hobby
+    @memoized
     def multi_activity_days(self):
 
-        # Format data - collapse all datestamps into one array
-        all_raw = []
-        for sport, dates in self.date_data.items():
-            all_raw.extend(dates)
-        all_data = np.array(all_raw, dtype="uint32")
-
-        # Find multi-activity days
-        unique, counts = np.unique(all_data, return_counts=True)
-        counts_multi = [ _ for _ in counts if _ > 1 and _ < 4 ]
-        multi_days = len(counts_multi)
+        multi_days = self.day_bitmap().multi_days(2)
 
         ret = { "multi trip days" : multi_days }
         return ret
 
+    # Days with at least each number of different hobbies, from two up
+    @memoized
+    def multi_activity_thresholds(self):
+
+        bitmap = self.day_bitmap()
+        most = int(bitmap.day_counts().max()) if bitmap.size else 0
+
+        ret = {}
+        for threshold in range(2, most + 1):
+            ret["{}+ hobbies".format(threshold)] = bitmap.multi_days(threshold)
+
+        return ret
+
+    # Days each pair of hobbies were both done
+    @memoized
+    def hobby_cooccurrence(self):
+
+        bitmap = self.day_bitmap()
+        both = bitmap.cooccurrence()
+
+        ret = {}
+        for i, a in enumerate(bitmap.hobbies):
+            for j in range(i + 1, len(bitmap.hobbies)):
+                ret["{} + {}".format(a, bitmap.hobbies[j])] = int(both[i, j])
+
+        return ret
+
+    # Days each hobby was the only one done
+    @memoized
+    def solo_days(self):
+
+        bitmap = self.day_bitmap()
+        return { h : int(n) for h, n in zip(bitmap.hobbies, bitmap.solo_days()) }
+
+    # Distinct days doing any dated hobby
+    # Counted exactly from the day bitmap, or estimated from the merged day
+    # sketches of the timeline's rollup if it's approximate, see Sketch
+    @memoized
+    def total_active_days(self):
+
+        sketches = self.timeline.sketches()
+        if sketches is not None:
+            active_days = sketches.distinct_days(self.hobbies())
+        else:
+            active_days = self.day_bitmap().multi_days(1)
+
+        ret = { "active days" : active_days }
+        return ret
+
+    # Gap and streak index for one hobby, built on first use
+    # Every gap and streak stat below is answered from it
+    @memoized
+    def gap_index(self, hobby):
+        return GapIndex(self.date_data[hobby], self.timeline.hobby_days(hobby))
+
+    # Local day of the latest activity in any dated hobby
+    @memoized
+    def last_day(self):
+
+        days = self.timeline.calendar().days[:self.timeline.type_ends["date"]]
+        return int(self.timeline.backend.max(days)) if days.size else None
+
     # Average day between trips
-    def average_days_between(self):
+    # Per-hobby stats take an optional tuple of hobbies to compute for, so
+    # the StatExecutor can split them between workers
+    # Hobbies with fewer than two dates have no gaps, and are left out
+    @memoized
+    def average_days_between(self, hobbies=None):
 
         ret = {}
-        for sport, data in self.date_data.items():
-            data = np.sort(data)
-            diffs = np.diff(data)
-            avg = np.average(diffs)
-            ret[sport] = math.floor(avg / SECONDS_IN_DAY)
+        for sport in self.hobbies(hobbies):
+            avg = self.gap_index(sport).mean_span()
+            if avg is not None:
+                ret[sport] = math.floor(avg / SECONDS_IN_DAY)
 
         return ret
         
     # Max days between trips
-    def max_days_between(self):
+    @memoized
+    def max_days_between(self, hobbies=None):
+
+        ret = {}
+        for sport in self.hobbies(hobbies):
+            index = self.gap_index(sport)
+            if index.count > 1:
+                ret[sport] = math.floor(index.max_span / SECONDS_IN_DAY)
+
+        return ret
+
+    # Longest streak of consecutive activity days
+    @memoized
+    def longest_streak(self, hobbies=None):
+
+        ret = {}
+        for sport in self.hobbies(hobbies):
+            ret[sport] = self.gap_index(sport).longest_streak()
+
+        return ret
+
+    # Streak still going as of the latest activity in the data
+    # A hobby's streak counts if it was done that day or the day before
+    @memoized
+    def current_streak(self, hobbies=None):
+
+        ret = {}
+        last_day = self.last_day()
+        for sport in self.hobbies(hobbies):
+            ret[sport] = self.gap_index(sport).streak_on(last_day)
+
+        return ret
+
+    # Longest gap between activity days, with the days on either side
+    @memoized
+    def longest_gap(self, hobbies=None):
+
+        ret = {}
+        for sport in self.hobbies(hobbies):
+            gap = self.gap_index(sport).longest_gap()
+            if gap is not None:
+                days, start, end = gap
+                ret[sport] = { "days" : days, "start" : day_string(start), "end" : day_string(end) }
+
+        return ret
+
+    # Number of gaps between activity days, bucketed by length
+    @memoized
+    def gap_histogram(self, hobbies=None):
 
         ret = {}
-        for sport, data in self.date_data.items():
-            data = np.sort(data)
-            diffs = np.diff(data)
-            max = np.max(diffs)
-            ret[sport] = math.floor(max / SECONDS_IN_DAY)
+        for sport in self.hobbies(hobbies):
+            for label, count in self.gap_index(sport).histogram():
+                ret["{} ({})".format(sport, label)] = count
 
         return ret
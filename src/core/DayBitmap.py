@@ -0,0 +1,102 @@
+# This file defines a day by hobby bitmap index
+# Each hobby gets one row of bits, one bit per local day from the first
+# activity to the last, set on days the hobby was done. Multi-activity and
+# co-occurrence queries are then a few bitwise operations over packed rows
+# instead of sorting and counting dates. Decades of days pack into a few
+# kilobytes per hobby
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+# Number of set bits in every byte value
+POPCOUNT = np.array([ bin(i).count("1") for i in range(256) ], dtype="uint8")
+
+# Count the set bits in an array of packed words, along its last axis
+# numpy 2 counts bits natively, older versions go through the lookup table
+def popcount(words):
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype="int64")
+    return POPCOUNT[np.ascontiguousarray(words).view("uint8")].sum(axis=-1, dtype="int64")
+
+# This class defines the bitmap
+#
+# Ex, for "Trail Mtb" on days 100, 101 and "Climbing" on days 101, 103:
+#   hobbies = [ "Trail Mtb", "Climbing" ]
+#   first   = 100
+#   rows    = [ 1 1 0 0 ]     - Trail Mtb, days 100 through 103
+#             [ 0 1 0 1 ]     - Climbing
+# Rows are packed 8 days to a byte with np.packbits, padded out to whole
+# 64 bit words so the bitwise operations work a word at a time
+class DayBitmap:
+
+    # Build the bitmap from a list of hobbies and each one's local day numbers
+    # Repeated days count once, so a hobby logged twice in a day is one day
+    def __init__(self, hobbies, days):
+
+        self.hobbies = list(hobbies)
+        self.ids = { h : i for i, h in enumerate(self.hobbies) }
+
+        days = [ np.asarray(d, dtype="int64") for d in days ]
+        present = [ d for d in days if d.size ]
+        self.first = int(min( d.min() for d in present )) if present else 0
+        self.size = int(max( d.max() for d in present )) - self.first + 1 if present else 0
+
+        packed = np.zeros((len(self.hobbies), (self.size + 63) // 64 * 8), dtype="uint8")
+        for i, d in enumerate(days):
+            marks = np.zeros(self.size, dtype="bool")
+            marks[d - self.first] = True
+            packed[i, :(self.size + 7) // 8] = np.packbits(marks)
+        self.rows = packed.view("uint64")
+
+        self.counts = None
+
+    # Packed row of days for one hobby
+    def row(self, hobby):
+        return self.rows[self.ids[hobby]]
+
+    # Number of hobbies done on each day, worked out on first use
+    def day_counts(self):
+
+        if self.counts is None:
+            bits = np.unpackbits(self.rows.view("uint8"), axis=1, count=self.size)
+            self.counts = bits.sum(axis=0, dtype="int64")
+        return self.counts
+
+    # Number of days with at least threshold different hobbies
+    def multi_days(self, threshold=2):
+        return int(np.count_nonzero(self.day_counts() >= threshold))
+
+    # Number of days each hobby was done
+    def active_days(self):
+        return popcount(self.rows)
+
+    # Number of days both hobbies were done
+    def days_with(self, a, b):
+        return int(popcount(self.row(a) & self.row(b)))
+
+    # Number of days hobby a was done but hobby b wasn't
+    def days_without(self, a, b):
+        return int(popcount(self.row(a) & ~self.row(b)))
+
+    # Number of days each hobby was the only one done
+    def solo_days(self):
+
+        if not self.hobbies:
+            return np.empty(0, dtype="int64")
+
+        # A day is solo for a hobby if the union of every other row misses it
+        # The union of the others is the prefix union OR the suffix union
+        before = np.bitwise_or.accumulate(self.rows, axis=0)
+        after = np.bitwise_or.accumulate(self.rows[::-1], axis=0)[::-1]
+        others = np.zeros_like(self.rows)
+        others[1:] |= before[:-1]
+        others[:-1] |= after[1:]
+
+        return popcount(self.rows & ~others)
+
+    # Days both hobbies were done, for every pair of hobbies
+    # Returns a square matrix, with each hobby's active days on the diagonal
+    def cooccurrence(self):
+        return popcount(self.rows[:, None, :] & self.rows[None, :, :])
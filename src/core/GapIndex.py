@@ -0,0 +1,92 @@
+# This file defines a gap and streak index for one hobby's activity
+# It's built once per hobby from the hobby's sorted dates, and every gap and
+# streak stat is answered from it, so adding stats doesn't add sorts or diffs
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+from Calendar import civil_from_days
+
+# Lower edges of the gap histogram buckets, in days
+GAP_BUCKETS = [ 1, 2, 3, 7, 14, 30, 90, 365 ]
+
+# This class defines the index
+#
+# Ex, for activities on days 10, 10, 11, 12, 20, 21:
+#   days  = [ 10, 11, 12, 20, 21 ]      - distinct activity days, sorted
+#   gaps  = [ 1, 1, 8, 1 ]              - days from each activity day to the next
+#   runs  = [ 3, 2 ]                    - lengths of each streak of consecutive days
+class GapIndex:
+
+    # Build the index from a hobby's sorted timestamps and their local day numbers
+    def __init__(self, timestamps, days):
+
+        timestamps = np.asarray(timestamps, dtype="int64")
+        self.count = int(timestamps.size)
+        self.first = int(timestamps[0]) if self.count else 0
+        self.last = int(timestamps[-1]) if self.count else 0
+
+        # The largest gap between raw timestamps, kept so the days between
+        # stats give exactly what they did when they diffed the timestamps
+        self.max_span = int(np.diff(timestamps).max()) if self.count > 1 else 0
+
+        self.days = np.unique(np.asarray(days, dtype="int64"))
+        self.gaps = np.diff(self.days)
+
+        # A streak ends wherever the gap to the next day is more than one
+        breaks = np.flatnonzero(self.gaps != 1)
+        ends = np.concatenate(( breaks, [ self.days.size - 1 ] )) if self.days.size else breaks
+        self.runs = np.diff(np.concatenate(( [ -1 ], ends )))
+
+    # Mean seconds between consecutive timestamps, None with fewer than two
+    # The diffs add up to last - first, so no diffs are needed
+    def mean_span(self):
+
+        if self.count < 2:
+            return None
+        return (self.last - self.first) / (self.count - 1)
+
+    # Longest streak of consecutive activity days
+    def longest_streak(self):
+        return int(self.runs.max()) if self.runs.size else 0
+
+    # Length of the streak still going on a given day
+    # A streak counts if its last day is that day or the day before
+    def streak_on(self, day):
+
+        if self.days.size == 0 or self.days[-1] < day - 1:
+            return 0
+        return int(self.runs[-1])
+
+    # Longest gap between activity days
+    # Returns ( gap in days, day before the gap, day after it ), or None
+    def longest_gap(self):
+
+        if self.gaps.size == 0:
+            return None
+        i = int(np.argmax(self.gaps))
+        return int(self.gaps[i]), int(self.days[i]), int(self.days[i + 1])
+
+    # Count of gaps in each bucket of GAP_BUCKETS
+    # Returns a list of ( label, count ), ex: ( "3-6 days", 4 )
+    def histogram(self, buckets=GAP_BUCKETS):
+
+        counts = np.bincount(np.searchsorted(buckets, self.gaps, side="right") - 1, minlength=len(buckets))
+        return [ ( bucket_label(buckets, i), int(counts[i]) ) for i in range(len(buckets)) ]
+
+# Label for one histogram bucket
+def bucket_label(buckets, i):
+
+    low = buckets[i]
+    if i == len(buckets) - 1:
+        return "{}+ days".format(low)
+    high = buckets[i + 1] - 1
+    if low == high:
+        return "{} day{}".format(low, "" if low == 1 else "s")
+    return "{}-{} days".format(low, high)
+
+# Format a day number as an ISO date, ex: 2022-01-01
+def day_string(day):
+
+    year, month, date = civil_from_days(np.array([ day ]))
+    return "{:04d}-{:02d}-{:02d}".format(int(year[0]), int(month[0]), int(date[0]))
@@ -0,0 +1,148 @@
+# This file defines typed columnar containers for loaded hobby data
+# A HobbyFrame holds one hobby's columns, converted once to the dtypes the
+# stats use, with its type as an enum and whether its dates are already sorted.
+# A HobbySet holds the frames for a whole data set, in load order
+#
+# The log reader's data dictionary is still accepted everywhere, through
+# as_hobby_set, so code and tests using the old format keep working
+#
+# Author: Josh McIntyre
+#
+import enum
+import numpy as np
+
+# The log types, with the string tags used in logs, the cache and the Timeline
+class HobbyType(enum.Enum):
+
+    MILEAGE = "mileage"
+    DATE = "date"
+    TRIPCOUNT = "tripcount"
+
+# Whether an array is in non-decreasing order
+def is_sorted(a):
+    return a.size < 2 or bool(np.all(a[1:] >= a[:-1]))
+
+# Mileage values that were recorded, leaving out the NaNs of rows whose
+# distance was bad. Returns the array itself if every value is good
+def recorded_mileage(mileage):
+
+    missing = np.isnan(mileage)
+    return mileage[~missing] if missing.any() else mileage
+
+# This class defines the columns for one hobby
+#
+#   dates   - int64 timestamps, in seconds
+#   mileage - float32 distance for each date, mileage hobbies only, else None
+#             NaN for a trip whose distance was bad, see recorded_mileage
+#   weights - int64 trips for each date, trip count hobbies only, else None
+#   ordered - True if dates are already in order, so sorts can be skipped
+#
+# Arrays already in the right dtype are used as they are rather than copied,
+# ex: columns memory mapped from the cache, which stores them in these dtypes.
+# Freshly parsed dates and weights are uint32, so those are converted once here,
+# and the stats never have to worry about unsigned arithmetic
+class HobbyFrame:
+
+    __slots__ = ( "name", "type", "dates", "mileage", "weights", "ordered" )
+
+    # Initialize with the hobby name, its HobbyType or type tag, and its columns
+    # Raises ValueError for an unknown type, or a column that doesn't line up
+    def __init__(self, name, hobby_type, dates, mileage=None, weights=None, ordered=None):
+
+        self.name = name
+        self.type = HobbyType(hobby_type)
+        self.dates = np.asarray(dates).astype("int64", copy=False)
+        self.mileage = None if mileage is None else np.asarray(mileage).astype("float32", copy=False)
+        self.weights = None if weights is None else np.asarray(weights).astype("int64", copy=False)
+        self.ordered = is_sorted(self.dates) if ordered is None else ordered
+
+        if self.type is HobbyType.MILEAGE and self.mileage is None:
+            raise ValueError("Mileage hobby has no mileage: {}".format(name))
+        for column in ( self.mileage, self.weights ):
+            if column is not None and column.size != self.dates.size:
+                raise ValueError("Columns don't line up for hobby: {}".format(name))
+
+    # Number of dates
+    def __len__(self):
+        return self.dates.size
+
+    # Build a frame from one entry of the log reader's data dictionary
+    @classmethod
+    def from_dict(cls, name, entry):
+        return cls(name, entry["type"], entry["dates"], entry.get("mileage"), entry.get("weights"))
+
+    # The frame as an entry of the log reader's data dictionary
+    def to_dict(self):
+
+        entry = { "dates" : self.dates, "type" : self.type.value }
+        if self.mileage is not None:
+            entry["mileage"] = self.mileage
+        if self.weights is not None:
+            entry["weights"] = self.weights
+        return entry
+
+# This class defines the frames for a data set, keyed by hobby in load order
+# Like the data dictionary, iterating a set gives the hobby names
+# Sets are never changed in place. Combining sets makes a new set holding the
+# same frames, so no column is copied. Frames themselves are never joined -
+# rows appended to a log are joined on disk by the cache, see LogCache.append
+class HobbySet:
+
+    __slots__ = ( "frames", )
+
+    # Initialize with a list of HobbyFrames
+    def __init__(self, frames=()):
+        self.frames = { f.name : f for f in frames }
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def __contains__(self, name):
+        return name in self.frames
+
+    def __getitem__(self, name):
+        return self.frames[name]
+
+    # Hobby names in load order
+    def names(self):
+        return list(self.frames)
+
+    # The frames in load order
+    def values(self):
+        return self.frames.values()
+
+    # Build a set from the log reader's data dictionary
+    @classmethod
+    def from_dict(cls, all_data):
+        return cls( HobbyFrame.from_dict(name, entry) for name, entry in all_data.items() )
+
+    # The set as the log reader's data dictionary
+    def to_dict(self):
+        return { f.name : f.to_dict() for f in self.values() }
+
+    # A set with the frames of this one and then those of the others
+    # A hobby in a later set replaces the one with the same name
+    def concat(self, *others):
+
+        joined = HobbySet()
+        joined.frames = dict(self.frames)
+        for other in others:
+            joined.frames.update(as_hobby_set(other).frames)
+        return joined
+
+    # A set without the named hobbies
+    def without(self, names):
+
+        names = set(names)
+        return HobbySet( f for f in self.values() if f.name not in names )
+
+# Compatibility adapter for the old data format
+# Returns the data as a HobbySet, whether it's already one or a data dictionary
+def as_hobby_set(data):
+
+    if isinstance(data, HobbySet):
+        return data
+    return HobbySet.from_dict(data)
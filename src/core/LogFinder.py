@@ -0,0 +1,58 @@
+# This file defines log discovery for HobbyStats
+# Directories are walked with os.scandir, which returns file types with the
+# listing, so finding logs costs one directory read instead of a stat per entry
+#
+# Author: Josh McIntyre
+#
+import fnmatch
+import os
+
+# This class defines a log finder for one log directory
+class LogFinder:
+
+    # Initialize with the log directory
+    # With recursive set, subdirectories are searched too. Hidden directories,
+    # like the cache directory, are always skipped
+    # include and exclude are lists of glob patterns, ex: [ "*.csv" ], matched
+    # against each log's path relative to the log directory. A log is found if
+    # it matches any include pattern (or there are none) and no exclude pattern
+    def __init__(self, logdir, recursive=False, include=None, exclude=None):
+
+        self.logdir = logdir
+        self.recursive = recursive
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+
+    # Find every log
+    # Returns a list of ( path, os.stat_result ), in directory order
+    # Paths are joined onto the log directory, as os.path.join would
+    def find(self):
+
+        found = []
+        self.scan(self.logdir, "", found)
+        return found
+
+    # Scan one directory, descending into subdirectories if recursive
+    def scan(self, path, relpath, found):
+
+        subdirs = []
+        with os.scandir(path) as entries:
+            for entry in entries:
+                rel = os.path.join(relpath, entry.name) if relpath else entry.name
+                if entry.is_file():
+                    if self.matches(rel):
+                        found.append( ( os.path.join(path, entry.name), entry.stat() ) )
+                elif self.recursive and entry.is_dir() and not entry.name.startswith("."):
+                    subdirs.append( ( entry.path, rel ) )
+
+        for subdir, rel in subdirs:
+            self.scan(subdir, rel, found)
+
+    # Check a relative path against the include and exclude patterns
+    def matches(self, relpath):
+
+        relpath = relpath.replace(os.sep, "/")
+        if self.include and not any( fnmatch.fnmatch(relpath, p) for p in self.include ):
+            return False
+
+        return not any( fnmatch.fnmatch(relpath, p) for p in self.exclude )
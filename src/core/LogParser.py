@@ -0,0 +1,256 @@
+# This file defines a class for turning rows of a hobby log into numpy arrays
+# It's kept apart from the log reader so worker processes can parse any slice
+# of a log without needing the rest of the reader's state
+#
+# Author: Josh McIntyre
+#
+import csv
+import sys
+import numpy as np
+from DateParser import DateParser, SAMPLE_SIZE, decode
+from ColumnTokenizer import as_str
+from Profiler import PROFILER
+
+# Log types the parser understands
+LOG_TYPES = [ "mileage", "date", "tripcount" ]
+
+# This class defines parsing methods for each log type
+class LogParser:
+
+    # Initialize the parser, optionally with a date format already inferred
+    # for the log. Parsing slices of one log should share the same format
+    def __init__(self, date_format=None):
+
+        self.date_format = date_format
+
+    # Infer the date format for a log from the rows at the top of it
+    @classmethod
+    def for_log(cls, logfile):
+
+        with open(logfile) as f:
+            return cls.for_rows(csv.DictReader(f))
+
+    # Infer the date format from the first rows of a csv.DictReader
+    @classmethod
+    def for_rows(cls, dr):
+
+        sample = []
+        for row in dr:
+            if len(sample) >= SAMPLE_SIZE or row.get("Date") is None:
+                break
+            sample.append(row["Date"])
+
+        return cls(DateParser().infer_format(sample))
+
+    # Determine the type of log from its header fields
+    # My logs have different formats:
+    # Date and mileage data
+    # Date and other data (like game stats, etc.)
+    # Year, location, trip count (for snowsports, park MTB)
+    @staticmethod
+    def type_of(fieldnames):
+
+        fn = fieldnames or []
+        if "Distance (mi)" in fn:
+            return "mileage"
+        elif "Years" in fn:
+            return "tripcount"
+        elif "Date" in fn:
+            return "date"
+        else:
+            return "unknown"
+
+    # Parse rows from a csv.DictReader into a data entry for the given log type
+    # The reader can start anywhere in the file, as long as it's on a row boundary
+    def parse_rows(self, dr, logfile, logtype):
+
+        if logtype == "mileage":
+            return self.parse_mileage_rows(dr, logfile, logtype)
+        elif logtype == "date":
+            return self.parse_date_rows(dr, logfile, logtype)
+        elif logtype == "tripcount":
+            return self.parse_trip_rows(dr, logfile, logtype)
+        else:
+            raise ValueError(f"Invalid log type for logfile: {logfile}, {logtype}")
+
+    # Parse tokenized columns from a ColumnTokenizer into a data entry for the
+    # given log type. This gives the same entry as parse_rows on the same rows
+    def parse_columns(self, columns, logfile, logtype):
+
+        if logtype == "mileage":
+            return self.parse_mileage_columns(columns, logfile, logtype)
+        elif logtype == "date":
+            return self.parse_date_columns(columns, logfile, logtype)
+        elif logtype == "tripcount":
+            # Trip logs have a row per season, so the row logic is shared
+            rows = ( { "Years" : y, "Trips" : t } for y, t in zip(as_str(columns["Years"]), as_str(columns["Trips"])) )
+            return self.parse_trip_rows(rows, logfile, logtype)
+        else:
+            raise ValueError(f"Invalid log type for logfile: {logfile}, {logtype}")
+
+    # Parse mileage type columns
+    # The whole mileage column is converted at once, and only if some value
+    # doesn't convert is it redone a value at a time to find the bad rows
+    # A row with a good date but a bad distance still counts as a trip, with a
+    # mileage of NaN, which the mileage stats leave out
+    def parse_mileage_columns(self, columns, logfile, logtype):
+
+        raw_dates = columns["Date"]
+        with PROFILER.span("to_array", file=logfile):
+            try:
+                mileage = columns["Distance (mi)"].astype("float64")
+            except ValueError:
+                mileage = self.parse_mileage_values(columns, logfile)
+
+        # Parse the dates and drop any rows where the date was bad
+        with PROFILER.span("parse_dates", file=logfile):
+            dates, valid = DateParser().parse(raw_dates, self.date_format)
+        self.report_bad_dates(logfile, raw_dates, valid)
+
+        with PROFILER.span("to_array", file=logfile):
+            dates = dates[valid].astype("uint32")
+            mileage = mileage.astype("float32")[valid]
+
+        return { "dates" : dates, "mileage" : mileage, "type" : logtype }
+
+    # Convert a mileage column a value at a time, reporting the bad rows
+    # Returns the values, with NaN for the rows that didn't convert
+    def parse_mileage_values(self, columns, logfile):
+
+        values = as_str(columns["Distance (mi)"])
+        mileage = np.full(len(values), np.nan)
+        for i, miles in enumerate(values):
+            try:
+                mileage[i] = float(miles)
+            except ValueError as e:
+                print("Bad data in {}: {}".format(logfile, { c : decode(v[i].item()) for c, v in columns.items() }), file=sys.stderr)
+                print(e, file=sys.stderr)
+
+        return mileage
+
+    # Parse date type columns
+    def parse_date_columns(self, columns, logfile, logtype):
+
+        raw_dates = columns["Date"]
+
+        # Parse the dates and drop any rows where the date was bad
+        with PROFILER.span("parse_dates", file=logfile):
+            dates, valid = DateParser().parse(raw_dates, self.date_format)
+        self.report_bad_dates(logfile, raw_dates, valid)
+
+        with PROFILER.span("to_array", file=logfile):
+            dates = dates[valid].astype("uint32")
+
+        return { "dates" : dates, "type" : logtype }
+
+    # Parse mileage type rows
+    # We'll go through several converstions here
+    # First, collect the raw date strings and mileage for every row
+    # Then, parse the whole date column at once with the bulk DateParser - it infers
+    # the format once per log and only falls back to dateutil for odd rows
+    # This gives Unix timestamps for later processing by the stat classes
+    # A row with a bad distance keeps its date, with a mileage of NaN
+    def parse_mileage_rows(self, dr, logfile, logtype):
+
+        raw_dates = []
+        mileage = []
+        with PROFILER.span("csv_rows", file=logfile):
+            for row in dr:
+                raw_dates.append(row["Date"])
+                try:
+                    miles = row["Distance (mi)"]
+                    mileage.append( float(miles) )
+                except ValueError as e:
+                    mileage.append(np.nan)
+                    print("Bad data in {}: {}".format(logfile, row), file=sys.stderr)
+                    print(e, file=sys.stderr)
+
+        # Parse the dates and drop any rows where the date was bad
+        with PROFILER.span("parse_dates", file=logfile):
+            dates, valid = DateParser().parse(raw_dates, self.date_format)
+        self.report_bad_dates(logfile, raw_dates, valid)
+
+        # Convert the lists to numpy arrays
+        with PROFILER.span("to_array", file=logfile):
+            mileage = np.array(mileage, dtype="float32")
+            dates = dates[valid].astype("uint32")
+            mileage = mileage[valid]
+
+        return { "dates" : dates, "mileage" : mileage, "type" : logtype }
+
+    # Parse date type rows
+    def parse_date_rows(self, dr, logfile, logtype):
+
+        with PROFILER.span("csv_rows", file=logfile):
+            raw_dates = [ row["Date"] for row in dr ]
+
+        # Parse the dates and drop any rows where the date was bad
+        with PROFILER.span("parse_dates", file=logfile):
+            dates, valid = DateParser().parse(raw_dates, self.date_format)
+        self.report_bad_dates(logfile, raw_dates, valid)
+
+        # Convert the list to a numpy array
+        with PROFILER.span("to_array", file=logfile):
+            dates = dates[valid].astype("uint32")
+
+        return { "dates" : dates, "type" : logtype }
+
+    # Print any date strings the bulk parser couldn't handle
+    def report_bad_dates(self, logfile, raw_dates, valid):
+
+        for i in np.flatnonzero(~valid):
+            print("Bad date in {}: {}".format(logfile, decode(raw_dates[i])), file=sys.stderr)
+
+    # Parse trip counter type rows
+    # Each season is stored once, as the year's timestamp with a weight of the
+    # number of trips, so memory scales with rows instead of trips
+    # A year range is split into one timestamp per year, with the trips spread
+    # evenly over them. Seasons with no trips left after the split are dropped
+    # Rows with a bad trip value are skipped, so every row parses on its own
+    # dateutil is imported here so it's only loaded when there are trip logs
+    def parse_trip_rows(self, dr, logfile, logtype):
+
+        import dateutil.parser
+
+        dates = []
+        weights = []
+        year_stamps = {}
+        with PROFILER.span("csv_rows", file=logfile):
+            for row in dr:
+                # Take the second half of the season as the year if dealing with a winter season
+                years = row["Years"]
+                if "/" in years:
+                    year = row["Years"].split("/")[1]
+                else:
+                    year = years
+                try:
+                    trips = int(row["Trips"])
+                except ValueError as e:
+                    print(f"Bad trip value in log {logfile}", file=sys.stderr)
+                    continue
+                try:
+                    # We may have a year range in the trip log, ex 2015-2019
+                    # Parse this out and evenly distribute trips into the data
+                    if "-" in year:
+                        year_start = int(year.split("-")[0])
+                        year_end = int(year.split("-")[1])
+                        years_range = list(range(year_start, year_end + 1))
+                    else:
+                        years_range = [year]
+                    weight = trips // len(years_range)
+                    for y in years_range:
+                        y = str(y)
+                        if y not in year_stamps:
+                            year_stamps[y] = dateutil.parser.parse(y).timestamp()
+                        if weight > 0:
+                            dates.append(year_stamps[y])
+                            weights.append(weight)
+                except ValueError as e:
+                    print("Bad year in {}: {}".format(logfile, row["Years"]), file=sys.stderr)
+
+        # Convert the lists to numpy arrays
+        with PROFILER.span("to_array", file=logfile):
+            dates = np.array(dates, dtype="uint32")
+            weights = np.array(weights, dtype="uint32")
+
+        return { "dates" : dates, "weights" : weights, "type" : logtype }
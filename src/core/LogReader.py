@@ -4,29 +4,15 @@
 # Author: Josh McIntyre
 #
 import csv
-import os
-import datetime
-import dateutil.parser
-import logging
-import threading
-from npimporter import np
-
-# Create a custom Thread class for multithreading log parsing
-# It's IO bound, so we can get some performance gain from processing in multiple threads
-class ReadThread(threading.Thread):
-
-    def __init__(self, func, logfile, logtype, data):
-
-        threading.Thread.__init__(self)
-
-        self.func = func
-        self.logfile = logfile
-        self.logtype = logtype
-        self.data = data
-
-    def run(self):
-
-        self.func(self.logfile, self.logtype, self.data)
+import sys
+import numpy as np
+from LogParser import LogParser, LOG_TYPES
+from LogFinder import LogFinder
+from LogCache import TAIL_WINDOW
+from HobbyFrame import HobbySet
+from Rollup import Rollup, ROLLUP_FORMAT, local_zone
+from ParallelReader import ParallelReader, DEFAULT_BACKEND, parse_bytes
+from Profiler import PROFILER
 
 # Define a generic/high level log reader class
 # This class will pull in all the logs in a specified dir and pull out
@@ -34,23 +20,44 @@ class ReadThread(threading.Thread):
 class LogReader:
 
     # Initialize the hobby reader with the log directory
-    def __init__(self, logdir):
+    # Optionally pass a LogCache to skip re-parsing logs that haven't changed
+    # With incremental set, logs that only grew since they were cached have just
+    # their new rows parsed and appended to the cached arrays
+    # Parsing runs on a pool of worker processes, one per core unless set
+    # recursive, include and exclude control which logs are found, see LogFinder
+    # backend picks how rows are split into fields, see ParallelReader.BACKENDS
+    def __init__(self, logdir, cache=None, incremental=False, workers=None, recursive=False, include=None, exclude=None, backend=DEFAULT_BACKEND):
 
         # Fetch log info for later processing
         self.logdir = logdir
+        self.cache = cache
+        self.incremental = incremental
+        self.workers = workers
+        self.backend = backend
+        self.finder = LogFinder(logdir, recursive=recursive, include=include, exclude=exclude)
         self.get_logs()
 
     # Get all the logs from the specified directory
+    # Raises ValueError if two logs would have the same hobby name
+    # Logs aren't opened here. A log's type is taken from the cache if it's
+    # unchanged, and is otherwise None until the log is opened to be parsed
     def get_logs(self):
 
-        all_entries = os.listdir(self.logdir)
-        files = [ os.path.join(self.logdir, _) for _ in all_entries if os.path.isfile(os.path.join(self.logdir, _)) ]
+        with PROFILER.span("list_dir"):
+            found = self.finder.find()
 
         log_file_info = []
-        for f in files:
-            log_file_info.append( ( f, self.detect_type(f) ))
+        hobbies = {}
+        for f, st in found:
+            hobby = self.pretty_hobby(f)
+            if hobby in hobbies:
+                raise ValueError("Logs {} and {} have the same hobby name: {}".format(hobbies[hobby], f, hobby))
+            hobbies[hobby] = f
+            logtype = self.cache.cached_type(f, st) if self.cache is not None else None
+            log_file_info.append( ( f, logtype ) )
 
         self.log_file_info = log_file_info
+        self.log_stats = dict(found)
 
     # Read logs by processing each individually and loading the relevant
     # data for each log in to a dictionary of numpy lists
@@ -74,119 +81,162 @@ class LogReader:
     # 3 trips = 3 2019 timestamps in the list
     # We'll be using timestamps for this, and dateutil.parser uses today at midnight
     # if only the year is included. This shouldn't effect most stats.
-    def read_logs(self):
+    #
+    # If a cache is set, unchanged logs are memory mapped from it instead of
+    # being parsed, and anything parsed fresh is written back to it
+    # Pass a list of log paths to only read those logs
+    def read_logs(self, logfiles=None):
 
         data = {}
-        threads = []
+        to_parse = []
         for logfile, logtype in self.log_file_info:
-                if logtype == "mileage":
-                    func = self.load_mileage_log
-                elif logtype == "date":
-                    func = self.load_date_log
-                elif logtype == "tripcount":
-                    func = self.load_trip_log
-                else:
-                    print(f"Error, invalid log type for logfile: {logfile}, {logtype}")
-                t = ReadThread(func, logfile, logtype, data)
-                t.start()
-                threads.append(t)
-
-        for t in threads:
-            t.join()
+                if logfiles is not None and logfile not in logfiles:
+                    continue
+                if self.cache is not None:
+                    with PROFILER.span("cache_lookup", file=logfile):
+                        cached = self.cache.lookup(logfile, self.log_stats.get(logfile))
+                    if cached is not None and logtype in ( None, cached["type"] ):
+                        data[self.pretty_hobby(logfile)] = cached
+                        continue
+
+                    if self.incremental and cached is None:
+                        with PROFILER.span("append_rows", file=logfile):
+                            appended = self.load_appended_rows(logfile, logtype)
+                        if appended is not None:
+                            data[self.pretty_hobby(logfile)] = appended
+                            continue
+
+                to_parse.append( ( logfile, logtype ) )
+
+        # Parse everything else across the worker pool
+        # Types are detected as each log is opened to be parsed
+        pr = ParallelReader(self.workers, backend=self.backend)
+        with PROFILER.span("parse_logs"):
+            parsed = pr.read(to_parse, fingerprint=self.cache.fingerprint if self.cache is not None else None)
+        for logfile, logtype in pr.types.items():
+            if logtype not in LOG_TYPES:
+                print(f"Error, invalid log type for logfile: {logfile}, {logtype}", file=sys.stderr)
+        for logfile, entry in parsed.items():
+            data[self.pretty_hobby(logfile)] = entry
+
+        # Write freshly parsed logs back to the cache
+        if self.cache is not None:
+            with PROFILER.span("cache_store"):
+                for logfile, entry in parsed.items():
+                    self.cache.store(logfile, self.pretty_hobby(logfile), entry, pr.fingerprints[logfile], pr.formats[logfile])
+                self.cache.save()
 
         return data
+
+    # Read logs as a HobbySet, the typed form of read_logs' data dictionary
+    # Pass a list of log paths to only read those logs
+    def read_frames(self, logfiles=None):
+
+        data = self.read_logs(logfiles)
+        with PROFILER.span("frames"):
+            return HobbySet.from_dict(data)
+
+    # Rollup tables for a HobbySet read by this reader, see Rollup
+    # A log's stored rollup is loaded from the cache if the log is unchanged,
+    # otherwise it's built from the log's frame and stored for next time
+    # Returns one Rollup over every hobby, in the set's order
+    def read_rollups(self, frames):
+
+        logfiles = { self.pretty_hobby(logfile) : logfile for logfile, _ in self.log_file_info }
+        zone = local_zone()
+        rollups = []
+        for hobby in frames:
+            logfile = logfiles.get(hobby)
+            stored = None
+            if self.cache is not None and logfile is not None:
+                stored = self.cache.load_rollup(logfile, ROLLUP_FORMAT, zone)
+
+            if stored is not None:
+                rollups.append(Rollup.from_columns({ "hobbies" : [ hobby ], "types" : [ frames[hobby].type.value ] }, stored))
+                continue
+
+            with PROFILER.span("build_rollup", file=logfile):
+                rollup = Rollup.build(frames[hobby])
+            if self.cache is not None and logfile is not None:
+                self.cache.store_rollup(logfile, rollup.columns()[1], ROLLUP_FORMAT, zone)
+            rollups.append(rollup)
+
+        if self.cache is not None:
+            self.cache.save()
+
+        return Rollup.merge(rollups, frames.names())
     
+    # Stream every mileage log into per-hobby accumulators
+    # This is the out-of-core path - logs are parsed in fixed-size chunks and
+    # only running summaries are kept, so memory stays flat however big they get
+    # Returns a dictionary of hobby to MileageAccumulator
+    def accumulate_mileage(self):
+
+        logs = [ ( logfile, logtype ) for logfile, logtype in self.log_file_info if logtype in ( "mileage", None ) ]
+        accs = ParallelReader(self.workers, backend=self.backend).accumulate(logs)
+
+        return { self.pretty_hobby(logfile) : acc for logfile, acc in accs.items() }
+
     # Helper that loads mileage type logs
-    # We'll go through several converstions here
-    # First, load the date string using dateutil.parser.parse - it's the most flexible parser
-    # This will create a Python datetime
-    # Then, convert it to a Unix timestamp for later processing by cupy/numpy
     def load_mileage_log(self, logfile, logtype, data):
 
-        with open(logfile) as f:
-            dr = csv.DictReader(f)
-            dates = []
-            mileage = []
-            for row in dr:
-                try:
-                    date_dt = dateutil.parser.parse(row["Date"])
-                    dates.append(date_dt.timestamp())
-
-                    miles = row["Distance (mi)"]
-                    mileage.append( float(miles) )
-                except ValueError as e:
-                    print("Bad data in {}: {}".format(logfile, row))
-                    print(e)
-
-        # Convert the list to a numpy array
-        dates = np.array(dates, dtype="uint32")
-        mileage = np.array(mileage, dtype="float32")
-
         # Load the parsed data into the global data dictionary
-        data[self.pretty_hobby(logfile)] = { "dates" : dates, "mileage" : mileage, "type" : logtype }
+        data[self.pretty_hobby(logfile)] = self.load_log(logfile, logtype, LogParser.for_log(logfile).date_format)
 
     # Helper that loads date type logs
     def load_date_log(self, logfile, logtype, data):
 
-        with open(logfile) as f:
-            dr = csv.DictReader(f)
-            dates = []
-            for row in dr:
-                try:
-                    date_dt = dateutil.parser.parse(row["Date"])
-                    dates.append(date_dt.timestamp())
-                except ValueError as e:
-                    print("Bad date in {}: {}".format(logfile, row["Date"]))
-
-        # Convert the list to a numpy array
-        dates = np.array(dates, dtype="uint32")
-
-        data[self.pretty_hobby(logfile)] = { "dates" : dates, "type" : logtype }
-        return dates
+        entry = self.load_log(logfile, logtype, LogParser.for_log(logfile).date_format)
+        data[self.pretty_hobby(logfile)] = entry
+        return entry["dates"]
 
     # Helper that loads trip counter type logs
     def load_trip_log(self, logfile, logtype, data):
 
-        dates = []
-        with open(logfile) as f:
-            dr = csv.DictReader(f)
-            for row in dr: 
-                # Take the second half of the season as the year if dealing with a winter season
-                years = row["Years"]
-                if "/" in years:
-                    year = row["Years"].split("/")[1]
-                else:
-                    year = years
-                try:
-                    trips = int(row["Trips"])
-                except ValueError as e:
-                    print(f"Bad trip value in log {logfile}")
-                try:
-                    # We may have a year range in the trip log, ex 2015-2019
-                    # Parse this out and evenly distribute trips into the data
-                    if "-" in year:
-                        year_start = int(year.split("-")[0])
-                        year_end = int(year.split("-")[1])
-                        years_range = list(range(year_start, year_end + 1))
-                    else:
-                        years_range = [year]
-                    for y in years_range:
-                        year_dt = dateutil.parser.parse(str(y))
-                        season_dates = [ year_dt.timestamp() ] * (trips // len(years_range))
-                        dates.extend(season_dates)
-                except ValueError as e:
-                    print("Bad year in {}: {}".format(logfile, row["Years"]))
-
-        # Convert the list to a numpy array
-        dates = np.array(dates, dtype="uint32")
-
-        data[self.pretty_hobby(logfile)] = { "dates" : dates, "type" : logtype }
+        data[self.pretty_hobby(logfile)] = self.load_log(logfile, logtype)
+
+    # Parse a whole log in this process with the reader's backend
+    def load_log(self, logfile, logtype, date_format=None):
+
+        with open(logfile, "rb") as f:
+            header = f.readline()
+            raw = f.read()
+
+        fieldnames = next(csv.reader([ header.decode() ]))
+        return parse_bytes(raw, ( logfile, logtype, len(header), len(header) + len(raw), fieldnames, date_format, self.backend ))
+
+    # Parse only the rows appended to a log since it was last cached
+    # The cache remembers the byte offset it read up to, the header line and the
+    # date format. The log is read once, from just before the offset so the
+    # cache can fingerprint the new tail without reading it again
+    # If the log was truncated or rewritten, or the new data ends mid-row, this
+    # returns None and the caller falls back to a full parse
+    def load_appended_rows(self, logfile, logtype=None):
+
+        state = self.cache.append_state(logfile, logtype)
+        if state is None:
+            return None
+
+        offset, header, date_format, logtype = state
+        start = max(offset - TAIL_WINDOW, 0)
+        with open(logfile, "rb") as f:
+            f.seek(start)
+            buf = f.read()
+        raw = buf[offset - start:]
+
+        if raw and not raw.endswith(b"\n"):
+            return None
+
+        fieldnames = next(csv.reader([ header ]))
+        if date_format is None:
+            date_format = LogParser.for_log(logfile).date_format
+        entry = parse_bytes(raw, ( logfile, logtype, offset, offset + len(raw), fieldnames, date_format, self.backend ))
+
+        return self.cache.append(logfile, entry, offset + len(raw), tail=buf)
 
     # Determine the type of hobby log we're dealing with
-    # My logs have different formats:
-    # Date and mileage data
-    # Date and other data (like game stats, etc.)
-    # Year, location, trip count (for snowsports, park MTB)
+    # Reading logs detects types from the header as they're parsed, this is
+    # for checking a single log on its own
     def detect_type(self, logfile):
 
         with open(logfile) as f:
@@ -194,24 +244,27 @@ class LogReader:
             try:
                 fn = dr.fieldnames
             except Exception as e:
-                print("Error determining type for log {}: ".format(logfile))
-                return "unknown"
-            if "Distance (mi)" in fn:
-                return "mileage"
-            elif "Years" in fn:
-                return "tripcount"
-            elif "Date" in fn:
-                return "date"
-            else:
+                print("Error determining type for log {}: ".format(logfile), file=sys.stderr)
                 return "unknown"
+            return LogParser.type_of(fn)
 
     # Pretty hobby name from the file path
+    # Logs found in subdirectories, when reading recursively, keep the path
+    # relative to the log directory so logs with the same file name don't clash
+    # Ex: logs/2019/trail_mtb.csv is "2019/Trail Mtb"
     def pretty_hobby(self, logfile):
 
-        strip_path = logfile.split("/")[-1]
-        strip_path = strip_path.split("\\")[-1]
-        strip_ext = strip_path.replace(".csv", "")
-        strip_under = strip_ext.replace("_", " ")
-        title = strip_under.title()
+        strip_path = logfile.replace("\\", "/")
+        logdir = self.logdir.replace("\\", "/").rstrip("/") + "/"
+        if self.finder.recursive and strip_path.startswith(logdir):
+            parts = strip_path[len(logdir):].split("/")
+        else:
+            parts = strip_path.split("/")[-1:]
+
+        titles = []
+        for part in parts:
+            strip_ext = part.replace(".csv", "")
+            strip_under = strip_ext.replace("_", " ")
+            titles.append(strip_under.title())
 
-        return title
+        return "/".join(titles)
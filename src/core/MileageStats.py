@@ -3,7 +3,14 @@
 #
 # Author: Josh McIntyre
 #
-from npimporter import np
+import functools
+import numpy as np
+from Timeline import Timeline
+from HobbyFrame import HobbySet, recorded_mileage
+from RollingWindow import RollingWindow, WINDOWS
+from Sketch import QUANTILES, exact_quantile
+from StatMemo import memoized
+from StatRegistry import bind_funcs
 
 # Time delta defs for doing raw unix timestamp operations
 SECONDS_IN_YEAR = 31536000
@@ -12,39 +19,44 @@ SECONDS_IN_YEAR = 31536000
 class MileageStats:
 
     # Load the data on initialization
-    def __init__(self, date_data):
+    # In streaming mode, pass per-hobby MileageAccumulators from
+    # LogReader.accumulate_mileage instead, and stats are answered from those
+    # date_data is a HobbySet, or the log reader's data dictionary
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, date_data=None, accumulators=None, timeline=None):
+
+        self.load_data(date_data, accumulators, timeline)
+
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("mileage", self)
+
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, date_data=None, accumulators=None, timeline=None):
 
         # Load the date data for the module
-        self.date_data = date_data
-
-        # Register the functions with titles
-        self.funcs = [
-                        ( "Overall {}: {}", self.total_mileage, "Total overall mileage" ),
-                        ( "Overall {}: {}", self.total_years, "Total overall years" ),
-                        ( "Total mileage for {}: {}", self.total_mileage_hobby, "Total mileage for activity" ),
-                        ( "Average mileage for {}: {}", self.avg_mileage_hobby, "Average mileage for activity" ),
-                        ( "Maximum mileage for {}: {}", self.max_mileage_hobby, "Maximum mileage for activity" ),
-                        ( "Minimum mileage for {}: {}", self.min_mileage_hobby, "Minimum mileage for activity" ),
-                    ]
+        self.date_data = date_data if date_data is not None else HobbySet()
+        self.accumulators = accumulators
+        self.timeline = timeline if timeline is not None else Timeline(self.date_data)
+        self.memo = self.timeline.memo
 
     # Define individual methods for processing each desired statistic
 
     # Total mileage overall
+    @memoized
     def total_mileage(self):
 
-        # Format data - collapse all datestamps into one array
-        all_raw_mileage = []
-        all_raw_dates = []
-        for sport, data in self.date_data.items():
-            # Only look at hobbies with mileage data
-            if "mileage" in data.keys():
-                all_raw_mileage.extend(data["mileage"])
-                all_raw_dates.extend(data["dates"])
-        all_data_mileage = np.array(all_raw_mileage, dtype="float32")
-        all_data_dates = np.array(all_raw_dates, dtype="uint32")
-
-        # Total trips - just get the size of the array
-        total_mileage = all_data_mileage.sum()
+        if self.accumulators is not None:
+            total_mileage = sum( acc.total for acc in self.accumulators.values() )
+            ret = { "total mileage" : round(total_mileage, 2) }
+            return ret
+
+        # Total mileage - just sum the mileage column of the index, or the
+        # rollup's monthly sums
+        if self.timeline.rollup is not None:
+            total_mileage = self.timeline.rollup.total_mileage()
+        else:
+            total_mileage = self.timeline.backend.sum(recorded_mileage(self.timeline.mileage))
         float_mileage = float(total_mileage)
         rounded_mileage = round(float_mileage, 2)
 
@@ -52,67 +64,77 @@ class MileageStats:
         return ret
 
     # Total years overall
+    @memoized
     def total_years(self):
 
-        # Format data - collapse all datestamps into one array
-        all_raw_mileage = []
-        all_raw_dates = []
-        for sport, data in self.date_data.items():
-            # Only look at hobbies with mileage data
-            if "mileage" in data.keys():
-                all_raw_mileage.extend(data["mileage"])
-                all_raw_dates.extend(data["dates"])
-        all_data_mileage = np.array(all_raw_mileage, dtype="float32")
-        all_data_dates = np.array(all_raw_dates, dtype="uint32")
-
-        # Total trips - just get the size of the array
-        total_mileage = all_data_mileage.sum()
-        float_mileage = float(total_mileage)
-        rounded_mileage = round(float_mileage, 2)
+        if self.accumulators is not None:
+            accs = [ acc for acc in self.accumulators.values() if acc.first_date is not None ]
+            diff = max( acc.last_date for acc in accs ) - min( acc.first_date for acc in accs )
+            ret = { "total years" : int( diff / SECONDS_IN_YEAR ) }
+            return ret
 
-        # Total years - sort and subtract the latest from the oldest datestamp
+        # Total years - subtract the oldest from the latest datestamp
         # Then, divide by seconds per year to get the total years logged
-        all_data_dates.sort()
-        diff = all_data_dates[-1] - all_data_dates[0]
+        if self.timeline.rollup is not None:
+            first, last = self.timeline.rollup.span([ "mileage" ])
+            diff = last - first
+        else:
+            # Every mileage hobby's datestamps, as a view of the index
+            all_data_dates = self.timeline.mileage_dates()
+            backend = self.timeline.backend
+            diff = backend.max(all_data_dates) - backend.min(all_data_dates)
         years = int( diff / SECONDS_IN_YEAR )
 
         ret = { "total years" : years }
         return ret
 
     # Total mileage for each hobby
-    def total_mileage_hobby(self):
-        return self.samm_mileage_hobby("sum")
+    # Per-hobby stats take an optional tuple of hobbies to compute for, so
+    # the StatExecutor can split them between workers
+    def total_mileage_hobby(self, hobbies=None):
+        return self.samm_mileage_hobby("sum", hobbies)
 
     # Average mileage for each hobby
-    def avg_mileage_hobby(self):
-        return self.samm_mileage_hobby("avg")
+    def avg_mileage_hobby(self, hobbies=None):
+        return self.samm_mileage_hobby("avg", hobbies)
 
     # Maximum mileage for each hobby
-    def max_mileage_hobby(self):
-        return self.samm_mileage_hobby("max")
+    def max_mileage_hobby(self, hobbies=None):
+        return self.samm_mileage_hobby("max", hobbies)
 
     # Minimum mileage for each hobby
-    def min_mileage_hobby(self):
-        return self.samm_mileage_hobby("min")
+    def min_mileage_hobby(self, hobbies=None):
+        return self.samm_mileage_hobby("min", hobbies)
 
     # We can use a generic method for dealing with SAMM (Sum, Avg, Min, Max) statistics
-    def samm_mileage_hobby(self, desired_stat):
+    @memoized
+    def samm_mileage_hobby(self, desired_stat, hobbies=None):
+
+        if self.accumulators is not None:
+            return self.samm_mileage_accumulated(desired_stat, hobbies)
+        if self.timeline.rollup is not None:
+            return self.samm_mileage_rollup(desired_stat, hobbies)
 
         ret = {}
-        for hobby, data in self.date_data.items():
+        backend = self.timeline.backend
+        # Only mileage logs have a mileage column
+        for hobby in self.timeline.hobbies_of([ "mileage" ]):
+            if hobbies is not None and hobby not in hobbies:
+                continue
 
-            # Don't process non-mileage logs
-            if data["type"] != "mileage":
+            # Skip logs that had no usable rows
+            mileage = recorded_mileage(self.timeline.hobby_mileage(hobby))
+            if mileage.size == 0:
                 continue
 
             if desired_stat == "sum":
-                raw_stat = data["mileage"].sum()
+                raw_stat = backend.sum(mileage)
             elif desired_stat == "avg":
-                raw_stat = np.mean(data["mileage"])
+                raw_stat = backend.mean(mileage)
             elif desired_stat == "max":
-                raw_stat = data["mileage"].max()
+                raw_stat = backend.max(mileage)
             elif desired_stat == "min":
-                raw_stat = data["mileage"].min()
+                raw_stat = backend.min(mileage)
             else:
                 raise Exception("Invalid desired stat: should be sum, avg, max, min")
 
@@ -123,3 +145,111 @@ class MileageStats:
 
         return ret
 
+    # Rolling mileage sums for one mileage hobby, see RollingWindow
+    # Trips with a bad distance add nothing to the sums
+    @memoized
+    def rolling_mileage(self, hobby):
+
+        mileage = self.timeline.hobby_mileage(hobby)
+        return RollingWindow(self.timeline.hobby_days(hobby), np.where(np.isnan(mileage), 0, mileage))
+
+    # Most mileage in any rolling window, for each hobby and window length
+    def peak_rolling_mileage(self, hobbies=None):
+        return self.rolling_mileage_hobby("peak", hobbies)
+
+    # Mileage in each rolling window ending on the hobby's latest activity
+    def latest_rolling_mileage(self, hobbies=None):
+        return self.rolling_mileage_hobby("latest", hobbies)
+
+    # Generic method for the rolling mileage stats, picking a point of each series
+    # Streaming accumulators keep no per-day data, so there are no series for them
+    @memoized
+    def rolling_mileage_hobby(self, desired_stat, hobbies=None):
+
+        ret = {}
+        for hobby in self.timeline.hobbies_of([ "mileage" ]):
+            if hobbies is not None and hobby not in hobbies:
+                continue
+
+            rolling = self.rolling_mileage(hobby)
+            for window in WINDOWS:
+                if desired_stat == "peak":
+                    raw_stat = rolling.peak(window)
+                elif desired_stat == "latest":
+                    raw_stat = rolling.latest(window)
+                else:
+                    raise Exception("Invalid desired stat: should be peak, latest")
+                ret["{} ({} days)".format(hobby, window)] = round(float(raw_stat), 2)
+
+        return ret
+
+    # Median, 90th and 99th percentile mileage for each hobby
+    # Computed exactly from the index, or estimated from quantile sketches when
+    # streaming or if the timeline is approximate, see Sketch for the error bound
+    @memoized
+    def mileage_percentiles(self, hobbies=None):
+
+        ret = {}
+        for hobby, quantile in self.mileage_quantiles(hobbies).items():
+            for q, label in QUANTILES:
+                ret["{} ({})".format(hobby, label)] = round(quantile(q), 2)
+
+        return ret
+
+    # A quantile function for each hobby's mileage, skipping hobbies with none
+    def mileage_quantiles(self, hobbies=None):
+
+        if self.accumulators is not None:
+            sketches = { hobby : acc.sketch for hobby, acc in self.accumulators.items() }
+        elif self.timeline.sketches() is not None:
+            sketches = { hobby : self.timeline.sketches().mileage_sketch(hobby) for hobby in self.timeline.hobbies_of([ "mileage" ]) }
+        else:
+            mileage = { hobby : recorded_mileage(self.timeline.hobby_mileage(hobby)) for hobby in self.timeline.hobbies_of([ "mileage" ]) }
+            return { hobby : functools.partial(exact_quantile, m) for hobby, m in mileage.items() if (hobbies is None or hobby in hobbies) and m.size }
+
+        return { hobby : s.quantile for hobby, s in sketches.items() if (hobbies is None or hobby in hobbies) and s.count }
+
+    # SAMM statistics answered from the timeline's rollup
+    def samm_mileage_rollup(self, desired_stat, hobbies=None):
+
+        ret = {}
+        for hobby in self.timeline.hobbies_of([ "mileage" ]):
+            if hobbies is not None and hobby not in hobbies:
+                continue
+
+            raw_stat = self.timeline.rollup.hobby_mileage(hobby, desired_stat)
+
+            # Skip logs that had no usable rows
+            if raw_stat is None:
+                continue
+
+            ret[hobby] = round(raw_stat, 2)
+
+        return ret
+
+    # SAMM statistics answered from streaming accumulators
+    def samm_mileage_accumulated(self, desired_stat, hobbies=None):
+
+        ret = {}
+        for hobby, acc in self.accumulators.items():
+            if hobbies is not None and hobby not in hobbies:
+                continue
+
+            # Skip logs that had no usable rows
+            if acc.count == 0:
+                continue
+
+            if desired_stat == "sum":
+                raw_stat = acc.total
+            elif desired_stat == "avg":
+                raw_stat = acc.mean
+            elif desired_stat == "max":
+                raw_stat = acc.max
+            elif desired_stat == "min":
+                raw_stat = acc.min
+            else:
+                raise Exception("Invalid desired stat: should be sum, avg, max, min")
+
+            ret[hobby] = round(raw_stat, 2)
+
+        return ret
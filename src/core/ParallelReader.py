@@ -0,0 +1,317 @@
+# This file defines a parallel ingest engine for hobby logs
+# Parsing is CPU bound (csv rows and date strings), so threads just take turns
+# on the GIL. Instead, logs are split into row-aligned byte ranges and parsed
+# by a bounded pool of worker processes
+#
+# Author: Josh McIntyre
+#
+import csv
+import functools
+import io
+import itertools
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from LogParser import LogParser, LOG_TYPES
+from ColumnTokenizer import ColumnTokenizer
+from DateParser import SAMPLE_SIZE
+from MileageAccumulator import MileageAccumulator
+from Profiler import PROFILER, profiled_call
+
+# Logs bigger than this are split into chunks of roughly this size
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Rows parsed at a time when streaming a chunk into an accumulator
+STREAM_ROWS = 65536
+
+# Array columns a parsed chunk can return, with their dtypes
+COLUMN_DTYPES = { "dates" : "uint32", "mileage" : "float32", "weights" : "uint32" }
+
+# Ways of splitting rows into fields
+# csv - csv.DictReader, a dict of every column for every row
+# columns - ColumnTokenizer, only the columns the stats use, straight into arrays
+BACKENDS = [ "csv", "columns" ]
+DEFAULT_BACKEND = "columns"
+
+# Parse one chunk of a log
+# A task is ( logfile, logtype, start, end, fieldnames, date_format, backend ),
+# where start and end are byte offsets on row boundaries past the header
+def parse_chunk(task):
+
+    logfile, logtype, start, end, fieldnames, date_format, backend = task
+    with PROFILER.span("read_chunk", file=logfile):
+        with open(logfile, "rb") as f:
+            f.seek(start)
+            raw = f.read(end - start)
+
+    return parse_bytes(raw, task)
+
+# Parse the bytes of one chunk, already read from the log
+def parse_bytes(raw, task):
+
+    logfile, logtype, start, end, fieldnames, date_format, backend = task
+    if backend == "columns":
+        with PROFILER.span("tokenize", file=logfile):
+            columns = ColumnTokenizer.for_type(fieldnames, logtype).tokenize(raw)
+        entry = LogParser(date_format).parse_columns(columns, logfile, logtype)
+        PROFILER.count(logfile, rows=len(next(iter(columns.values()))), bytes=end - start)
+        return entry
+
+    dr = csv.DictReader(io.StringIO(raw.decode()), fieldnames=fieldnames)
+    entry = LogParser(date_format).parse_rows(dr, logfile, logtype)
+    PROFILER.count(logfile, rows=dr.line_num, bytes=end - start)
+
+    return entry
+
+# Stream one chunk of a mileage log into an accumulator
+# Rows are parsed STREAM_ROWS at a time, so only one batch of arrays is ever
+# alive, and only the small accumulator goes back to the parent
+# The columns backend parses the whole chunk at once - its arrays are a few
+# bytes per row, so a chunk's worth is still small
+def accumulate_chunk(task):
+
+    logfile, logtype, start, end, fieldnames, date_format, backend = task
+    with PROFILER.span("read_chunk", file=logfile):
+        with open(logfile, "rb") as f:
+            f.seek(start)
+            raw = f.read(end - start)
+
+    if backend == "columns":
+        acc = MileageAccumulator()
+        acc.update(parse_bytes(raw, task))
+        return acc
+
+    dr = csv.DictReader(io.StringIO(raw.decode()), fieldnames=fieldnames)
+    del raw
+
+    parser = LogParser(date_format)
+    acc = MileageAccumulator()
+    while True:
+        batch = list(itertools.islice(dr, STREAM_ROWS))
+        if not batch:
+            break
+        acc.update(parser.parse_rows(batch, logfile, logtype))
+    PROFILER.count(logfile, rows=dr.line_num, bytes=end - start)
+
+    return acc
+
+# Worker side of a chunk parse
+# The arrays are written into a shared memory block rather than pickled back,
+# and only the block name and column layout go back to the parent
+def parse_chunk_shared(task):
+
+    entry = parse_chunk(task)
+    columns = [ ( c, entry[c].size ) for c in COLUMN_DTYPES if c in entry ]
+    nbytes = sum( np.dtype(COLUMN_DTYPES[c]).itemsize * n for c, n in columns )
+
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    offset = 0
+    for c, n in columns:
+        view = np.ndarray((n,), dtype=COLUMN_DTYPES[c], buffer=shm.buf, offset=offset)
+        view[:] = entry[c]
+        offset += view.nbytes
+    del view
+    shm.close()
+
+    return shm.name, columns
+
+# Parent side of a chunk parse - copy the arrays out and free the block
+def collect_shared(name, columns, logtype):
+
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        entry = { "type" : logtype }
+        offset = 0
+        for c, n in columns:
+            view = np.ndarray((n,), dtype=COLUMN_DTYPES[c], buffer=shm.buf, offset=offset)
+            entry[c] = view.copy()
+            offset += view.nbytes
+        del view
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return entry
+
+# This class defines a parallel reader for a set of logs
+class ParallelReader:
+
+    # Initialize the reader with the worker count, defaulting to the core count
+    # backend picks how rows are split into fields, see BACKENDS
+    def __init__(self, workers=None, chunk_size=CHUNK_SIZE, backend=DEFAULT_BACKEND):
+
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.backend = backend
+
+    # Parse a list of ( logfile, logtype ) pairs
+    # A type of None means it isn't known yet, and is detected from the header
+    # Returns a dictionary of logfile to data entry. Chunks are stitched back
+    # together in file order, so the arrays match a serial parse exactly
+    #
+    # Each log is opened once. Its header, date format sample and chunk plan all
+    # come from one memory map, and when parsing in this process the rows are
+    # parsed straight out of it. Worker processes read their own chunks
+    #
+    # Pass a fingerprint function, ex: LogCache.fingerprint, to fingerprint
+    # each log from the same map. After reading, the detected type, date format
+    # and fingerprint of each log are in types, formats and fingerprints
+    def read(self, logs, fingerprint=None):
+
+        with PROFILER.span("plan_chunks"):
+            plans = [ self.plan_log(logfile, logtype, fingerprint) for logfile, logtype in logs ]
+        self.record_plans(plans)
+
+        tasks = [ task for plan in plans for task in plan["tasks"] ]
+        try:
+            if self.workers == 1 or len(tasks) < 2:
+                results = [ parse_bytes(plan["data"][task[2]:task[3]], task) for plan in plans for task in plan["tasks"] ]
+            else:
+                # Start the resource tracker before the workers so they all share it
+                # Blocks created by a worker are then freed by the parent's unlink
+                resource_tracker.ensure_running()
+                shared = self.run_tasks(parse_chunk_shared, tasks)
+                with PROFILER.span("collect_shared"):
+                    results = [ collect_shared(name, columns, task[1]) for ( name, columns ), task in zip(shared, tasks) ]
+        finally:
+            for plan in plans:
+                self.close_plan(plan)
+
+        # Group chunk results by log, keeping chunk order
+        chunks = {}
+        for task, entry in zip(tasks, results):
+            chunks.setdefault(task[0], []).append(entry)
+
+        with PROFILER.span("concat_chunks"):
+            return { logfile : self.concat_chunks(entries) for logfile, entries in chunks.items() }
+
+    # Stream a list of ( logfile, logtype ) mileage logs into accumulators
+    # Logs are read one chunk at a time and never held as whole arrays
+    # Logs with a type of None are checked, and skipped if they aren't mileage logs
+    # Returns a dictionary of logfile to MileageAccumulator
+    def accumulate(self, logs):
+
+        tasks = []
+        with PROFILER.span("plan_chunks"):
+            for logfile, logtype in logs:
+                plan = self.plan_log(logfile, logtype)
+                self.close_plan(plan)
+                if plan["type"] == "mileage":
+                    tasks.extend(plan["tasks"])
+
+        if self.workers == 1 or len(tasks) < 2:
+            results = map(accumulate_chunk, tasks)
+        else:
+            results = self.run_tasks(accumulate_chunk, tasks)
+
+        accs = {}
+        for task, acc in zip(tasks, results):
+            accs.setdefault(task[0], MileageAccumulator()).merge(acc)
+
+        return accs
+
+    # Keep the type, date format and fingerprint found for each planned log
+    def record_plans(self, plans):
+
+        self.types = { plan["logfile"] : plan["type"] for plan in plans }
+        self.formats = { plan["logfile"] : plan["date_format"] for plan in plans }
+        self.fingerprints = { plan["logfile"] : plan["fingerprint"] for plan in plans if "fingerprint" in plan }
+
+    # Run a worker function over tasks on a process pool, in task order
+    # When profiling, each worker collects its own spans and sends them back
+    def run_tasks(self, func, tasks):
+
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks))) as pool:
+            if not PROFILER.enabled:
+                return list(pool.map(func, tasks))
+
+            results = []
+            for result, profile in pool.map(functools.partial(profiled_call, func, PROFILER.memory), tasks):
+                PROFILER.merge(profile)
+                results.append(result)
+
+        return results
+
+    # Split a log into row-aligned byte ranges
+    # Returns the list of tasks for the log, or no tasks if it isn't a known type
+    def plan_chunks(self, logfile, logtype=None):
+
+        plan = self.plan_log(logfile, logtype)
+        self.close_plan(plan)
+        return plan["tasks"]
+
+    # Open a log once and plan how to parse it
+    # The log is memory mapped, and everything about it is worked out from the map:
+    # its header and type, the date format of its first rows, its fingerprint if
+    # asked for, and its chunks. Each chunk boundary is moved forward to just
+    # past the next newline. Logs with quote characters could have newlines
+    # inside a field, so they aren't split
+    # Returns a plan dictionary, with the map left open as "data"
+    def plan_log(self, logfile, logtype=None, fingerprint=None):
+
+        with open(logfile, "rb") as f:
+            st = os.fstat(f.fileno())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+        size = len(data)
+
+        header_end = data.find(b"\n") + 1 or size
+        fieldnames = next(csv.reader([ data[:header_end].decode().rstrip("\r\n") ]), [])
+        if logtype is None:
+            logtype = LogParser.type_of(fieldnames)
+
+        plan = { "logfile" : logfile, "type" : logtype, "date_format" : None, "data" : data, "tasks" : [] }
+        if logtype not in LOG_TYPES:
+            return plan
+        if fingerprint is not None:
+            plan["fingerprint"] = fingerprint(data, st)
+
+        plan["date_format"] = LogParser.for_rows(self.sample_rows(data, header_end, fieldnames)).date_format
+
+        boundaries = [ header_end ]
+        if size - header_end > self.chunk_size and data.find(b'"') == -1:
+            target = header_end + self.chunk_size
+            while target < size:
+                newline = data.find(b"\n", target - 1)
+                if newline == -1 or newline + 1 >= size:
+                    break
+                boundaries.append(newline + 1)
+                target = newline + 1 + self.chunk_size
+        boundaries.append(size)
+
+        plan["tasks"] = [ ( logfile, logtype, boundaries[i], boundaries[i + 1], fieldnames, plan["date_format"], self.backend ) for i in range(len(boundaries) - 1) ]
+        return plan
+
+    # A csv.DictReader over the first rows of a mapped log, for sampling dates
+    def sample_rows(self, data, header_end, fieldnames):
+
+        end = header_end
+        for _ in range(SAMPLE_SIZE):
+            newline = data.find(b"\n", end)
+            if newline == -1:
+                end = len(data)
+                break
+            end = newline + 1
+
+        return csv.DictReader(io.StringIO(data[header_end:end].decode()), fieldnames=fieldnames)
+
+    # Unmap a planned log
+    def close_plan(self, plan):
+
+        if isinstance(plan["data"], mmap.mmap):
+            plan["data"].close()
+        plan["data"] = b""
+
+    # Join the chunk entries of one log back into a single entry
+    def concat_chunks(self, entries):
+
+        if len(entries) == 1:
+            return entries[0]
+
+        entry = { "type" : entries[0]["type"] }
+        for column in COLUMN_DTYPES:
+            if column in entries[0]:
+                entry[column] = np.concatenate([ e[column] for e in entries ])
+
+        return entry
@@ -0,0 +1,73 @@
+# This file defines a rolling window engine for per-hobby time series
+# A rolling total, ex: trips in the 30 days up to each activity, is the
+# difference of two prefix sums, with the window start found by binary search.
+# A whole series then costs one cumulative sum plus a searchsorted per point,
+# O(n log n), instead of re-adding every row in the window at every point
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+# Window lengths reported by the rolling stats, in days
+WINDOWS = [ 7, 30, 90, 365 ]
+
+# This class defines rolling totals over one hobby's activity
+# Days are local day numbers (see Calendar.local_days), and a window of w days
+# ending on day d covers days d - w + 1 through d
+class RollingWindow:
+
+    # Initialize with the day of every activity, and optionally a value for
+    # each one, ex: its mileage or trip weight. With no values each counts once
+    def __init__(self, days, values=None):
+
+        days = np.asarray(days, dtype="int64")
+        values = np.ones(days.size, dtype="int64") if values is None else np.asarray(values)
+        if days.size > 1 and np.any(days[1:] < days[:-1]):
+            order = np.argsort(days, kind="stable")
+            days = days[order]
+            values = values[order]
+
+        # Integer values are summed exactly, anything else in float64
+        dtype = "int64" if values.dtype.kind in "iub" else "float64"
+        self.days = days
+        self.totals = np.concatenate(( np.zeros(1, dtype=dtype), np.cumsum(values, dtype=dtype) ))
+
+    # Rolling totals for windows ending on each of the given days
+    def at(self, points, window):
+
+        points = np.asarray(points, dtype="int64")
+        ends = np.searchsorted(self.days, points, side="right")
+        starts = np.searchsorted(self.days, points - window, side="right")
+        return self.totals[ends] - self.totals[starts]
+
+    # Rolling totals at every distinct activity day
+    # Returns ( days, totals )
+    def at_dates(self, window):
+
+        days = np.unique(self.days)
+        return days, self.at(days, window)
+
+    # Rolling totals on a daily grid, from the first activity to the last
+    # Returns ( days, totals )
+    def daily(self, window):
+
+        if self.days.size == 0:
+            return self.days, self.totals[:0]
+        days = np.arange(self.days[0], self.days[-1] + 1, dtype="int64")
+        return days, self.at(days, window)
+
+    # Largest total over any window
+    # With no negative values, a window's total can only go up when it takes
+    # in an activity, so the peak is always on an activity day
+    def peak(self, window):
+
+        if self.days.size == 0:
+            return self.totals[0]
+        return self.at_dates(window)[1].max()
+
+    # Total for the window ending on the last activity day
+    def latest(self, window):
+
+        if self.days.size == 0:
+            return self.totals[0]
+        return self.at(self.days[-1:], window)[0]
@@ -0,0 +1,292 @@
+# This file defines pre-aggregated hobby by year by month rollup tables
+# A rollup is built once per log after it's read, and stored in the log cache
+# next to the log's columns. Counts per year and month, per-hobby totals and
+# mileage sums, minimums and maximums are then answered from a few rows per
+# month, whatever the number of rows in the logs
+#
+# Each hobby's sketches (see Sketch) are kept and stored with its rollup - a
+# quantile sketch of its mileage, and a distinct sketch of its active days
+#
+# Author: Josh McIntyre
+#
+import time
+import numpy as np
+from Calendar import Calendar, civil_from_days
+from HobbyFrame import recorded_mileage
+from Sketch import QuantileSketch, DistinctSketch, ACCURACY
+
+# Layout of stored rollups, bumped whenever the columns or sketch settings change
+# Stored rollups under another format, or another time zone, are rebuilt
+# 2 - sketches are stored with the table
+# 3 - trips with a bad distance are kept, and left out of the mileage columns
+ROLLUP_FORMAT = 3
+
+# Columns of the table, with the dtype each is kept as
+COLUMN_DTYPES = {
+                    "hobby" : "int64",
+                    "month" : "int64",
+                    "count" : "int64",
+                    "days" : "int64",
+                    "mileage_sum" : "float64",
+                    "mileage_min" : "float64",
+                    "mileage_max" : "float64",
+                }
+
+# Per-hobby columns - the first and last timestamp, the number of rows, and
+# the number of rows with a recorded mileage
+HOBBY_DTYPES = { "first" : "int64", "last" : "int64", "rows" : "int64", "mileage_rows" : "int64" }
+
+# The local time zone rollups are bucketed in
+# Rollups bucket by local calendar month, so one stored under another zone is stale
+def local_zone():
+    return "{}/{}/{}/{}".format(time.tzname[0], time.tzname[1], time.timezone, time.altzone)
+
+# Format a month key, year * 12 + month - 1, as "YYYY-MM"
+def month_string(key):
+    return "{:04d}-{:02d}".format(int(key // 12), int(key % 12) + 1)
+
+# This class defines a rollup table over one or more hobbies
+#
+# Ex, for a mileage hobby with rides on Jan 1 and 2 and Mar 5, 2022:
+#   hobby       = [ 0, 0 ]                   - index into hobbies
+#   month       = [ 24264, 24266 ]           - year * 12 + month - 1
+#   count       = [ 2, 1 ]                   - trips, with trip counts weighted
+#   days        = [ 2, 1 ]                   - distinct active days
+#   mileage_sum = [ 12.5, 3.1 ]              - NaN for hobbies without mileage
+#   mileage_min, mileage_max                 - likewise
+# Rows are sorted by hobby, then month. Alongside, each hobby's first and last
+# timestamp and its number of rows, so spans and averages are exact, and its
+# sketches. Hobbies without mileage have None for a mileage sketch
+class Rollup:
+
+    # Initialize from the hobbies, their types, the table columns and the
+    # lists of each hobby's mileage and day sketches
+    def __init__(self, hobbies, types, columns, mileage_sketches, day_sketches):
+
+        self.hobbies = list(hobbies)
+        self.types = list(types)
+        self.ids = { h : i for i, h in enumerate(self.hobbies) }
+        for name, dtype in list(COLUMN_DTYPES.items()) + list(HOBBY_DTYPES.items()):
+            setattr(self, name, np.asarray(columns[name], dtype=dtype))
+
+        self.mileage_sketches = list(mileage_sketches)
+        self.day_sketches = list(day_sketches)
+
+        # Each hobby's rows of the table
+        self.bounds = np.searchsorted(self.hobby, np.arange(len(self.hobbies) + 1))
+
+    # Build the rollup for one HobbyFrame
+    @classmethod
+    def build(cls, frame):
+
+        calendar = Calendar(frame.dates)
+        year, month, _ = calendar.year_month_day()
+        keys = year * 12 + month - 1
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate(( [ True ], keys[1:] != keys[:-1] ))) if keys.size else np.empty(0, dtype="int64")
+        months = keys[starts]
+
+        weights = frame.weights if frame.weights is not None else np.ones(keys.size, dtype="int64")
+        columns = {
+                    "hobby" : np.zeros(months.size, dtype="int64"),
+                    "month" : months,
+                    "count" : np.add.reduceat(weights[order], starts) if keys.size else months,
+                  }
+
+        # Distinct days, bucketed into the months above
+        days = np.unique(calendar.days)
+        day_year, day_month, _ = civil_from_days(days)
+        columns["days"] = np.bincount(np.searchsorted(months, day_year * 12 + day_month - 1), minlength=months.size)
+
+        # Trips with a bad distance have NaN mileage, which fmin and fmax skip.
+        # A month with no recorded mileage has a sum of 0 and NaN bounds
+        if frame.mileage is not None and keys.size:
+            mileage = frame.mileage.astype("float64")[order]
+            columns["mileage_sum"] = np.add.reduceat(np.nan_to_num(mileage), starts)
+            columns["mileage_min"] = np.fmin.reduceat(mileage, starts)
+            columns["mileage_max"] = np.fmax.reduceat(mileage, starts)
+        else:
+            for name in [ "mileage_sum", "mileage_min", "mileage_max" ]:
+                columns[name] = np.full(months.size, np.nan)
+
+        dates = frame.dates
+        columns["first"] = [ dates.min() if dates.size else 0 ]
+        columns["last"] = [ dates.max() if dates.size else 0 ]
+        columns["rows"] = [ dates.size ]
+
+        mileage_sketch = None
+        columns["mileage_rows"] = [ 0 ]
+        if frame.mileage is not None:
+            recorded = recorded_mileage(frame.mileage)
+            columns["mileage_rows"] = [ recorded.size ]
+            mileage_sketch = QuantileSketch()
+            mileage_sketch.update(recorded)
+        day_sketch = DistinctSketch()
+        day_sketch.update(days)
+
+        return cls([ frame.name ], [ frame.type.value ], columns, [ mileage_sketch ], [ day_sketch ])
+
+    # Join rollups into one, with the hobbies in the given order
+    # Every hobby in order must be in exactly one of the rollups
+    @classmethod
+    def merge(cls, rollups, order):
+
+        found = {}
+        for rollup in rollups:
+            for i, hobby in enumerate(rollup.hobbies):
+                found[hobby] = ( rollup, i )
+
+        return cls.select(found, order)
+
+    # A rollup over only some of this one's hobbies, in the given order
+    def subset(self, hobbies):
+        return Rollup.select({ h : ( self, i ) for i, h in enumerate(self.hobbies) }, hobbies)
+
+    # Gather hobbies from rollups, given a dictionary of hobby to ( rollup, index )
+    @classmethod
+    def select(cls, found, order):
+
+        pieces = { name : [] for name in COLUMN_DTYPES }
+        hobby_columns = { name : [] for name in HOBBY_DTYPES }
+        types = []
+        mileage_sketches = []
+        day_sketches = []
+        for new_id, hobby in enumerate(order):
+            rollup, i = found[hobby]
+            low, high = rollup.bounds[i], rollup.bounds[i + 1]
+            pieces["hobby"].append(np.full(high - low, new_id, dtype="int64"))
+            for name in list(COLUMN_DTYPES)[1:]:
+                pieces[name].append(getattr(rollup, name)[low:high])
+            for name in HOBBY_DTYPES:
+                hobby_columns[name].append(getattr(rollup, name)[i])
+            types.append(rollup.types[i])
+            mileage_sketches.append(rollup.mileage_sketches[i])
+            day_sketches.append(rollup.day_sketches[i])
+
+        columns = { name : np.concatenate(p) if p else np.empty(0, dtype=COLUMN_DTYPES[name]) for name, p in pieces.items() }
+        columns.update(hobby_columns)
+        return cls(order, types, columns, mileage_sketches, day_sketches)
+
+    # The table and sketches as plain arrays plus the hobbies and their types
+    # Mileage sketch buckets are laid out like the table, a row per hobby and
+    # bucket, with -1 zeros for hobbies with no mileage sketch. Day sketch
+    # registers are laid end to end, one block per hobby
+    # Returns ( info, dictionary of name to array ), see from_columns
+    def columns(self):
+
+        info = { "hobbies" : self.hobbies, "types" : self.types }
+        columns = { name : getattr(self, name) for name in list(COLUMN_DTYPES) + list(HOBBY_DTYPES) }
+
+        sketches = [ s if s is not None else QuantileSketch() for s in self.mileage_sketches ]
+        columns["quantile_hobby"] = np.repeat(np.arange(len(sketches), dtype="int64"), [ s.keys.size for s in sketches ])
+        columns["quantile_key"] = np.concatenate([ s.keys for s in sketches ]) if sketches else np.empty(0, dtype="int64")
+        columns["quantile_count"] = np.concatenate([ s.counts for s in sketches ]) if sketches else np.empty(0, dtype="int64")
+        columns["quantile_zeros"] = np.array([ s.zeros if s is not None else -1 for s in self.mileage_sketches ], dtype="int64")
+        columns["day_registers"] = np.concatenate([ s.registers for s in self.day_sketches ]) if self.day_sketches else np.empty(0, dtype="uint8")
+
+        return info, columns
+
+    # Rebuild a rollup from columns()
+    @classmethod
+    def from_columns(cls, info, columns):
+
+        count = len(info["hobbies"])
+        bounds = np.searchsorted(columns["quantile_hobby"], np.arange(count + 1))
+        mileage_sketches = []
+        for i, zeros in enumerate(columns["quantile_zeros"]):
+            if zeros < 0:
+                mileage_sketches.append(None)
+                continue
+            low, high = bounds[i], bounds[i + 1]
+            arrays = { "keys" : columns["quantile_key"][low:high], "counts" : columns["quantile_count"][low:high], "zeros" : [ zeros ], "accuracy" : [ ACCURACY ] }
+            mileage_sketches.append(QuantileSketch.from_arrays(arrays))
+
+        registers = np.asarray(columns["day_registers"]).reshape(count, -1) if count else []
+        day_sketches = [ DistinctSketch.from_arrays({ "registers" : r }) for r in registers ]
+
+        return cls(info["hobbies"], info["types"], columns, mileage_sketches, day_sketches)
+
+    # Ids of the hobbies of the given types that have any rows
+    def ids_of(self, types=None):
+        return [ i for i, t in enumerate(self.types) if (types is None or t in types) and self.rows[i] > 0 ]
+
+    # Number of trips across every hobby
+    def total_trips(self):
+        return int(self.count.sum())
+
+    # Number of trips for one hobby
+    def hobby_trips(self, hobby):
+
+        i = self.ids[hobby]
+        return int(self.count[self.bounds[i]:self.bounds[i + 1]].sum())
+
+    # First and last timestamp over the hobbies of the given types, or every hobby
+    def span(self, types=None):
+
+        ids = self.ids_of(types)
+        return int(self.first[ids].min()), int(self.last[ids].max())
+
+    # Count trips per year, as Calendar.count_by_year
+    # Returns a dictionary of year to count, in year order
+    def count_by_year(self):
+
+        keys, counts = self.count_by(self.month // 12, self.count)
+        return { int(k) : c for k, c in zip(keys, counts) }
+
+    # Count trips per month, as Calendar.count_by_month
+    # Pass types to count only the hobbies of those types, ex: the dated ones,
+    # since trip count seasons have no real month
+    # Returns a dictionary of "YYYY-MM" to count, in month order
+    def count_by_month(self, types=None):
+
+        rows = np.isin(self.hobby, self.ids_of(types))
+        keys, counts = self.count_by(self.month[rows], self.count[rows])
+        return { month_string(k) : c for k, c in zip(keys, counts) }
+
+    # Sum counts over a key, keeping only keys with trips
+    def count_by(self, keys, counts):
+
+        if keys.size == 0:
+            return keys, counts
+        low = int(keys.min())
+        counts = np.bincount(keys - low, weights=counts).astype("int64")
+        present = np.flatnonzero(counts)
+        return present + low, counts[present]
+
+    # Mileage across every hobby
+    def total_mileage(self):
+        return float(np.nansum(self.mileage_sum))
+
+    # A mileage stat for one mileage hobby - sum, avg, max or min
+    # Returns None for a hobby with no recorded mileage
+    def hobby_mileage(self, hobby, desired_stat):
+
+        i = self.ids[hobby]
+        if self.mileage_rows[i] == 0:
+            return None
+
+        low, high = self.bounds[i], self.bounds[i + 1]
+        if desired_stat == "sum":
+            return float(self.mileage_sum[low:high].sum())
+        elif desired_stat == "avg":
+            return float(self.mileage_sum[low:high].sum() / self.mileage_rows[i])
+        elif desired_stat == "max":
+            return float(np.fmax.reduce(self.mileage_max[low:high]))
+        elif desired_stat == "min":
+            return float(np.fmin.reduce(self.mileage_min[low:high]))
+        raise Exception("Invalid desired stat: should be sum, avg, max, min")
+
+    # One hobby's mileage quantile sketch, or None for a hobby without mileage
+    def mileage_sketch(self, hobby):
+        return self.mileage_sketches[self.ids[hobby]]
+
+    # Estimated number of distinct days any of the given hobbies were done
+    # The hobbies' day sketches are merged, so shared days count once
+    def distinct_days(self, hobbies):
+
+        union = DistinctSketch()
+        for hobby in hobbies:
+            union.merge(self.day_sketches[self.ids[hobby]])
+        return union.estimate()
@@ -0,0 +1,185 @@
+# This file defines mergeable sketches for approximate stats
+# A sketch summarizes a column in a small, fixed amount of space, and sketches
+# of separate chunks, logs or worker processes merge into the sketch of all of
+# them, so percentiles and distinct counts never need a full sort
+#
+# Error bounds:
+#   QuantileSketch - every quantile is within ACCURACY (1%) of the exact value,
+#                    relative to it, ex: a true median of 10.0 reads 9.9 to 10.1
+#   DistinctSketch - a standard error of 1.04 / sqrt(2 ** PRECISION), 0.8%,
+#                    and closer than that for counts of a few thousand
+#
+# Stats are exact by default, computed from the index. Sketches are only used
+# for a Timeline made with approximate set, ex: with --approximate, and when
+# streaming, where there's no index to compute from
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+# Relative accuracy of quantile sketches
+ACCURACY = 0.01
+
+# Quantiles reported by the percentile stats, with their labels
+QUANTILES = [ ( 0.5, "median" ), ( 0.9, "p90" ), ( 0.99, "p99" ) ]
+
+# Distinct sketches use 2 ** PRECISION registers, one byte each
+PRECISION = 14
+
+# This class defines a quantile sketch over non-negative values
+#
+# Values are counted in buckets with logarithmically growing bounds, so any
+# value in a bucket is within ACCURACY of the bucket's midpoint, relative to it
+# Ex, with 1% accuracy, bucket k holds values from 1.0202 ** (k - 1) to 1.0202 ** k
+# Zeros, and anything smaller than any bucket, are counted on their own
+class QuantileSketch:
+
+    # Start out empty
+    def __init__(self, accuracy=ACCURACY):
+
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.keys = np.empty(0, dtype="int64")
+        self.counts = np.empty(0, dtype="int64")
+        self.zeros = 0
+
+    # Number of values counted
+    @property
+    def count(self):
+        return int(self.counts.sum()) + self.zeros
+
+    # Sketches are equal if they've counted the same buckets
+    def __eq__(self, other):
+
+        if not isinstance(other, QuantileSketch):
+            return False
+        return self.accuracy == other.accuracy and self.zeros == other.zeros and np.array_equal(self.keys, other.keys) and np.array_equal(self.counts, other.counts)
+
+    # Count an array of values
+    def update(self, values):
+
+        values = np.asarray(values, dtype="float64")
+        positive = values[values > 0]
+        self.zeros += int(values.size - positive.size)
+        keys, counts = np.unique(np.ceil(np.log(positive) / np.log(self.gamma)).astype("int64"), return_counts=True)
+        self.add(keys, counts)
+
+    # Fold another sketch into this one
+    # Both must have the same accuracy. The order things are merged in doesn't matter
+    def merge(self, other):
+
+        if other.accuracy != self.accuracy:
+            raise ValueError("Can't merge sketches with different accuracy")
+        self.zeros += other.zeros
+        self.add(other.keys, other.counts)
+        return self
+
+    # Add bucket counts to the sketch
+    def add(self, keys, counts):
+
+        keys, inverse = np.unique(np.concatenate(( self.keys, keys )), return_inverse=True)
+        self.counts = np.bincount(inverse, weights=np.concatenate(( self.counts, counts )), minlength=keys.size).astype("int64")
+        self.keys = keys
+
+    # Estimate the q quantile, the value ranked q * (count - 1) in sorted order
+    # Returns NaN for an empty sketch
+    def quantile(self, q):
+
+        if self.count == 0:
+            return np.nan
+        rank = int(q * (self.count - 1))
+        if rank < self.zeros:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.counts), rank - self.zeros, side="right"))
+        return float(2 * self.gamma ** self.keys[i] / (self.gamma + 1))
+
+    # The sketch as plain arrays, see from_arrays
+    def to_arrays(self):
+        return { "keys" : self.keys, "counts" : self.counts, "zeros" : np.array([ self.zeros ]), "accuracy" : np.array([ self.accuracy ]) }
+
+    # Rebuild a sketch from to_arrays()
+    @classmethod
+    def from_arrays(cls, arrays):
+
+        sketch = cls(float(arrays["accuracy"][0]))
+        sketch.keys = np.asarray(arrays["keys"], dtype="int64")
+        sketch.counts = np.asarray(arrays["counts"], dtype="int64")
+        sketch.zeros = int(arrays["zeros"][0])
+        return sketch
+
+# Exact q quantile of an array, ranked the same way as QuantileSketch.quantile
+def exact_quantile(values, q):
+
+    if values.size == 0:
+        return np.nan
+    return float(np.quantile(values, q, method="lower"))
+
+# Mix integers into well spread 64 bit hashes, with the splitmix64 finalizer
+def hash64(values):
+
+    h = np.asarray(values).astype("uint64") + np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+# This class defines a distinct count sketch over integers, ex: day numbers
+# It's a HyperLogLog - each value is hashed, the top PRECISION bits pick a
+# register, and the register keeps the longest run of leading zeros seen in
+# the rest. The count is estimated from how long those runs got
+class DistinctSketch:
+
+    # Start out empty
+    def __init__(self, precision=PRECISION):
+
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype="uint8")
+
+    # Sketches are equal if their registers are
+    def __eq__(self, other):
+        return isinstance(other, DistinctSketch) and np.array_equal(self.registers, other.registers)
+
+    # Count an array of integers
+    def update(self, values):
+
+        h = hash64(values)
+        index = (h >> np.uint64(64 - self.precision)).astype("int64")
+
+        # The rest is at most 64 - PRECISION bits, so it converts to float
+        # exactly and frexp's exponent is its bit length
+        rest = (h & np.uint64((1 << (64 - self.precision)) - 1)).astype("float64")
+        rank = (64 - self.precision) - np.frexp(rest)[1] + 1
+        np.maximum.at(self.registers, index, rank.astype("uint8"))
+
+    # Fold another sketch into this one
+    # Both must have the same precision. The order things are merged in doesn't matter
+    def merge(self, other):
+
+        if other.precision != self.precision:
+            raise ValueError("Can't merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    # Estimate the number of distinct values counted
+    # Small counts use linear counting on the empty registers, which is far
+    # more accurate there than the raw estimate
+    def estimate(self):
+
+        m = self.registers.size
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype("int64")))
+        empty = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and empty:
+            return int(round(m * np.log(m / empty)))
+        return int(round(raw))
+
+    # The sketch as plain arrays, see from_arrays
+    def to_arrays(self):
+        return { "registers" : self.registers }
+
+    # Rebuild a sketch from to_arrays()
+    @classmethod
+    def from_arrays(cls, arrays):
+
+        registers = np.asarray(arrays["registers"], dtype="uint8")
+        sketch = cls(int(registers.size).bit_length() - 1)
+        sketch.registers = registers.copy()
+        return sketch
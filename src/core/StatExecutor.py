@@ -0,0 +1,174 @@
+# This file defines a concurrent executor for registered stats
+# Every stat only reads the loaded data, so a batch of them can be run side by
+# side. The timeline index is copied once into a shared memory block, and each
+# worker process maps it instead of having the arrays pickled to it
+#
+# Author: Josh McIntyre
+#
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from ArrayBackend import make_backend
+from Timeline import Timeline
+from TripStats import TripStats
+from MileageStats import MileageStats
+from DateStats import DateStats
+from StatRegistry import STATS, PER_HOBBY
+from Profiler import PROFILER, profiled_call
+
+# Set up the stat processor classes over one timeline
+# Returns a dictionary of stat type to stat processor
+def make_processors(timeline):
+
+    return {
+                "trip" : TripStats({}, timeline=timeline),
+                "mileage" : MileageStats({}, timeline=timeline),
+                "date" : DateStats({}, timeline=timeline),
+           }
+
+# Copy a set of arrays into one new shared memory block
+# Returns the block and its layout, a list of ( name, dtype, size, offset )
+def publish(columns):
+
+    layout = []
+    nbytes = 0
+    for name, a in columns.items():
+        layout.append( ( name, a.dtype.str, a.size, nbytes ) )
+        nbytes += a.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    for name, dtype, size, offset in layout:
+        np.ndarray((size,), dtype=dtype, buffer=shm.buf, offset=offset)[:] = columns[name]
+
+    return shm, layout
+
+# Read-only views of the arrays in a shared memory block
+def attach(shm, layout):
+
+    columns = {}
+    for name, dtype, size, offset in layout:
+        view = np.ndarray((size,), dtype=dtype, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        columns[name] = view
+
+    return columns
+
+# State of a worker process - its view of the shared block and its processors
+WORKER = {}
+
+# Set up a worker process
+# The shared block is kept open for the life of the worker
+def init_worker(name, layout, info, backend):
+
+    shm = shared_memory.SharedMemory(name=name)
+    timeline = Timeline.from_columns(info, attach(shm, layout), backend=make_backend(backend))
+    WORKER["shm"] = shm
+    WORKER["processors"] = make_processors(timeline)
+
+# Run one stat in a worker
+# A task is ( stat type, index, hobbies ), where hobbies is a tuple to only
+# compute a per-hobby stat for some hobbies, or None for the whole stat
+def run_stat(task):
+
+    stat_type, index, hobbies = task
+    func = WORKER["processors"][stat_type].funcs[index][1]
+    if hobbies is None:
+        return func()
+    return func(hobbies)
+
+# This class defines the executor over one set of stat processors
+class StatExecutor:
+
+    # Initialize with a dictionary of stat type to stat processor, sharing one
+    # Timeline, and the worker count, defaulting to the core count
+    def __init__(self, processors, workers=None):
+
+        self.processors = processors
+        self.timeline = processors["trip"].timeline
+        self.workers = workers or os.cpu_count() or 1
+
+    # Compute a list of ( stat type, index ) pairs
+    # Returns the results in the same order as the pairs
+    def run(self, chosen):
+
+        if self.workers == 1 or not chosen:
+            return [ self.processors[t].funcs[i][1]() for t, i in chosen ]
+
+        tasks, parts = self.plan(chosen)
+        outputs = self.run_tasks(tasks)
+
+        # Per-hobby parts are merged in hobby group order, which is the order
+        # the stat itself walks the hobbies in
+        results = []
+        position = 0
+        for n in parts:
+            if n is None:
+                results.append(outputs[position])
+                position += 1
+                continue
+            merged = {}
+            for part in outputs[position:position + n]:
+                merged.update(part)
+            results.append(merged)
+            position += n
+
+        return results
+
+    # Split the chosen stats into tasks
+    # Per-hobby stats get a task for each group of hobbies, every other stat
+    # gets one task. Returns the tasks, and for each chosen stat the number of
+    # parts it was split into, or None if it wasn't split
+    def plan(self, chosen):
+
+        groups = self.hobby_groups()
+        tasks = []
+        parts = []
+        for stat_type, index in chosen:
+            if STATS[stat_type][index][1] in PER_HOBBY and len(groups) > 1:
+                tasks.extend( ( stat_type, index, group ) for group in groups )
+                parts.append(len(groups))
+            else:
+                tasks.append( ( stat_type, index, None ) )
+                parts.append(None)
+
+        return tasks, parts
+
+    # Split the hobbies into contiguous groups, one per worker at most
+    def hobby_groups(self):
+
+        hobbies = self.timeline.hobbies
+        count = min(self.workers, len(hobbies))
+        bounds = [ len(hobbies) * i // count for i in range(count + 1) ] if count else [ 0 ]
+        return [ tuple(hobbies[bounds[i]:bounds[i + 1]]) for i in range(count) ]
+
+    # Run tasks on a pool of workers that share the timeline's arrays
+    # The block is freed once every task is done
+    def run_tasks(self, tasks):
+
+        # Trip stats bucket dates by calendar day, so the days are worked out
+        # once here and shared, rather than again in every worker
+        if any( t[0] == "trip" for t in tasks ):
+            with PROFILER.span("calendar"):
+                self.timeline.calendar()
+        info, columns = self.timeline.columns()
+
+        # Start the resource tracker before the workers so they all share it
+        resource_tracker.ensure_running()
+        with PROFILER.span("publish_timeline"):
+            shm, layout = publish(columns)
+        try:
+            init = ( shm.name, layout, info, self.timeline.backend.name )
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(tasks)), initializer=init_worker, initargs=init) as pool:
+                if not PROFILER.enabled:
+                    return list(pool.map(run_stat, tasks))
+
+                results = []
+                for result, profile in pool.map(functools.partial(profiled_call, run_stat, PROFILER.memory), tasks):
+                    PROFILER.merge(profile)
+                    results.append(result)
+                return results
+        finally:
+            shm.close()
+            shm.unlink()
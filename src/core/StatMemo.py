@@ -0,0 +1,102 @@
+# This file defines a memoization layer for stat computations
+# Stats call each other and share intermediate work, so results are cached
+# per loaded dataset, along with which results were used to compute which
+#
+# Author: Josh McIntyre
+#
+import functools
+import threading
+
+# This class defines a dependency-aware result cache
+# One lives on each Timeline, so everything cached is tied to one dataset
+# and a reload, which builds a new Timeline, starts from an empty cache
+class StatMemo:
+
+    # Start out empty
+    def __init__(self):
+
+        self.results = {}
+        self.dependents = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    # Get a cached result, computing and storing it on a miss
+    # If this is called while another result is being computed, that result
+    # is recorded as depending on this one
+    def get(self, key, compute):
+
+        stack = self.call_stack()
+        with self.lock:
+            if stack:
+                self.dependents.setdefault(key, set()).add(stack[-1])
+            if key in self.results:
+                self.hits += 1
+                return self.results[key]
+            self.misses += 1
+
+        stack.append(key)
+        try:
+            value = compute()
+        finally:
+            stack.pop()
+
+        with self.lock:
+            self.results[key] = value
+
+        return value
+
+    # The keys being computed on this thread, innermost last
+    def call_stack(self):
+
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    # Drop a cached result and everything that was computed from it
+    # With no key, drop everything
+    def invalidate(self, key=None):
+
+        with self.lock:
+            if key is None:
+                self.results.clear()
+                self.dependents.clear()
+                return
+
+            pending = [ key ]
+            while pending:
+                k = pending.pop()
+                self.results.pop(k, None)
+                pending.extend(self.dependents.pop(k, ()))
+
+    # Which cached results each result was computed from
+    # Returns a dictionary of key to the set of keys it used
+    def dependencies(self):
+
+        with self.lock:
+            deps = {}
+            for used, users in self.dependents.items():
+                for user in users:
+                    deps.setdefault(user, set()).add(used)
+            return deps
+
+    # Hit and miss counters for inspection
+    def info(self):
+
+        with self.lock:
+            return { "hits" : self.hits, "misses" : self.misses, "entries" : len(self.results) }
+
+# Decorator that memoizes a stat method in its object's memo
+# The key is the method's qualified name plus its arguments, so the same stat
+# on two classes sharing a Timeline never collide
+# Cached results are shared between callers, so treat them as read-only
+def memoized(method):
+
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        return self.memo.get((name,) + args, lambda: method(self, *args))
+
+    return wrapper
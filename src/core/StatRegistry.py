@@ -0,0 +1,77 @@
+# This file defines the registry of available stats for each stat class
+# It's kept free of numpy and the stat classes themselves, so listing the
+# available stats doesn't have to load any of them
+#
+# Author: Josh McIntyre
+#
+from Profiler import PROFILER
+
+# Each stat is registered as ( format string, method name, title )
+# The order here is the stat index used on the command line
+STATS = {
+            "trip" : [
+                        ( "Overall {}: {}", "total_trips", "Overall trips" ),
+                        ( "Overall {}: {}", "total_years", "Overall years" ),
+                        ( "Total trips for hobby {}: {}", "total_trips_per_hobby", "Total trips for hobby" ),
+                        ( "Total trips in {}: {}", "total_trips_per_year", "Total trips in year" ),
+                        ( "Percentage active days per year {}: {}%", "pct_active_year", "Percentage active days per year" ),
+                        ( "Percentage of total trips for {}: {}%", "pct_hobby_total", "Percentage of total trips for activity" ),
+                        ( "Percentage of total trips in {}: {}%", "pct_year_total", "Percentage of total trips in year" ),
+                        ( "Total trips in {}: {}", "total_trips_per_month", "Total trips in month" ),
+                        ( "Total trips in {}: {}", "total_trips_per_week", "Total trips in week" ),
+                        ( "Peak trips for {}: {}", "peak_rolling_trips", "Peak trips in a rolling window for activity" ),
+                        ( "Trips up to the latest activity for {}: {}", "latest_rolling_trips", "Trips in the rolling window ending on the latest activity" ),
+                     ],
+            "mileage" : [
+                        ( "Overall {}: {}", "total_mileage", "Total overall mileage" ),
+                        ( "Overall {}: {}", "total_years", "Total overall years" ),
+                        ( "Total mileage for {}: {}", "total_mileage_hobby", "Total mileage for activity" ),
+                        ( "Average mileage for {}: {}", "avg_mileage_hobby", "Average mileage for activity" ),
+                        ( "Maximum mileage for {}: {}", "max_mileage_hobby", "Maximum mileage for activity" ),
+                        ( "Minimum mileage for {}: {}", "min_mileage_hobby", "Minimum mileage for activity" ),
+                        ( "Peak mileage for {}: {}", "peak_rolling_mileage", "Peak mileage in a rolling window for activity" ),
+                        ( "Mileage up to the latest activity for {}: {}", "latest_rolling_mileage", "Mileage in the rolling window ending on the latest activity" ),
+                        ( "Mileage percentile for {}: {}", "mileage_percentiles", "Median, 90th and 99th percentile mileage for activity" ),
+                     ],
+            "date" : [
+                        ( "Overall {} : {}", "multi_activity_days", "Overall multi-activity days" ),
+                        ( "Average days between trips for {}: {}", "average_days_between", "Average days between trips for activity" ),
+                        ( "Max days between trips for {}: {}", "max_days_between", "Maximum days between trips for activity" ),
+                        ( "Longest streak for {}: {} days", "longest_streak", "Longest streak of consecutive days for activity" ),
+                        ( "Current streak for {}: {} days", "current_streak", "Current streak of consecutive days for activity" ),
+                        ( "Longest gap for {}: {}", "longest_gap", "Longest gap between trips for activity" ),
+                        ( "Gaps between trips for {}: {}", "gap_histogram", "Gaps between trips for activity, by length" ),
+                        ( "Days with {}: {}", "multi_activity_thresholds", "Days with several activities, by number of activities" ),
+                        ( "Days doing {}: {}", "hobby_cooccurrence", "Days doing both of a pair of activities" ),
+                        ( "Days doing only {}: {}", "solo_days", "Days doing only one activity" ),
+                        ( "Overall distinct {}: {}", "total_active_days", "Overall distinct active days" ),
+                     ],
+        }
+
+# Stats that return a dictionary keyed by hobby, and take an optional tuple of
+# hobbies to compute for. These can be split up by hobby and the parts merged
+PER_HOBBY = [
+                "total_trips_per_hobby",
+                "pct_hobby_total",
+                "total_mileage_hobby",
+                "avg_mileage_hobby",
+                "max_mileage_hobby",
+                "min_mileage_hobby",
+                "peak_rolling_trips",
+                "latest_rolling_trips",
+                "peak_rolling_mileage",
+                "latest_rolling_mileage",
+                "mileage_percentiles",
+                "average_days_between",
+                "max_days_between",
+                "longest_streak",
+                "current_streak",
+                "longest_gap",
+                "gap_histogram",
+            ]
+
+# Bind the registered stats of one type to a stat processor object
+# Returns the ( format string, method, title ) list the processors expose as funcs
+# Each method is wrapped in a profiling span named after the stat, ex: stat.trip.total_trips
+def bind_funcs(stat_type, processor):
+    return [ ( fmt, PROFILER.wrap("stat.{}.{}".format(stat_type, name), getattr(processor, name)), title ) for fmt, name, title in STATS[stat_type] ]
@@ -0,0 +1,347 @@
+# This file defines a shared timeline index over all loaded hobby data
+# It's built once after the logs are read, and every stat class reads from it
+# through views instead of collapsing and sorting the data again on each call
+#
+# Author: Josh McIntyre
+#
+import fnmatch
+import numpy as np
+from ArrayBackend import get_backend
+from Calendar import Calendar, date_window
+from HobbyFrame import as_hobby_set
+from Rollup import Rollup
+from StatMemo import StatMemo
+
+# Hobby types in the order they're laid out in the index
+# Grouping them this way makes the mileage hobbies, and the hobbies with real
+# dates (mileage and date logs), contiguous prefixes of the date column
+TYPE_ORDER = [ "mileage", "date", "tripcount" ]
+
+# This class defines the timeline index
+#
+# Ex, for a mileage hobby "Trail Mtb" and a trip count hobby "Snowsports":
+#   hobbies      = [ "Trail Mtb", "Snowsports" ]
+#   dates        = [ t1, t3, t7, | s1, s1, s2 ]     - each hobby's slice is sorted
+#   mileage      = [ m1, m3, m7 ]                   - lines up with the mileage prefix
+#   starts, ends = [ 0, 3 ], [ 3, 6 ]               - each hobby's slice of dates
+#   sorted_dates = [ s1, s1, s2, t1, t3, t7 ]      - every date, globally sorted
+#   sorted_ids   = [ 1, 1, 1, 0, 0, 0 ]             - which hobby each sorted date is from
+#
+# Trip count logs store one date per season with a weight, the number of trips
+# If any hobby has weights, weights lines up with dates and is 1 everywhere else
+# Otherwise it's None, and every date counts once
+#
+# A Rollup over the same hobbies can be attached, and stats it can answer are
+# then answered from it instead of the date column. It's None otherwise
+class Timeline:
+
+    # Build the index from a HobbySet, or the log reader's data dictionary
+    # Stats over the index reduce with the given ArrayBackend, or the one in use
+    # Pass a Rollup of the same data, ex: from LogReader.read_rollups, to
+    # answer stats from it
+    # With approximate set, percentiles and distinct day counts are estimated
+    # from the rollup's sketches instead of computed exactly, see Sketch
+    def __init__(self, all_data, backend=None, rollup=None, approximate=False):
+
+        frames = list(as_hobby_set(all_data).values())
+        self.backend = backend if backend is not None else get_backend()
+        self.rollup = rollup
+        self.approximate = approximate
+        self.hobbies = [ f.name for f in frames ]
+        self.types = [ f.type.value for f in frames ]
+        self.ids = { h : i for i, h in enumerate(self.hobbies) }
+
+        # Lay the hobbies out grouped by type, keeping their order within a type
+        layout = sorted(range(len(self.hobbies)), key=self.type_rank)
+
+        dates = []
+        mileage = []
+        weights = []
+        weighted = any( f.weights is not None for f in frames )
+        self.starts = np.zeros(len(self.hobbies), dtype="int64")
+        self.ends = np.zeros(len(self.hobbies), dtype="int64")
+        self.type_ends = {}
+        position = 0
+        for i in layout:
+            frame = frames[i]
+
+            # Frames already in order are laid out as they are
+            order = slice(None) if frame.ordered else np.argsort(frame.dates, kind="stable")
+            hobby_dates = frame.dates[order]
+            dates.append(hobby_dates)
+            if self.types[i] == "mileage":
+                mileage.append(frame.mileage[order])
+            if weighted:
+                if frame.weights is not None:
+                    weights.append(frame.weights[order])
+                else:
+                    weights.append(np.ones(hobby_dates.size, dtype="int64"))
+
+            self.starts[i] = position
+            position += hobby_dates.size
+            self.ends[i] = position
+            self.type_ends[self.types[i]] = position
+
+        self.dates = np.concatenate(dates) if dates else np.empty(0, dtype="int64")
+        self.mileage = np.concatenate(mileage) if mileage else np.empty(0, dtype="float32")
+        self.weights = (np.concatenate(weights) if weights else np.empty(0, dtype="int64")) if weighted else None
+
+        # Fill in prefix ends for types with no hobbies
+        end = 0
+        for logtype in TYPE_ORDER:
+            end = self.type_ends.setdefault(logtype, end)
+
+        # Global sort, with a compact hobby id alongside each date
+        segment_ids = np.repeat(np.array(layout, dtype="int64"), (self.ends - self.starts)[layout])
+        order = np.argsort(self.dates, kind="stable")
+        self.sorted_dates = self.dates[order]
+        self.sorted_ids = segment_ids[order].astype(self.id_dtype())
+
+        self.subsets = {}
+        self.dates_calendar = None
+
+        # Stat results computed from this dataset
+        self.memo = StatMemo()
+
+    # The index as plain arrays plus a small description of the layout
+    # Used to hand the index to other processes through shared memory
+    # The calendar's local days are included if the calendar has been built,
+    # and the rollup's columns, prefixed with "rollup.", if there is one
+    # Returns ( info, dictionary of name to array )
+    def columns(self):
+
+        info = { "hobbies" : self.hobbies, "types" : self.types, "type_ends" : self.type_ends, "approximate" : self.approximate }
+        columns = {
+                    "dates" : self.dates,
+                    "mileage" : self.mileage,
+                    "starts" : self.starts,
+                    "ends" : self.ends,
+                    "sorted_dates" : self.sorted_dates,
+                    "sorted_ids" : self.sorted_ids,
+                  }
+        if self.weights is not None:
+            columns["weights"] = self.weights
+        if self.dates_calendar is not None:
+            columns["calendar_days"] = self.dates_calendar.days
+        if self.rollup is not None:
+            rollup_info, rollup_columns = self.rollup.columns()
+            info["rollup"] = rollup_info
+            columns.update({ "rollup." + name : a for name, a in rollup_columns.items() })
+
+        return info, columns
+
+    # Rebuild an index from columns(), without copying or sorting anything
+    # The arrays are used as they are, so they can be views of shared memory
+    @classmethod
+    def from_columns(cls, info, columns, backend=None):
+
+        timeline = cls.__new__(cls)
+        timeline.backend = backend if backend is not None else get_backend()
+        timeline.hobbies = list(info["hobbies"])
+        timeline.types = list(info["types"])
+        timeline.ids = { h : i for i, h in enumerate(timeline.hobbies) }
+        timeline.type_ends = dict(info["type_ends"])
+        timeline.approximate = info.get("approximate", False)
+        for name in [ "dates", "mileage", "starts", "ends", "sorted_dates", "sorted_ids" ]:
+            setattr(timeline, name, columns[name])
+        timeline.weights = columns.get("weights")
+        timeline.subsets = {}
+        timeline.dates_calendar = None
+        if "calendar_days" in columns:
+            timeline.dates_calendar = Calendar.from_days(columns["calendar_days"], timeline.weights, timeline.backend)
+        timeline.rollup = None
+        if "rollup" in info:
+            rollup_columns = { name[len("rollup."):] : a for name, a in columns.items() if name.startswith("rollup.") }
+            timeline.rollup = Rollup.from_columns(info["rollup"], rollup_columns)
+        timeline.memo = StatMemo()
+
+        return timeline
+
+    # A timeline over part of this one, from the query options the CLI and
+    # server take, ex: query(first="2023-01-01", last="2023-12-31", hobbies=[ "*bike*" ])
+    # first and last are ISO dates, both included. hobbies is a list of hobby
+    # names or glob patterns, matched without case
+    # Raises ValueError for a bad date or a pattern that matches no hobby
+    def query(self, first=None, last=None, hobbies=None):
+
+        start, end = date_window(first, last)
+        return self.filter(start, end, self.hobbies_matching(hobbies) if hobbies else None)
+
+    # Hobbies matching any of a list of names or glob patterns, in load order
+    def hobbies_matching(self, patterns):
+
+        matched = set()
+        for pattern in patterns:
+            found = [ h for h in self.hobbies if fnmatch.fnmatch(h.lower(), pattern.lower()) ]
+            if not found:
+                raise ValueError("No hobby matches: {}".format(pattern))
+            matched.update(found)
+
+        return [ h for h in self.hobbies if h in matched ]
+
+    # A timeline over part of this one - a date window and a subset of hobbies
+    # start and end are timestamps, start inclusive and end exclusive, and
+    # either can be None for no bound. hobbies is a collection of hobby names,
+    # or None for every hobby
+    # Each hobby's window is found by binary search on its sorted dates, and
+    # the global sort by binary search on the sorted column, so nothing is
+    # sorted again. Only the selected rows are copied into the new index
+    def filter(self, start=None, end=None, hobbies=None):
+
+        keep = [ i for i, h in enumerate(self.hobbies) if hobbies is None or h in hobbies ]
+        new_ids = np.full(len(self.hobbies), -1, dtype="int64")
+        new_ids[keep] = np.arange(len(keep))
+
+        # Each kept hobby's window, in layout order
+        windows = []
+        for i in sorted(keep, key=lambda i: self.starts[i]):
+            hobby_dates = self.dates[self.starts[i]:self.ends[i]]
+            low = np.searchsorted(hobby_dates, start, side="left") if start is not None else 0
+            high = np.searchsorted(hobby_dates, end, side="left") if end is not None else hobby_dates.size
+            windows.append( ( i, self.starts[i] + low, self.starts[i] + high ) )
+
+        starts = np.zeros(len(keep), dtype="int64")
+        ends = np.zeros(len(keep), dtype="int64")
+        type_ends = {}
+        position = 0
+        for i, low, high in windows:
+            starts[new_ids[i]] = position
+            position += int(high - low)
+            ends[new_ids[i]] = position
+            type_ends[self.types[i]] = position
+        end_of = 0
+        for logtype in TYPE_ORDER:
+            end_of = type_ends.setdefault(logtype, end_of)
+
+        def gather(column, only=None):
+            pieces = [ column[low:high] for i, low, high in windows if only is None or self.types[i] == only ]
+            return np.concatenate(pieces) if pieces else column[:0].copy()
+
+        columns = {
+                    "dates" : gather(self.dates),
+                    "mileage" : gather(self.mileage, only="mileage"),
+                    "starts" : starts,
+                    "ends" : ends,
+                  }
+        if self.weights is not None:
+            columns["weights"] = gather(self.weights)
+        if self.dates_calendar is not None:
+            columns["calendar_days"] = gather(self.dates_calendar.days)
+
+        # The window of the global sort, less any hobbies that were dropped
+        low = np.searchsorted(self.sorted_dates, start, side="left") if start is not None else 0
+        high = np.searchsorted(self.sorted_dates, end, side="left") if end is not None else self.sorted_dates.size
+        sorted_dates = self.sorted_dates[low:high]
+        sorted_ids = self.sorted_ids[low:high]
+        if len(keep) < len(self.hobbies):
+            ids = new_ids[sorted_ids]
+            sorted_dates = sorted_dates[ids >= 0]
+            sorted_ids = ids[ids >= 0].astype(self.sorted_ids.dtype)
+        columns["sorted_dates"] = sorted_dates
+        columns["sorted_ids"] = sorted_ids
+
+        info = { "hobbies" : [ self.hobbies[i] for i in keep ], "types" : [ self.types[i] for i in keep ], "type_ends" : type_ends, "approximate" : self.approximate }
+        timeline = Timeline.from_columns(info, columns, backend=self.backend)
+
+        # Rollups are by whole month, so they only carry over to a hobby subset
+        if self.rollup is not None and start is None and end is None:
+            timeline.rollup = self.rollup.subset(info["hobbies"])
+
+        return timeline
+
+    # The rollup to estimate sketched stats from, or None if they're exact
+    def sketches(self):
+        return self.rollup if self.approximate else None
+
+    # Layout rank of a hobby - its type's place in TYPE_ORDER, unknown types last
+    def type_rank(self, i):
+
+        if self.types[i] in TYPE_ORDER:
+            return TYPE_ORDER.index(self.types[i])
+        return len(TYPE_ORDER)
+
+    # Smallest dtype that can hold every hobby id
+    def id_dtype(self):
+
+        if len(self.hobbies) <= np.iinfo("uint8").max:
+            return "uint8"
+        elif len(self.hobbies) <= np.iinfo("uint16").max:
+            return "uint16"
+        return "int32"
+
+    # Hobbies of the given types, in load order
+    def hobbies_of(self, types):
+        return [ h for h, t in zip(self.hobbies, self.types) if t in types ]
+
+    # Sorted dates for one hobby - a view into the date column
+    def hobby_dates(self, hobby):
+
+        i = self.ids[hobby]
+        return self.dates[self.starts[i]:self.ends[i]]
+
+    # Number of trips for one hobby - its weights summed, or its number of dates
+    def hobby_trips(self, hobby):
+
+        i = self.ids[hobby]
+        if self.weights is None:
+            return int(self.ends[i] - self.starts[i])
+        return int(self.backend.sum(self.weights[self.starts[i]:self.ends[i]]))
+
+    # Number of trips across every hobby
+    def total_trips(self):
+
+        if self.weights is None:
+            return int(self.dates.size)
+        return int(self.backend.sum(self.weights))
+
+    # Local day numbers for one hobby, lined up with hobby_dates
+    # A view into the calendar's days, so they're only worked out once
+    def hobby_days(self, hobby):
+
+        i = self.ids[hobby]
+        return self.calendar().days[self.starts[i]:self.ends[i]]
+
+    # Trip weights for one hobby, lined up with hobby_dates, or None if
+    # every date counts once
+    def hobby_weights(self, hobby):
+
+        if self.weights is None:
+            return None
+        i = self.ids[hobby]
+        return self.weights[self.starts[i]:self.ends[i]]
+
+    # Mileage for one mileage hobby, lined up with hobby_dates - a view
+    def hobby_mileage(self, hobby):
+
+        i = self.ids[hobby]
+        return self.mileage[self.starts[i]:self.ends[i]]
+
+    # Dates for every mileage hobby - a view, not sorted across hobbies
+    def mileage_dates(self):
+        return self.dates[:self.type_ends["mileage"]]
+
+    # Dates for every hobby with real dates (mileage and date logs) - a view
+    def dated_dates(self):
+        return self.dates[:self.type_ends["date"]]
+
+    # Globally sorted dates for only the hobbies of the given types
+    # Every type is just the sorted column; anything narrower is filtered out
+    # of it once and kept, so it's never sorted again
+    def sorted_dates_of(self, types):
+
+        types = frozenset(types)
+        if types.issuperset(self.types):
+            return self.sorted_dates
+
+        if types not in self.subsets:
+            ids = [ i for i, t in enumerate(self.types) if t in types ]
+            self.subsets[types] = self.sorted_dates[np.isin(self.sorted_ids, ids)]
+
+        return self.subsets[types]
+
+    # Calendar buckets for the whole date column, built on first use
+    def calendar(self):
+
+        if self.dates_calendar is None:
+            self.dates_calendar = Calendar(self.dates, self.weights, self.backend)
+        return self.dates_calendar
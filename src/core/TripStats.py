@@ -3,103 +3,136 @@
 #
 # Author: Josh McIntyre
 #
-from npimporter import np
+from Timeline import Timeline
+from RollingWindow import RollingWindow, WINDOWS
+from StatMemo import memoized
+from StatRegistry import bind_funcs
 import math
-import datetime
 
 # Time delta defs for doing raw unix timestamp operations
 SECONDS_IN_YEAR = 31536000
 
+# Hobby types with real dates, rather than years of trip counts
+DATED_TYPES = [ "date", "mileage" ]
+
 # This class defines processing methods for date/trip statistics
 class TripStats:
 
-    # Load the data on initialization
-    def __init__(self, all_data):
+    # Load the data on initialization, from a HobbySet or the log reader's
+    # data dictionary
+    # Pass a prebuilt Timeline to share one index between all the stat classes
+    def __init__(self, all_data, timeline=None):
+
+        self.load_data(all_data, timeline)
+
+        # Register the functions with titles, from the StatRegistry
+        self.funcs = bind_funcs("trip", self)
+
+    # Load (or reload) the data
+    # Results are memoized on the timeline, so new data starts with a clean cache
+    def load_data(self, all_data, timeline=None):
 
         # Get the date data
-        date_data = {}
-        for hobby, data_dict in all_data.items():
-            date_data[hobby] = data_dict["dates"]
-
-        self.date_data = date_data
-
-        # Register the functions with titles
-        self.funcs = [
-                        ( "Overall {}: {}", self.total_trips, "Overall trips" ),
-                        ( "Overall {}: {}", self.total_years, "Overall years" ),
-                        ( "Total trips for hobby {}: {}", self.total_trips_per_hobby, "Total trips for hobby" ),
-                        ( "Total trips in {}: {}", self.total_trips_per_year, "Total trips in year" ),
-                        ( "Percentage active days per year {}: {}%", self.pct_active_year, "Percentage active days per year" ),
-                        ( "Percentage of total trips for {}: {}%", self.pct_hobby_total, "Percentage of total trips for activity" ),
-                        ( "Percentage of total trips in {}: {}%", self.pct_year_total, "Percentage of total trips in year" ),
-                    ]
+        self.timeline = timeline if timeline is not None else Timeline(all_data)
+        self.memo = self.timeline.memo
+        self.date_data = { hobby : self.timeline.hobby_dates(hobby) for hobby in self.timeline.hobbies }
+
+    # The loaded hobbies, or only those in the given tuple, in load order
+    def hobbies(self, only=None):
+        return [ h for h in self.date_data if only is None or h in only ]
+
+    # Trips for one hobby, from the timeline's rollup if it has one
+    def hobby_trips(self, hobby):
+
+        if self.timeline.rollup is not None:
+            return self.timeline.rollup.hobby_trips(hobby)
+        return self.timeline.hobby_trips(hobby)
 
     # Define individual methods for processing each desired statistic
+    # Stats a Rollup can answer are answered from the timeline's rollup if it
+    # has one, and from the index otherwise
 
     # Total trips and total years
+    @memoized
     def total_trips(self):
 
-        # Format data - collapse all datestamps into one array
-        all_raw = []
-        for sport, dates in self.date_data.items():
-            all_raw.extend(dates)
-        all_data = np.array(all_raw, dtype="uint32")
-
-        # Total trips - just get the size of the array
-        total_trips = all_data.size
+        # Total trips - the size of the date column, with trip count seasons weighted
+        if self.timeline.rollup is not None:
+            total_trips = self.timeline.rollup.total_trips()
+        else:
+            total_trips = self.timeline.total_trips()
 
         ret = { "total trips" : total_trips}
         return ret
 
     # Total years
+    @memoized
     def total_years(self):
-        
-        # Format data - collapse all datestamps into one array
-        all_raw = []
-        for sport, dates in self.date_data.items():
-            all_raw.extend(dates)
-        all_data = np.array(all_raw, dtype="uint32")
-
-        # Total years - sort and subtract the latest from the oldest datestamp
+
+        # Total years - subtract the oldest from the latest datestamp in the sorted index
         # Then, divide by seconds per year to get the total years logged
-        all_data.sort()
-        diff = all_data[-1] - all_data[0]
+        if self.timeline.rollup is not None:
+            first, last = self.timeline.rollup.span()
+            diff = last - first
+        else:
+            all_data = self.timeline.sorted_dates
+            diff = all_data[-1] - all_data[0]
         years = int( diff / SECONDS_IN_YEAR ) + 1
 
         ret = { "total years" : years }
         return ret
 
     # Total trips per hobby
-    def total_trips_per_hobby(self):
+    # Per-hobby stats take an optional tuple of hobbies to compute for, so
+    # the StatExecutor can split them between workers
+    @memoized
+    def total_trips_per_hobby(self, hobbies=None):
 
         ret = {}
-        for sport, data in self.date_data.items():
-            ret[sport] = data.size
+        for sport in self.hobbies(hobbies):
+            ret[sport] = self.hobby_trips(sport)
 
         return ret
 
     # Total trips per year
+    @memoized
     def total_trips_per_year(self):
 
-        # Format data - collapse all datestamps into one array
-        all_raw = []
-        for sport, dates in self.date_data.items():
-            all_raw.extend(dates)
-        all_data = np.array(all_raw, dtype="uint32")
+        # Bucket every timestamp by its local year and count each year
+        if self.timeline.rollup is not None:
+            ret = self.timeline.rollup.count_by_year()
+        else:
+            ret = self.timeline.calendar().count_by_year()
 
-        # Get year from each timestamp
-        year_data = [ datetime.date.fromtimestamp(date).year for date in all_data ]
+        return ret
 
-        # Get the count of each year
-        years, counts = np.unique(year_data, return_counts=True)
-        ret = {}
-        for i in range(0, len(years)):
-            # Strange bug with cupy - years[i] is considered an unhashable type
-            ret[int(years[i])] = counts[i]
+    # Total trips per month
+    # Only dated hobbies are counted, trip count seasons are a year, not a month
+    @memoized
+    def total_trips_per_month(self):
+
+        if self.timeline.rollup is not None:
+            ret = self.timeline.rollup.count_by_month(DATED_TYPES)
+        else:
+            ret = self.dated_calendar().count_by_month()
+
+        return ret
+
+    # Total trips per ISO week
+    # Only dated hobbies are counted, as for months
+    @memoized
+    def total_trips_per_week(self):
+
+        ret = self.dated_calendar().count_by_week()
 
         return ret
 
+    # Calendar over the dated hobbies, which come first in the timeline
+    def dated_calendar(self):
+        return self.timeline.calendar().head(self.timeline.type_ends["date"])
+
     # Percentage of active days per year
+    @memoized
     def pct_active_year(self):
 
         year_data = self.total_trips_per_year()
@@ -113,18 +146,20 @@ class TripStats:
 
 
     # Percentage hobby total
-    def pct_hobby_total(self):
+    @memoized
+    def pct_hobby_total(self, hobbies=None):
 
         total_trips = self.total_trips()["total trips"]
 
         ret = {}
-        for sport, data in self.date_data.items():
-            pct = (data.size / total_trips) * 100
+        for sport in self.hobbies(hobbies):
+            pct = (self.hobby_trips(sport) / total_trips) * 100
             ret[sport] = round(pct, 2)
 
         return ret
 
     # Percentage year total
+    @memoized
     def pct_year_total(self):
 
         total_trips = self.total_trips()["total trips"]
@@ -136,3 +171,37 @@ class TripStats:
             ret[year] = round(pct, 2)
 
         return ret
+
+    # Rolling trip counts for one dated hobby, see RollingWindow
+    # Trip count logs only have years, so they have no rolling series
+    @memoized
+    def rolling_trips(self, hobby):
+        return RollingWindow(self.timeline.hobby_days(hobby), self.timeline.hobby_weights(hobby))
+
+    # Most trips in any rolling window, for each dated hobby and window length
+    @memoized
+    def peak_rolling_trips(self, hobbies=None):
+
+        ret = {}
+        for sport in self.timeline.hobbies_of(DATED_TYPES):
+            if hobbies is not None and sport not in hobbies:
+                continue
+            rolling = self.rolling_trips(sport)
+            for window in WINDOWS:
+                ret["{} ({} days)".format(sport, window)] = int(rolling.peak(window))
+
+        return ret
+
+    # Trips in each rolling window ending on the hobby's latest activity
+    @memoized
+    def latest_rolling_trips(self, hobbies=None):
+
+        ret = {}
+        for sport in self.timeline.hobbies_of(DATED_TYPES):
+            if hobbies is not None and sport not in hobbies:
+                continue
+            rolling = self.rolling_trips(sport)
+            for window in WINDOWS:
+                ret["{} ({} days)".format(sport, window)] = int(rolling.latest(window))
+
+        return ret
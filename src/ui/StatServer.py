@@ -0,0 +1,237 @@
+# This file contains a long-running local server for HobbyStats
+# The logs are read once and kept in memory with the stat classes, so each
+# request is answered from already-loaded data instead of re-reading the logs
+#
+# Author: Josh McIntyre
+#
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from LogReader import LogReader
+from LogFinder import LogFinder
+from ParallelReader import DEFAULT_BACKEND
+from Rollup import Rollup
+from Timeline import Timeline
+from TripStats import TripStats
+from MileageStats import MileageStats
+from DateStats import DateStats
+from StatRegistry import STATS
+from StatReport import StatReport, to_jsonable
+from StatExecutor import make_processors
+
+# How often to check the log directory for changes, in seconds
+POLL_INTERVAL = 1.0
+
+# This class keeps the loaded data resident and reloads it when logs change
+# Only logs that were added, removed or modified since the last check are
+# re-read, the other hobbies keep their already loaded arrays
+class StatServer:
+
+    # Initialize with the log directory and the options for the log reader
+    # With warm set, every stat is computed after each load, so requests are
+    # answered straight from the memo
+    # recursive, include and exclude control which logs are served, see LogFinder
+    # backend picks how logs are tokenized, see ParallelReader.BACKENDS
+    # With rollups unset, every stat is answered from the log rows, see Rollup
+    # With approximate set, sketched stats are estimated, see Timeline
+    def __init__(self, logdir, cache=None, incremental=False, poll_interval=POLL_INTERVAL, warm=True, recursive=False, include=None, exclude=None, backend=DEFAULT_BACKEND, rollups=True, approximate=False):
+
+        self.logdir = logdir
+        self.cache = cache
+        self.incremental = incremental
+        self.backend = backend
+        self.finder_args = { "recursive" : recursive, "include" : include, "exclude" : exclude }
+        self.poll_interval = poll_interval
+        self.warm = warm
+        self.rollups = rollups
+        self.approximate = approximate
+        self.generation = 0
+        self.stopped = threading.Event()
+        self.reload_lock = threading.Lock()
+
+        self.files = self.snapshot()
+        self.data = self.reader().read_frames()
+        self.rollup = self.reader().read_rollups(self.data) if rollups else None
+        self.processors = self.build(self.data, self.rollup)
+
+    # Make a log reader with the server's options
+    def reader(self):
+        return LogReader(self.logdir, cache=self.cache, incremental=self.incremental, backend=self.backend, **self.finder_args)
+
+    # Size and modification time of every log, used to spot changes
+    # Logs are found the same way the log reader finds them
+    def snapshot(self):
+
+        found = LogFinder(self.logdir, **self.finder_args).find()
+        return { path : ( st.st_size, st.st_mtime_ns ) for path, st in found }
+
+    # Set up the stat processor classes over one data set, with its rollup if any
+    # The new processors are only swapped in once they're fully built, so
+    # requests in flight keep using the old ones
+    def build(self, data, rollup=None):
+
+        timeline = Timeline(data, rollup=rollup, approximate=self.approximate)
+        processors = {
+                        "trip" : TripStats(data, timeline=timeline),
+                        "mileage" : MileageStats(data, timeline=timeline),
+                        "date" : DateStats(data, timeline=timeline),
+                     }
+        if self.warm:
+            StatReport(processors).build()
+
+        self.generation += 1
+        return processors
+
+    # Check the log directory and reload any logs that changed
+    # Returns the list of log paths that were added, removed or modified
+    def check_changes(self):
+
+        with self.reload_lock:
+            files = self.snapshot()
+            changed = [ f for f in files if self.files.get(f) != files[f] ]
+            removed = [ f for f in self.files if f not in files ]
+            if not changed and not removed:
+                return []
+
+            lr = self.reader()
+            gone = [ lr.pretty_hobby(logfile) for logfile in changed + removed ]
+            fresh = lr.read_frames(changed)
+            data = self.data.without(gone).concat(fresh)
+
+            # Only the changed hobbies' rollups are rebuilt, the rest are kept
+            rollup = None
+            if self.rollups:
+                rollup = Rollup.merge([ self.rollup, lr.read_rollups(fresh) ], data.names())
+
+            self.processors = self.build(data, rollup)
+            self.data = data
+            self.rollup = rollup
+            self.files = files
+
+            return changed + removed
+
+    # Poll for changes until stopped
+    def watch(self):
+
+        while not self.stopped.wait(self.poll_interval):
+            try:
+                self.check_changes()
+            except Exception as e:
+                print("Error reloading logs: {}".format(e))
+
+    # Start polling for changes in a background thread
+    def start_watching(self):
+
+        thread = threading.Thread(target=self.watch, daemon=True)
+        thread.start()
+        return thread
+
+    # Stop polling for changes
+    def stop(self):
+        self.stopped.set()
+
+    # Stat processors over a date window and hobby subset, see Timeline.query
+    # Unfiltered requests use the resident, warmed processors
+    # Raises ValueError for a bad date or hobby pattern
+    def select(self, first=None, last=None, hobbies=None):
+
+        processors = self.processors
+        if first is None and last is None and not hobbies:
+            return processors
+        return make_processors(processors["trip"].timeline.query(first, last, hobbies))
+
+    # Compute one registered stat, optionally filtered, see select
+    # Raises KeyError or IndexError for an unknown stat
+    def stat(self, stat_type, index, **filters):
+
+        stat_proc = self.select(**filters)[stat_type].funcs[index]
+        return { "index" : index, "title" : stat_proc[2], "result" : to_jsonable(stat_proc[1]()) }
+
+    # Build a batch report over the selected stats, optionally filtered
+    # Raises ValueError for a bad selection
+    def report(self, selection=None, **filters):
+        return StatReport(self.select(**filters)).build(selection)
+
+    # Make an HTTP server for this stat server
+    # Requests are handled on their own threads
+    def make_server(self, host, port):
+
+        httpd = ThreadingHTTPServer(( host, port ), StatRequestHandler)
+        httpd.daemon_threads = True
+        httpd.stats = self
+        return httpd
+
+    # Serve requests until interrupted, reloading changed logs in the background
+    def serve_forever(self, host, port):
+
+        httpd = self.make_server(host, port)
+        self.start_watching()
+        print("Serving stats on http://{}:{}".format(*httpd.server_address[:2]))
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            httpd.server_close()
+
+# This class handles requests to the stat server
+#
+# GET /stats                  - the registered stats for each stat type
+# GET /stat/<type>/<index>    - one stat, ex: /stat/trip/3
+# GET /report?select=<stats>  - a batch report, ex: /report?select=trip:0,mileage
+#
+# Both stat requests take from, to and hobby filters, ex:
+# /stat/mileage/0?from=2023-01-01&to=2023-12-31&hobby=*mtb*
+class StatRequestHandler(BaseHTTPRequestHandler):
+
+    # Keep connections open between requests, and send small responses right
+    # away instead of letting Nagle's algorithm hold them for the next ACK
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    # Route a GET request
+    def do_GET(self):
+
+        stats = self.server.stats
+        url = urlparse(self.path)
+        parts = [ p for p in url.path.split("/") if p ]
+        query = parse_qs(url.query)
+        filters = { "first" : query.get("from", [ None ])[0], "last" : query.get("to", [ None ])[0], "hobbies" : query.get("hobby") }
+
+        if parts == [ "stats" ]:
+            body = { t : [ stat[2] for stat in STATS[t] ] for t in STATS }
+            return self.send_json(200, body)
+
+        if len(parts) == 3 and parts[0] == "stat" and parts[2].isdigit():
+            try:
+                return self.send_json(200, stats.stat(parts[1], int(parts[2]), **filters))
+            except ( KeyError, IndexError ):
+                return self.send_json(404, { "error" : "Unknown stat: {}".format(url.path) })
+            except ValueError as e:
+                return self.send_json(400, { "error" : str(e) })
+
+        if parts == [ "report" ]:
+            selection = query.get("select", [ None ])[0]
+            try:
+                return self.send_json(200, stats.report(selection, **filters))
+            except ValueError as e:
+                return self.send_json(400, { "error" : str(e) })
+
+        self.send_json(404, { "error" : "Unknown path: {}".format(url.path) })
+
+    # Write a JSON response
+    def send_json(self, status, body):
+
+        doc = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(doc)))
+        self.end_headers()
+        self.wfile.write(doc)
+
+    # Keep the console quiet, one line per request adds up
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,100 @@
+# This file contains unit tests for some HobbyStats functionality
+# Every registered stat is run on every available array backend, and the
+# results checked against the numpy backend
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import pytest
+
+import ArrayBackend
+from Timeline import Timeline
+from TripStats import TripStats
+from MileageStats import MileageStats
+from DateStats import DateStats
+from StatRegistry import STATS
+
+# Set up a data set spanning a few years, with chunks small enough that the
+# chunked backend splits every column
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+CHUNK_SIZE = 4
+
+def days(*offsets):
+    return [ DATE + (SECONDS_PER_DAY * o) for o in offsets ]
+
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : days(0, 0, 1, 2, 9, 40, 41, 200, 365, 366, 700, 1500),
+                    "mileage" : np.array([ 5.12, 10.0, 6.22, 3.5, 12.0, 2.25, 8.0, 26.2, 4.0, 4.0, 15.5, 7.75 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_2":
+                {
+                    "dates" : days(1, 3, 40, 120, 121, 122, 400, 1499),
+                    "mileage" : np.array([ 1.5, 2.0, 0.75, 3.0, 3.0, 4.25, 1.0, 2.5 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_3":
+                {
+                    "dates" : days(2, 9, 10, 11, 12, 365, 366, 367, 1100),
+                    "type" : "date"
+                },
+                "test_activity_4":
+                {
+                    "dates" : days(0, 181, 365, 546, 730),
+                    "weights" : [ 4, 6, 2, 8, 3 ],
+                    "type" : "tripcount"
+                },
+            }
+
+# A backend instance for each available backend, with small chunks so the
+# chunked backend actually splits the arrays
+def backends():
+    made = {}
+    for name in ArrayBackend.available_backends():
+        if name == "chunked":
+            made[name] = ArrayBackend.ChunkedBackend(workers=2, chunk_size=CHUNK_SIZE)
+        else:
+            made[name] = ArrayBackend.make_backend(name)
+    return made
+
+def run_stats(data, backend):
+    timeline = Timeline(data, backend=backend)
+    processors = { "trip" : TripStats(data, timeline=timeline), "mileage" : MileageStats(data, timeline=timeline), "date" : DateStats(data, timeline=timeline) }
+    return { ( stat_type, i ) : func() for stat_type in STATS for i, ( _, func, _ ) in enumerate(processors[stat_type].funcs) }
+
+# Test parity
+@pytest.mark.parametrize("name", sorted(backends()))
+def test_stats_match_numpy(name):
+    expected = run_stats(TEST_DATA, ArrayBackend.NumpyBackend())
+    results = run_stats(TEST_DATA, backends()[name])
+
+    for key, ret in expected.items():
+        assert list(results[key].keys()) == list(ret.keys()), key
+        for k, v in ret.items():
+            assert results[key][k] == pytest.approx(v, abs=0.011), ( key, k )
+
+def test_chunked_reductions():
+    a = np.arange(1000, dtype="int64") % 37
+    backend = ArrayBackend.ChunkedBackend(workers=3, chunk_size=CHUNK_SIZE)
+
+    assert backend.sum(a) == a.sum()
+    assert backend.max(a) == 36
+    assert backend.min(a) == 0
+    assert backend.count_nonzero(a) == np.count_nonzero(a)
+    assert backend.mean(a) == pytest.approx(a.mean())
+    assert np.array_equal(backend.bincount(a), np.bincount(a))
+    assert np.allclose(backend.bincount(a, a * 0.5), np.bincount(a, a * 0.5))
+
+# Test selection
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        ArrayBackend.make_backend("abacus")
+
+def test_backend_from_environment(monkeypatch):
+    monkeypatch.setattr(ArrayBackend, "ACTIVE", None)
+    monkeypatch.setenv(ArrayBackend.ENV_VAR, "chunked")
+
+    assert ArrayBackend.get_backend().name == "chunked"
@@ -0,0 +1,68 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import datetime
+import os
+import time
+
+import numpy as np
+import Calendar
+
+# Set up a basic data set
+# Random timestamps from 2015 to 2025, plus every half hour around a DST change
+# There are more timestamps than days, so offsets come from the transition search
+RNG = np.random.default_rng(7)
+TEST_TIMESTAMPS = np.concatenate([
+                                    RNG.integers(1420070400, 1735689600, size=5000),
+                                    np.arange(1710050400 - 86400, 1710050400 + 86400, 1800),
+                                 ])
+TEST_ZONES = [ "UTC", "America/New_York", "Australia/Lord_Howe", "Asia/Kolkata" ]
+
+# Run a check under each test time zone, restoring the original after
+def in_each_zone(check):
+    original = os.environ.get("TZ")
+    try:
+        for zone in TEST_ZONES:
+            os.environ["TZ"] = zone
+            time.tzset()
+            check()
+    finally:
+        if original is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = original
+        time.tzset()
+
+# Test bucketing against datetime
+def test_matches_datetime():
+    def check():
+        cal = Calendar.Calendar(TEST_TIMESTAMPS)
+        year, month, day = cal.year_month_day()
+        iso_year, week = cal.iso_year_week()
+        for i, ts in enumerate(TEST_TIMESTAMPS.tolist()):
+            expected = datetime.date.fromtimestamp(ts)
+            assert ( year[i], month[i], day[i] ) == ( expected.year, expected.month, expected.day )
+            assert ( iso_year[i], week[i] ) == tuple(expected.isocalendar())[:2]
+
+    in_each_zone(check)
+
+def test_count_by_year():
+    def check():
+        cal = Calendar.Calendar(TEST_TIMESTAMPS)
+        years, counts = np.unique([ datetime.date.fromtimestamp(ts).year for ts in TEST_TIMESTAMPS.tolist() ], return_counts=True)
+
+        assert cal.count_by_year() == dict(zip(years.tolist(), counts.tolist()))
+
+    in_each_zone(check)
+
+def test_sparse_timestamps():
+    def check():
+        sparse = [ 0, 1641013200, 1641013200, 2 ** 31 - 1 ]
+        cal = Calendar.Calendar(sparse)
+
+        assert list(cal.days) == [ datetime.date.fromtimestamp(ts).toordinal() - datetime.date(1970, 1, 1).toordinal() for ts in sparse ]
+        assert sum(cal.count_by_month().values()) == 4
+        assert sum(cal.count_by_week().values()) == 4
+
+    in_each_zone(check)
@@ -0,0 +1,95 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import ParallelReader
+from ColumnTokenizer import ColumnTokenizer, MAX_FIELD_WIDTH, as_str
+
+# Set up a basic data set
+ROWS = 200
+TEST_LOG = "Date,Location,Distance (mi)\n" + "".join( "{}/{}/2019,Trail,{}.5\n".format(i % 12 + 1, i % 28 + 1, i) for i in range(ROWS) )
+FIELDS = [ "Date", "Location", "Distance (mi)" ]
+
+def write_log(tmp_path, contents, name="trail_mtb.csv"):
+    path = tmp_path / name
+    path.write_bytes(contents.encode())
+    return str(path)
+
+# Read a log with both backends
+def read_both(path, logtype):
+    csv_entry = ParallelReader.ParallelReader(workers=1, backend="csv").read([ ( path, logtype ) ])[path]
+    col_entry = ParallelReader.ParallelReader(workers=1, backend="columns").read([ ( path, logtype ) ])[path]
+    return csv_entry, col_entry
+
+def assert_same(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        if key != "type":
+            assert a[key].dtype == b[key].dtype
+            assert np.array_equal(a[key], b[key], equal_nan=a[key].dtype.kind == "f")
+
+# Test tokenizing
+def test_plain_rows():
+    columns = ColumnTokenizer(FIELDS, [ "Date", "Distance (mi)" ]).tokenize(b"1/2/2019,Trail,3.5\n1/3/2019,Park,10\n")
+
+    assert as_str(columns["Date"]) == [ "1/2/2019", "1/3/2019" ]
+    assert as_str(columns["Distance (mi)"]) == [ "3.5", "10" ]
+    assert "Location" not in columns
+
+def test_quoted_and_crlf_rows():
+    raw = b'1/2/2019,"Trail, North",3.5\r\n\r\n1/3/2019,"Park\nEast",10\r\n'
+    columns = ColumnTokenizer(FIELDS, [ "Date", "Distance (mi)" ]).tokenize(raw)
+
+    assert as_str(columns["Date"]) == [ "1/2/2019", "1/3/2019" ]
+    assert as_str(columns["Distance (mi)"]) == [ "3.5", "10" ]
+
+def test_blank_and_missing_fields():
+    columns = ColumnTokenizer(FIELDS, [ "Date", "Distance (mi)" ]).tokenize(b"1/2/2019,Trail,\n\n1/3/2019,Park\n")
+
+    assert as_str(columns["Date"]) == [ "1/2/2019", "1/3/2019" ]
+    assert as_str(columns["Distance (mi)"]) == [ "", "" ]
+
+def test_missing_column():
+    columns = ColumnTokenizer([ "Date", "Location" ], [ "Date", "Distance (mi)" ]).tokenize(b"1/2/2019,Trail\n")
+
+    assert as_str(columns["Distance (mi)"]) == [ "" ]
+
+def test_wide_field():
+    wide = b"1/2/2019,Trail," + b"9" * (MAX_FIELD_WIDTH + 1) + b"\n1/3/2019,Park,10\n"
+    tokenizer = ColumnTokenizer(FIELDS, [ "Date", "Distance (mi)" ])
+
+    assert tokenizer.tokenize_plain(wide) is None
+    assert as_str(tokenizer.tokenize(wide)["Distance (mi)"]) == [ "9" * (MAX_FIELD_WIDTH + 1), "10" ]
+    assert as_str(tokenizer.tokenize(wide)["Date"]) == [ "1/2/2019", "1/3/2019" ]
+
+# Test the backends give the same data
+def test_mileage_matches_csv(tmp_path):
+    csv_entry, col_entry = read_both(write_log(tmp_path, TEST_LOG), "mileage")
+
+    assert col_entry["dates"].size == ROWS
+    assert_same(csv_entry, col_entry)
+
+def test_bad_rows_match_csv(tmp_path, capsys):
+    log = TEST_LOG + "not a date,Trail,1.0\n2/2/2019,Trail,n/a\n"
+    csv_entry, col_entry = read_both(write_log(tmp_path, log), "mileage")
+
+    # A bad distance still counts as a trip, a bad date doesn't
+    assert col_entry["dates"].size == ROWS + 1
+    assert np.isnan(col_entry["mileage"][-1])
+    assert_same(csv_entry, col_entry)
+    assert capsys.readouterr().err.count("Bad date") == 2
+
+def test_quoted_crlf_log_matches_csv(tmp_path):
+    log = TEST_LOG.replace("Trail", '"Trail, North"').replace("\n", "\r\n")
+    csv_entry, col_entry = read_both(write_log(tmp_path, log), "mileage")
+
+    assert col_entry["dates"].size == ROWS
+    assert_same(csv_entry, col_entry)
+
+def test_date_and_trip_logs_match_csv(tmp_path):
+    date_log = "Date,Location,Notes\n6/1/2019,Park,Note 1\n??,Park,Note 2\n6/3/2019,Gym,\n"
+    trip_log = "Years,Location,Trips,Equipment Type\n2018/2019,Resort,10,Ski\n2015-2016,Park,5,\n2017,Park,many,\n"
+
+    assert_same(*read_both(write_log(tmp_path, date_log, "climbing.csv"), "date"))
+    assert_same(*read_both(write_log(tmp_path, trip_log, "snowsports.csv"), "tripcount"))
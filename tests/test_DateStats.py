@@ -0,0 +1,81 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+import DateStats
+from GapIndex import GapIndex
+
+# Set up a basic data set
+# Activities on Jan 1, 1, 2, 3, 11 and 12, 2022
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DAYS = [ 0, 0, 1, 2, 10, 11 ]
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE + d * SECONDS_PER_DAY for d in TEST_DAYS ],
+                    "type" : "date"
+                },
+                "test_activity_2":
+                {
+                    "dates" : [ DATE, DATE + 5 * SECONDS_PER_DAY ],
+                    "type" : "date"
+                },
+            }
+
+# Test the index
+def test_gap_index():
+    index = GapIndex(np.array(TEST_DAYS) * SECONDS_PER_DAY, TEST_DAYS)
+
+    assert index.days.tolist() == [ 0, 1, 2, 10, 11 ]
+    assert index.gaps.tolist() == [ 1, 1, 8, 1 ]
+    assert index.runs.tolist() == [ 3, 2 ]
+    assert index.longest_gap() == ( 8, 2, 10 )
+    assert index.streak_on(11) == 2
+    assert index.streak_on(12) == 2
+    assert index.streak_on(13) == 0
+
+def test_histogram():
+    index = GapIndex(np.array(TEST_DAYS) * SECONDS_PER_DAY, TEST_DAYS)
+    hist = dict(index.histogram())
+
+    assert hist == { "1 day" : 3, "2 days" : 0, "3-6 days" : 0, "7-13 days" : 1, "14-29 days" : 0, "30-89 days" : 0, "90-364 days" : 0, "365+ days" : 0 }
+
+def test_single_day():
+    index = GapIndex([ DATE ], [ 0 ])
+
+    assert index.mean_span() is None
+    assert index.longest_streak() == 1
+    assert index.longest_gap() is None
+
+# Test statistics
+def test_days_between_match_diffs():
+    ds = DateStats.DateStats(TEST_DATA)
+    diffs = np.diff(TEST_DATA["test_activity"]["dates"])
+
+    assert ds.average_days_between()["test_activity"] == int(np.average(diffs) // SECONDS_PER_DAY)
+    assert ds.max_days_between()["test_activity"] == 8
+    assert ds.average_days_between()["test_activity_2"] == 5
+
+def test_streaks():
+    ds = DateStats.DateStats(TEST_DATA)
+
+    assert ds.longest_streak() == { "test_activity" : 3, "test_activity_2" : 1 }
+    assert ds.current_streak() == { "test_activity" : 2, "test_activity_2" : 0 }
+
+def test_longest_gap():
+    ds = DateStats.DateStats(TEST_DATA)
+    ret = ds.longest_gap()
+
+    assert ret["test_activity_2"]["days"] == 5
+    assert ret["test_activity"]["days"] == 8
+    assert ret["test_activity"]["end"] > ret["test_activity"]["start"]
+
+def test_gap_histogram():
+    ds = DateStats.DateStats(TEST_DATA)
+    ret = ds.gap_histogram()
+
+    assert ret["test_activity (1 day)"] == 3
+    assert ret["test_activity_2 (3-6 days)"] == 1
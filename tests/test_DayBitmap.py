@@ -0,0 +1,96 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import itertools
+
+import numpy as np
+
+from DayBitmap import DayBitmap, popcount
+import DateStats
+
+# Set up a basic data set
+
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE, DATE, DATE + SECONDS_PER_DAY, DATE + 2 * SECONDS_PER_DAY ],
+                    "type" : "date"
+                },
+                "test_activity_2":
+                {
+                    "dates" : [ DATE, DATE + 2 * SECONDS_PER_DAY, DATE + 3 * SECONDS_PER_DAY ],
+                    "mileage" : np.array([ 1.0, 2.0, 3.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_3":
+                {
+                    "dates" : [ DATE + 2 * SECONDS_PER_DAY ],
+                    "type" : "date"
+                },
+            }
+
+# Unsorted day numbers for each hobby, spanning several 64 day words, with
+# repeats, a day on a word boundary, and a hobby with no days
+HOBBY_DAYS = {
+                "test_activity" : [ 15000, 15001, 15001, 15063, 15064, 15200 ],
+                "test_activity_2" : [ 15399, 15064, 15000, 15130 ],
+                "test_activity_3" : [ 15001, 15064, 15200, 15201, 15399, 15000 ],
+                "test_activity_4" : [ 15064 ],
+                "test_activity_5" : [],
+             }
+HOBBIES = list(HOBBY_DAYS)
+
+# Test the bitmap against plain sets of days
+def test_matches_sets():
+    bitmap = DayBitmap(HOBBIES, list(HOBBY_DAYS.values()))
+    sets = [ set(d) for d in HOBBY_DAYS.values() ]
+
+    per_day = {}
+    for s in sets:
+        for d in s:
+            per_day[d] = per_day.get(d, 0) + 1
+    for threshold in range(1, 6):
+        assert bitmap.multi_days(threshold) == sum( 1 for n in per_day.values() if n >= threshold )
+
+    assert bitmap.active_days().tolist() == [ len(s) for s in sets ]
+    both = bitmap.cooccurrence()
+    for i, j in itertools.product(range(len(HOBBIES)), repeat=2):
+        assert both[i, j] == len(sets[i] & sets[j])
+        assert bitmap.days_without(HOBBIES[i], HOBBIES[j]) == len(sets[i] - sets[j])
+
+    for i, s in enumerate(sets):
+        others = set().union(*( sets[:i] + sets[i + 1:] ))
+        assert bitmap.solo_days()[i] == len(s - others)
+
+def test_empty():
+    bitmap = DayBitmap([ "Empty" ], [ [] ])
+
+    assert bitmap.multi_days() == 0
+    assert bitmap.solo_days().tolist() == [ 0 ]
+
+# Test statistics
+def test_multi_activity_days():
+    ds = DateStats.DateStats(TEST_DATA)
+
+    # A hobby logged twice in a day doesn't make it a multi-activity day
+    assert ds.multi_activity_days() == { "multi trip days" : 2 }
+    assert ds.multi_activity_thresholds() == { "2+ hobbies" : 2, "3+ hobbies" : 1 }
+
+def test_cooccurrence():
+    ds = DateStats.DateStats(TEST_DATA)
+    ret = ds.hobby_cooccurrence()
+
+    assert ret["test_activity + test_activity_2"] == 2
+    assert ret["test_activity_2 + test_activity_3"] == 1
+    assert ds.days_without("test_activity", "test_activity_2") == 1
+    assert ds.solo_days() == { "test_activity" : 1, "test_activity_2" : 1, "test_activity_3" : 0 }
+
+def test_popcount_table(monkeypatch):
+    words = np.random.default_rng(13).integers(0, 2 ** 63, size=(3, 5)).astype("uint64")
+    expected = [ sum( bin(int(w)).count("1") for w in row ) for row in words ]
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+
+    assert popcount(words).tolist() == expected
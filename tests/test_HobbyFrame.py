@@ -0,0 +1,110 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import pytest
+
+from HobbyFrame import HobbyFrame, HobbySet, HobbyType, as_hobby_set
+from Timeline import Timeline
+from TripStats import TripStats
+from MileageStats import MileageStats
+from DateStats import DateStats
+from StatRegistry import STATS
+
+# Set up a basic data set, in the log reader's format
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_trips":
+                {
+                    "dates" : np.array([ DATE, DATE, DATE ], dtype="uint32"),
+                    "weights" : np.array([ 2, 3, 1 ], dtype="uint32"),
+                    "type" : "tripcount"
+                },
+
+                "test_activity":
+                {
+                    "dates" : np.array([ DATE + (SECONDS_PER_DAY * 2), DATE, DATE + SECONDS_PER_DAY ], dtype="uint32"),
+                    "mileage" : np.array([ 5.0, 2.0, 3.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+
+                "test_dates":
+                {
+                    "dates" : np.array([ DATE, DATE + (SECONDS_PER_DAY * 5) ], dtype="uint32"),
+                    "type" : "date"
+                },
+            }
+
+# Test the frames
+def test_frame_columns():
+    frames = HobbySet.from_dict(TEST_DATA)
+
+    assert frames.names() == [ "test_trips", "test_activity", "test_dates" ]
+    activity = frames["test_activity"]
+    assert activity.type is HobbyType.MILEAGE
+    assert activity.dates.dtype == np.int64
+    assert activity.mileage.dtype == np.float32
+    assert activity.weights is None
+    assert not activity.ordered
+    assert frames["test_dates"].ordered
+    assert frames["test_trips"].weights.dtype == np.int64
+
+def test_frame_no_copy():
+    dates = np.array([ DATE, DATE + SECONDS_PER_DAY ], dtype="int64")
+    frame = HobbyFrame("test", "date", dates)
+
+    assert frame.dates is dates
+
+def test_frame_errors():
+    with pytest.raises(ValueError):
+        HobbyFrame("test", "bogus", [ DATE ])
+    with pytest.raises(ValueError):
+        HobbyFrame("test", "mileage", [ DATE ])
+    with pytest.raises(ValueError):
+        HobbyFrame("test", "mileage", [ DATE, DATE ], mileage=[ 1.0 ])
+
+def test_frame_slots():
+    frame = HobbyFrame("test", "date", [ DATE ])
+
+    with pytest.raises(AttributeError):
+        frame.extra = 1
+
+def test_round_trip():
+    data = HobbySet.from_dict(TEST_DATA).to_dict()
+
+    assert list(data) == list(TEST_DATA)
+    for hobby, entry in TEST_DATA.items():
+        assert sorted(data[hobby]) == sorted(entry)
+        assert data[hobby]["type"] == entry["type"]
+        assert list(data[hobby]["dates"]) == list(entry["dates"])
+
+# Test combining
+def test_set_concat_shares_frames():
+    frames = HobbySet.from_dict(TEST_DATA)
+    update = HobbySet([ HobbyFrame("test_dates", "date", [ DATE ]) ])
+
+    joined = frames.without([ "test_trips" ]).concat(update)
+    assert joined.names() == [ "test_activity", "test_dates" ]
+    assert joined["test_activity"] is frames["test_activity"]
+    assert joined["test_dates"] is update["test_dates"]
+    assert frames.names() == [ "test_trips", "test_activity", "test_dates" ]
+
+# Test the stat classes get the same results from frames and dictionaries
+def test_stats_match_dict():
+    frames = as_hobby_set(TEST_DATA)
+    assert as_hobby_set(frames) is frames
+
+    for cls in ( TripStats, MileageStats, DateStats ):
+        from_dict = cls(TEST_DATA)
+        from_frames = cls(frames)
+        for ( _, expected, _ ), ( _, func, _ ) in zip(from_dict.funcs, from_frames.funcs):
+            assert repr(func()) == repr(expected())
+
+def test_timeline_skips_sorted():
+    tl = Timeline(HobbySet.from_dict(TEST_DATA))
+
+    assert list(tl.hobby_dates("test_activity")) == [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ]
+    assert list(tl.hobby_mileage("test_activity")) == [ 2.0, 3.0, 5.0 ]
+    assert tl.types == [ "tripcount", "mileage", "date" ]
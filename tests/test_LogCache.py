@@ -0,0 +1,119 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import os
+
+import numpy as np
+import LogCache
+import LogReader
+from HobbyFrame import HobbyFrame
+
+# Set up a basic data set
+TEST_LOG = "Date,Location,Distance (mi)\n6/1/2019,Local Trails,5.12\n6/2/2019,State Park,10\n"
+APPENDED_ROW = "6/3/2020,Local Trails,6.22\n"
+
+def write_log(tmp_path, contents):
+    path = tmp_path / "trail_mtb.csv"
+    path.write_text(contents)
+    return str(path)
+
+def read(tmp_path):
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    return LogReader.LogReader(str(tmp_path), cache=cache).read_logs()
+
+# Test cache behavior
+def test_cache_roundtrip(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    fresh = read(tmp_path)
+    cached = read(tmp_path)
+
+    assert isinstance(cached["Trail Mtb"]["dates"], np.memmap)
+    assert np.array_equal(fresh["Trail Mtb"]["dates"], cached["Trail Mtb"]["dates"])
+    assert np.array_equal(fresh["Trail Mtb"]["mileage"], cached["Trail Mtb"]["mileage"])
+
+def test_cache_hit_is_zero_copy(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    cached = read(tmp_path)["Trail Mtb"]
+
+    frame = HobbyFrame.from_dict("Trail Mtb", cached)
+    assert np.shares_memory(frame.dates, cached["dates"])
+    assert np.shares_memory(frame.mileage, cached["mileage"])
+
+def test_store_keeps_mapped_columns(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    old = read(tmp_path)["Trail Mtb"]
+    before = np.array(old["mileage"])
+
+    write_log(tmp_path, TEST_LOG.replace("5.12", "7.50") + APPENDED_ROW.replace("2020", "2019"))
+    new = read(tmp_path)["Trail Mtb"]
+
+    assert len(new["mileage"]) == 3
+    assert np.array_equal(old["mileage"], before)
+    assert not [ name for name in os.listdir(tmp_path / LogCache.CACHE_DIR_NAME) if name.endswith(".tmp") ]
+
+def test_cache_touch_without_change(tmp_path):
+    path = write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    os.utime(path, ns=(0, 0))
+
+    cached = read(tmp_path)
+    assert isinstance(cached["Trail Mtb"]["dates"], np.memmap)
+
+def test_cache_invalidated_on_change(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read(tmp_path)
+    write_log(tmp_path, TEST_LOG + APPENDED_ROW)
+
+    data = read(tmp_path)
+    assert data["Trail Mtb"]["mileage"].size == 3
+
+# Test incremental appends
+def read_incremental(tmp_path):
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    return LogReader.LogReader(str(tmp_path), cache=cache, incremental=True).read_logs()
+
+def test_incremental_append(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read_incremental(tmp_path)
+    write_log(tmp_path, TEST_LOG + APPENDED_ROW)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.append_state(str(tmp_path / "trail_mtb.csv"), "mileage") is not None
+
+    data = read_incremental(tmp_path)
+    full = LogReader.LogReader(str(tmp_path)).read_logs()
+    assert np.array_equal(data["Trail Mtb"]["dates"], full["Trail Mtb"]["dates"])
+    assert np.array_equal(data["Trail Mtb"]["mileage"], full["Trail Mtb"]["mileage"])
+
+    # The appended rows are joined on disk, so the full columns are still mapped
+    frame = HobbyFrame.from_dict("Trail Mtb", data["Trail Mtb"])
+    assert isinstance(data["Trail Mtb"]["dates"], np.memmap)
+    assert np.shares_memory(frame.dates, data["Trail Mtb"]["dates"])
+
+def test_incremental_rewrite(tmp_path):
+    write_log(tmp_path, TEST_LOG)
+    read_incremental(tmp_path)
+    write_log(tmp_path, TEST_LOG.replace("10", "12") + APPENDED_ROW)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.append_state(str(tmp_path / "trail_mtb.csv"), "mileage") is None
+
+    data = read_incremental(tmp_path)
+    assert np.array_equal(data["Trail Mtb"]["mileage"], np.array([ 5.12, 12.0, 6.22 ], dtype="float32"))
+
+# An edit that keeps the size, before the bytes checked at the offset
+def test_incremental_same_size_edit(tmp_path):
+    padding = "6/4/2019,State Park,10\n" * 500
+    write_log(tmp_path, TEST_LOG + padding)
+    read_incremental(tmp_path)
+    write_log(tmp_path, TEST_LOG.replace("5.12", "7.12") + padding)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.append_state(str(tmp_path / "trail_mtb.csv"), "mileage") is None
+
+    data = read_incremental(tmp_path)
+    assert data["Trail Mtb"]["mileage"][0] == np.float32(7.12)
+    assert np.array_equal(read(tmp_path)["Trail Mtb"]["mileage"], data["Trail Mtb"]["mileage"])
@@ -0,0 +1,87 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import builtins
+import os
+import pytest
+
+import LogCache
+import LogFinder
+import LogReader
+
+# Set up a basic data set
+MILEAGE_LOG = "Date,Location,Distance (mi)\n6/1/2019,Local Trails,5.12\n6/2/2019,State Park,10\n"
+DATE_LOG = "Date,Location\n1/1/2019,BJJ Gym\n1/3/2019,BJJ Gym\n"
+
+def make_tree(tmp_path):
+    (tmp_path / "trail_mtb.csv").write_text(MILEAGE_LOG)
+    (tmp_path / "notes.txt").write_text("not a log\n")
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "archive" / "bjj.csv").write_text(DATE_LOG)
+    (tmp_path / ".hidden").mkdir()
+    (tmp_path / ".hidden" / "skip.csv").write_text(DATE_LOG)
+
+def names(found, tmp_path):
+    return sorted( os.path.relpath(path, tmp_path) for path, st in found )
+
+# Test discovery
+def test_flat(tmp_path):
+    make_tree(tmp_path)
+    found = LogFinder.LogFinder(str(tmp_path)).find()
+
+    assert names(found, tmp_path) == [ "notes.txt", "trail_mtb.csv" ]
+    assert all( st.st_size > 0 for path, st in found )
+
+def test_recursive_patterns(tmp_path):
+    make_tree(tmp_path)
+    found = LogFinder.LogFinder(str(tmp_path), recursive=True, include=[ "*.csv" ]).find()
+    assert names(found, tmp_path) == [ os.path.join("archive", "bjj.csv"), "trail_mtb.csv" ]
+
+    found = LogFinder.LogFinder(str(tmp_path), recursive=True, include=[ "*.csv" ], exclude=[ "archive/*" ]).find()
+    assert names(found, tmp_path) == [ "trail_mtb.csv" ]
+
+# Test that each log is opened once per load, and not at all once cached
+def test_single_open(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    logfile = os.path.join(str(tmp_path), "trail_mtb.csv")
+    opens = []
+    real_open = builtins.open
+    def counting_open(file, *args, **kwargs):
+        opens.append(file)
+        return real_open(file, *args, **kwargs)
+    monkeypatch.setattr(builtins, "open", counting_open)
+
+    cache = LogCache.LogCache(str(tmp_path / "cache"))
+    data = LogReader.LogReader(str(tmp_path), cache=cache, workers=1).read_logs()
+    assert opens.count(logfile) == 1
+    assert data["Trail Mtb"]["mileage"].size == 2
+
+    opens.clear()
+    cache = LogCache.LogCache(str(tmp_path / "cache"))
+    data = LogReader.LogReader(str(tmp_path), cache=cache, workers=1).read_logs()
+    assert opens.count(logfile) == 0
+    assert data["Trail Mtb"]["mileage"].size == 2
+
+# Test that logs with the same file name in different subdirectories are read,
+# and cached, as separate hobbies
+def test_recursive_same_name(tmp_path):
+    (tmp_path / "2019").mkdir()
+    (tmp_path / "2020").mkdir()
+    (tmp_path / "2019" / "trail_mtb.csv").write_text(MILEAGE_LOG)
+    (tmp_path / "2020" / "trail_mtb.csv").write_text("Date,Location,Distance (mi)\n6/1/2020,Local Trails,7.5\n")
+
+    for i in range(2):
+        cache = LogCache.LogCache(str(tmp_path / ".cache"))
+        data = LogReader.LogReader(str(tmp_path), cache=cache, workers=1, recursive=True).read_logs()
+        assert sorted(data) == [ "2019/Trail Mtb", "2020/Trail Mtb" ]
+        assert data["2019/Trail Mtb"]["mileage"].size == 2
+        assert list(data["2020/Trail Mtb"]["mileage"]) == [ 7.5 ]
+
+# Test that logs that would share a hobby name are refused
+def test_duplicate_hobby(tmp_path):
+    (tmp_path / "trail_mtb.csv").write_text(MILEAGE_LOG)
+    (tmp_path / "Trail_Mtb.csv").write_text(MILEAGE_LOG)
+
+    with pytest.raises(ValueError):
+        LogReader.LogReader(str(tmp_path))
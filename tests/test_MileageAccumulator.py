@@ -0,0 +1,47 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import MileageAccumulator
+import MileageStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+CHUNK_1 = { "dates" : np.array([ DATE, DATE + SECONDS_PER_DAY ], dtype="uint32"), "mileage" : np.array([ 2.0, 2.0 ], dtype="float32") }
+CHUNK_2 = { "dates" : np.array([ DATE + (SECONDS_PER_DAY * 400) ], dtype="uint32"), "mileage" : np.array([ 5.0 ], dtype="float32") }
+
+def accumulate(*chunks):
+    acc = MileageAccumulator.MileageAccumulator()
+    for chunk in chunks:
+        acc.update(chunk)
+    return acc
+
+# Test accumulation
+def test_update():
+    acc = accumulate(CHUNK_1, CHUNK_2)
+
+    assert acc.count == 3
+    assert acc.total == 9.0
+    assert acc.mean == 3.0
+    assert acc.min == 2.0
+    assert acc.max == 5.0
+    assert acc.first_date == DATE
+    assert acc.last_date == DATE + (SECONDS_PER_DAY * 400)
+
+def test_merge_matches_update():
+    merged = accumulate(CHUNK_2).merge(accumulate(CHUNK_1))
+    single = accumulate(CHUNK_1, CHUNK_2)
+
+    assert vars(merged) == vars(single)
+
+# Test stats answered from accumulators
+def test_streaming_stats():
+    ms = MileageStats.MileageStats(accumulators={ "test_activity" : accumulate(CHUNK_1, CHUNK_2) })
+
+    assert ms.total_mileage()["total mileage"] == 9.0
+    assert ms.total_years()["total years"] == 1
+    assert ms.avg_mileage_hobby()["test_activity"] == 3.0
+    assert ms.min_mileage_hobby()["test_activity"] == 2.0
+    assert ms.max_mileage_hobby()["test_activity"] == 5.0
@@ -4,8 +4,13 @@
 #
 import time
 
-from npimporter import np
+import numpy as np
+import MileageAccumulator
 import MileageStats
+import TripStats
+from HobbyFrame import HobbySet
+from Rollup import Rollup
+from Timeline import Timeline
 
 # Set up a basic data set
 now = time.time()
@@ -48,4 +53,29 @@ def test_max_mileage():
     ms = MileageStats.MileageStats(TEST_DATA)
     ret = ms.max_mileage_hobby()
 
-    assert ret["test_activity"] == 5.0
\ No newline at end of file
+    assert ret["test_activity"] == 5.0
+# A trip with a bad distance counts as a trip, but not towards the mileage
+BAD_MILEAGE_DATA = {
+                        "test_activity":
+                        {
+                            "dates" : [ now, now + SECONDS_PER_DAY, now + (SECONDS_PER_DAY * 2), now + (SECONDS_PER_DAY * 3) ],
+                            "mileage" : np.array([ 2.0, np.nan, 2.0, 5.0 ], dtype="float32"),
+                            "type" : "mileage"
+                        }
+                   }
+
+def test_bad_mileage_rows():
+    frames = HobbySet.from_dict(BAD_MILEAGE_DATA)
+    rollup = Rollup.build(frames["test_activity"])
+    for timeline in [ Timeline(frames), Timeline(frames, rollup=rollup) ]:
+        ms = MileageStats.MileageStats(frames, timeline=timeline)
+
+        assert ms.total_mileage()["total mileage"] == 9.0
+        assert ms.avg_mileage_hobby()["test_activity"] == 3.0
+        assert ms.min_mileage_hobby()["test_activity"] == 2.0
+        assert ms.max_mileage_hobby()["test_activity"] == 5.0
+        assert TripStats.TripStats(frames, timeline=timeline).total_trips()["total trips"] == 4
+
+    acc = MileageAccumulator.MileageAccumulator()
+    acc.update(dict(BAD_MILEAGE_DATA["test_activity"], dates=np.array(BAD_MILEAGE_DATA["test_activity"]["dates"], dtype="uint32")))
+    assert ( acc.count, acc.total, acc.min, acc.max ) == ( 3, 9.0, 2.0, 5.0 )
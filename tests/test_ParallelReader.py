@@ -0,0 +1,51 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import ParallelReader
+
+# Set up a basic data set
+ROWS = 500
+TEST_LOG = "Date,Location,Distance (mi)\n" + "".join( "{}/{}/2019,Trail,{}.5\n".format(i % 12 + 1, i % 28 + 1, i) for i in range(ROWS) )
+
+def write_log(tmp_path, contents, name="trail_mtb.csv"):
+    path = tmp_path / name
+    path.write_text(contents)
+    return str(path)
+
+# Test chunk planning
+def test_chunks_on_row_boundaries(tmp_path):
+    path = write_log(tmp_path, TEST_LOG)
+    pr = ParallelReader.ParallelReader(workers=1, chunk_size=1000)
+    tasks = pr.plan_chunks(path, "mileage")
+
+    raw = open(path, "rb").read()
+    assert len(tasks) > 1
+    assert tasks[-1][3] == len(raw)
+    for task in tasks:
+        assert raw[task[2] - 1:task[2]] == b"\n"
+
+def test_quoted_log_not_split(tmp_path):
+    path = write_log(tmp_path, TEST_LOG.replace("Trail", '"Trail, North"'))
+    pr = ParallelReader.ParallelReader(workers=1, chunk_size=1000)
+
+    assert len(pr.plan_chunks(path, "mileage")) == 1
+
+# Test parallel parsing
+def test_parallel_matches_serial(tmp_path):
+    path = write_log(tmp_path, TEST_LOG)
+    serial = ParallelReader.ParallelReader(workers=1).read([ ( path, "mileage" ) ])[path]
+    parallel = ParallelReader.ParallelReader(workers=2, chunk_size=1000).read([ ( path, "mileage" ) ])[path]
+
+    assert serial["dates"].size == ROWS
+    assert np.array_equal(serial["dates"], parallel["dates"])
+    assert np.array_equal(serial["mileage"], parallel["mileage"])
+
+# Test trip count logs
+def test_trip_seasons_weighted(tmp_path):
+    path = write_log(tmp_path, "Years,Location,Trips\n2018/2019,Resort,10\n2015-2016,Park,5\n2017,Park,0\n", name="snowsports.csv")
+    entry = ParallelReader.ParallelReader(workers=1).read([ ( path, "tripcount" ) ])[path]
+
+    assert entry["dates"].size == 3
+    assert entry["weights"].tolist() == [ 10, 2, 2 ]
@@ -0,0 +1,79 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import ParallelReader
+import Profiler
+
+# Set up a basic data set
+ROWS = 500
+TEST_LOG = "Date,Location,Distance (mi)\n" + "".join( "{}/{}/2019,Trail,{}.5\n".format(i % 12 + 1, i % 28 + 1, i) for i in range(ROWS) )
+
+# Test spans
+def test_disabled_records_nothing():
+    prof = Profiler.Profiler()
+    with prof.span("stage") as span:
+        pass
+    prof.count("log.csv", rows=1)
+
+    assert span is Profiler.NULL_SPAN
+    assert prof.events == []
+    assert prof.counters == {}
+
+def test_nested_spans():
+    prof = Profiler.Profiler()
+    prof.enable()
+    with prof.span("outer"):
+        with prof.span("inner", file="log.csv"):
+            pass
+        with prof.span("inner", file="log.csv"):
+            pass
+    prof.disable()
+
+    stages = { name : ( calls, seconds ) for name, calls, seconds, peak in prof.stages() }
+    assert stages["outer"][0] == 1
+    assert stages["inner"][0] == 2
+    assert stages["outer"][1] >= stages["inner"][1]
+    assert sorted(e["depth"] for e in prof.events) == [ 0, 1, 1 ]
+
+def test_peak_alloc_includes_nested():
+    prof = Profiler.Profiler()
+    prof.enable(memory=True)
+    with prof.span("outer"):
+        with prof.span("inner"):
+            block = np.ones(1 << 20, dtype="uint8")
+            del block
+    prof.disable()
+
+    peaks = { e["name"] : e["peak_alloc"] for e in prof.events }
+    assert peaks["inner"] >= 1 << 20
+    assert peaks["outer"] >= peaks["inner"]
+
+def test_wrap():
+    prof = Profiler.Profiler()
+    double = prof.wrap("double", lambda x: x * 2)
+
+    assert double(2) == 4
+    assert prof.events == []
+    prof.enable()
+    assert double(3) == 6
+    assert [ e["name"] for e in prof.events ] == [ "double" ]
+
+# Test worker spans
+def test_worker_spans_merged(tmp_path):
+    path = tmp_path / "trail_mtb.csv"
+    path.write_text(TEST_LOG)
+    Profiler.PROFILER.reset()
+    Profiler.PROFILER.enable()
+    try:
+        ParallelReader.ParallelReader(workers=2, chunk_size=1000).read([ ( str(path), "mileage" ) ])
+    finally:
+        Profiler.PROFILER.disable()
+
+    stages = { name : calls for name, calls, seconds, peak in Profiler.PROFILER.stages() }
+    assert stages["read_chunk"] > 1
+    assert stages["parse_dates"] == stages["read_chunk"]
+    assert Profiler.PROFILER.counters[str(path)]["rows"] == ROWS
+    assert Profiler.PROFILER.counters[str(path)]["bytes"] == len(TEST_LOG) - TEST_LOG.index("\n") - 1
+    Profiler.PROFILER.reset()
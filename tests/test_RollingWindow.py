@@ -0,0 +1,79 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+from RollingWindow import RollingWindow, WINDOWS
+import MileageStats
+import TripStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 10), DATE + (SECONDS_PER_DAY * 40) ],
+                    "mileage" : np.array([ 2.0, 3.0, 5.0, 1.5 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_2":
+                {
+                    "dates" : [ DATE, DATE ],
+                    "weights" : [ 4, 6 ],
+                    "type" : "tripcount"
+                },
+            }
+
+# Day numbers and mileage to check the engine on, with repeated days and gaps
+# both inside and longer than each window
+DAYS = np.array([ 18000, 18000, 18003, 18010, 18040, 18041, 18100, 18101, 18365, 18400, 18800 ], dtype="int64")
+MILES = np.array([ 2.0, 3.5, 5.12, 10.0, 1.5, 6.22, 13.1, 4.0, 26.2, 8.0, 3.0 ], dtype="float32")
+
+# Totals the slow way, adding up every day in each window
+def naive(days, values, points, window):
+    return np.array([ values[(days > p - window) & (days <= p)].sum() for p in points ])
+
+# Test the engine
+def test_matches_naive():
+    rolling = RollingWindow(DAYS, MILES)
+    for window in WINDOWS:
+        points, totals = rolling.at_dates(window)
+        assert np.allclose(totals, naive(DAYS, MILES, points, window))
+
+def test_daily_grid():
+    rolling = RollingWindow(DAYS)
+    points, totals = rolling.daily(30)
+
+    assert points[0] == DAYS[0] and points[-1] == DAYS[-1]
+    assert points.size == DAYS[-1] - DAYS[0] + 1
+    assert np.array_equal(totals, naive(DAYS, np.ones(DAYS.size, dtype="int64"), points, 30))
+    assert rolling.peak(30) == totals.max() == 4
+
+def test_unsorted_and_empty():
+    assert RollingWindow(DAYS[::-1], MILES[::-1]).peak(7) == RollingWindow(DAYS, MILES).peak(7)
+    assert RollingWindow([]).peak(7) == 0
+    assert RollingWindow([]).latest(7) == 0
+
+# Test statistics
+def test_rolling_trips():
+    ts = TripStats.TripStats(TEST_DATA)
+    peak = ts.peak_rolling_trips()
+    latest = ts.latest_rolling_trips()
+
+    assert list(peak) == [ "test_activity ({} days)".format(w) for w in WINDOWS ]
+    assert peak["test_activity (7 days)"] == 2
+    assert peak["test_activity (30 days)"] == 3
+    assert latest["test_activity (7 days)"] == 1
+    assert latest["test_activity (90 days)"] == 4
+
+def test_rolling_mileage():
+    ms = MileageStats.MileageStats(TEST_DATA)
+    peak = ms.peak_rolling_mileage()
+    latest = ms.latest_rolling_mileage()
+
+    assert peak["test_activity (7 days)"] == 5.0
+    assert peak["test_activity (30 days)"] == 10.0
+    assert latest["test_activity (30 days)"] == 1.5
+    assert latest["test_activity (365 days)"] == 11.5
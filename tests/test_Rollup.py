@@ -0,0 +1,143 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import pytest
+
+import LogCache
+import LogReader
+from HobbyFrame import HobbySet
+from Rollup import Rollup, ROLLUP_FORMAT, local_zone
+from Timeline import Timeline
+from StatExecutor import StatExecutor, make_processors
+from StatRegistry import STATS
+
+# Set up a data set with several hobbies of each type
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_LOG = "Date,Location,Distance (mi)\n6/1/2019,Local Trails,5.12\n6/2/2019,State Park,10\n"
+APPENDED_ROW = "7/3/2020,Local Trails,6.22\n"
+
+def days(*offsets):
+    return [ DATE + (SECONDS_PER_DAY * o) for o in offsets ]
+
+# Dates are left unsorted, so building has to sort them
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : days(40, 0, 366, 1, 1, 200, 31, 700),
+                    "mileage" : np.array([ 3.5, 5.12, 26.2, 10.0, 6.22, 12.0, 2.25, 4.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_2":
+                {
+                    "dates" : days(3, 2, 45, 366, 120, 2),
+                    "type" : "date"
+                },
+                "test_activity_3":
+                {
+                    "dates" : days(365, 0, 181),
+                    "weights" : [ 2, 4, 6 ],
+                    "type" : "tripcount"
+                },
+                "test_activity_4":
+                {
+                    "dates" : days(500, 2, 31, 30, 101),
+                    "mileage" : np.array([ 3.0, 1.5, 0.75, 2.0, 13.1 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+            }
+
+def make_rollup(data):
+    frames = HobbySet.from_dict(data)
+    return Rollup.merge([ Rollup.build(frames[h]) for h in reversed(frames.names()) ], frames.names())
+
+STAT_INDEX = { name : ( t, i ) for t in STATS for i, ( _, name, _ ) in enumerate(STATS[t]) }
+
+def run_stats(timeline):
+    processors = make_processors(timeline)
+    return { ( t, i ) : func() for t in STATS for i, ( _, func, _ ) in enumerate(processors[t].funcs) }
+
+# Test the table
+def test_build():
+    frames = HobbySet.from_dict(TEST_DATA)
+    rollup = Rollup.build(frames["test_activity"])
+
+    assert rollup.hobbies == [ "test_activity" ]
+    assert np.all(np.diff(rollup.month) > 0)
+    assert rollup.count.sum() == 8
+    assert rollup.mileage_sum.sum() == pytest.approx(69.29)
+    assert rollup.mileage_max.max() == pytest.approx(26.2)
+    assert np.all(rollup.days <= rollup.count)
+
+@pytest.mark.parametrize("approximate", [ False, True ])
+def test_stats_match_index(approximate):
+    expected = run_stats(Timeline(TEST_DATA))
+    results = run_stats(Timeline(TEST_DATA, rollup=make_rollup(TEST_DATA), approximate=approximate))
+
+    # Sketched stats are exact unless approximate, then only within their
+    # error bounds, see Sketch
+    sketched = { STAT_INDEX["mileage_percentiles"] : 0.011, STAT_INDEX["total_active_days"] : 0.03 }
+    for key, ret in expected.items():
+        assert list(results[key].keys()) == list(ret.keys()), key
+        if key in sketched and not approximate:
+            assert results[key] == ret, key
+        for k, v in ret.items():
+            if key in sketched:
+                assert results[key][k] == pytest.approx(v, rel=sketched[key]), ( key, k )
+            else:
+                assert results[key][k] == pytest.approx(v, abs=0.011), ( key, k )
+
+# Test filtering and sharing
+def test_filter_keeps_rollup_for_hobbies():
+    tl = Timeline(TEST_DATA, rollup=make_rollup(TEST_DATA))
+
+    subset = tl.filter(hobbies=[ "test_activity_4", "test_activity_2" ])
+    assert subset.rollup.hobbies == [ "test_activity_2", "test_activity_4" ]
+    assert subset.rollup.hobby_trips("test_activity_4") == 5
+    assert tl.filter(start=DATE + SECONDS_PER_DAY * 100).rollup is None
+
+def test_approximate_carries_over():
+    rollup = make_rollup(TEST_DATA)
+    tl = Timeline(TEST_DATA, rollup=rollup, approximate=True)
+
+    assert Timeline(TEST_DATA, rollup=rollup).sketches() is None
+    assert Timeline.from_columns(*tl.columns()).sketches() is not None
+    assert tl.filter(hobbies=[ "test_activity_2" ]).sketches().hobbies == [ "test_activity_2" ]
+
+def test_shared_rollup():
+    rollup = make_rollup(TEST_DATA)
+    serial = StatExecutor(make_processors(Timeline(TEST_DATA, rollup=rollup)), workers=1).run([ ( "trip", 3 ), ( "mileage", 2 ) ])
+    parallel = StatExecutor(make_processors(Timeline(TEST_DATA, rollup=rollup)), workers=2).run([ ( "trip", 3 ), ( "mileage", 2 ) ])
+
+    assert serial == parallel
+
+# Test storing rollups in the log cache
+def read_rollups(tmp_path):
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    lr = LogReader.LogReader(str(tmp_path), cache=cache, incremental=True)
+    return lr.read_rollups(lr.read_frames())
+
+def test_stored_rollup(tmp_path):
+    path = tmp_path / "trail_mtb.csv"
+    path.write_text(TEST_LOG)
+    built = read_rollups(tmp_path)
+
+    cache = LogCache.LogCache.for_logdir(str(tmp_path))
+    assert cache.load_rollup(str(path), ROLLUP_FORMAT, local_zone()) is not None
+    assert cache.load_rollup(str(path), ROLLUP_FORMAT, "elsewhere") is None
+    loaded = read_rollups(tmp_path)
+    assert loaded.hobbies == [ "Trail Mtb" ]
+    assert loaded.count_by_month() == built.count_by_month() == { "2019-06" : 2 }
+
+def test_stored_rollup_appended(tmp_path):
+    path = tmp_path / "trail_mtb.csv"
+    path.write_text(TEST_LOG)
+    read_rollups(tmp_path)
+    path.write_text(TEST_LOG + APPENDED_ROW)
+
+    rollup = read_rollups(tmp_path)
+    assert rollup.count_by_year() == { 2019 : 2, 2020 : 1 }
+    assert rollup.hobby_mileage("Trail Mtb", "max") == pytest.approx(10.0)
+    assert rollup.hobby_mileage("Trail Mtb", "min") == pytest.approx(5.12)
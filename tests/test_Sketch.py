@@ -0,0 +1,83 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import pytest
+
+from Sketch import QuantileSketch, DistinctSketch, QUANTILES, ACCURACY, exact_quantile
+import MileageAccumulator
+import MileageStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+
+# Mileage from short trips to a long tail, with a few zeros
+MILEAGE = np.array([ 0.0, 0.0, 0.5, 1.2, 2.0, 2.0, 3.1, 4.75, 5.12, 6.22, 8.0, 10.0, 13.1, 26.2, 50.0, 100.0 ], dtype="float32")
+
+# Test quantile sketches
+def test_quantiles_within_bound():
+    sketch = QuantileSketch()
+    sketch.update(MILEAGE)
+
+    assert sketch.count == MILEAGE.size
+    for q in [ 0.0, 0.001, 0.25 ] + [ q for q, _ in QUANTILES ] + [ 1.0 ]:
+        assert sketch.quantile(q) == pytest.approx(exact_quantile(MILEAGE, q), rel=ACCURACY), q
+
+def test_quantile_merge():
+    single = QuantileSketch()
+    single.update(MILEAGE)
+    merged = QuantileSketch()
+    for chunk in np.array_split(MILEAGE, 7)[::-1]:
+        part = QuantileSketch()
+        part.update(chunk)
+        merged.merge(part)
+
+    assert merged == single
+    with pytest.raises(ValueError):
+        merged.merge(QuantileSketch(0.05))
+
+def test_quantile_round_trip():
+    sketch = QuantileSketch()
+    sketch.update(MILEAGE)
+
+    assert QuantileSketch.from_arrays(sketch.to_arrays()) == sketch
+
+def test_empty_quantile():
+    assert np.isnan(QuantileSketch().quantile(0.5))
+
+# Test distinct sketches
+@pytest.mark.parametrize("count", [ 10, 3000, 200000 ])
+def test_distinct_within_bound(count):
+    values = np.random.default_rng(count).choice(10 ** 9, size=count, replace=False)
+    sketch = DistinctSketch()
+    sketch.update(np.concatenate(( values, values[:count // 2] )))
+
+    # Four standard errors
+    assert sketch.estimate() == pytest.approx(count, rel=4 * 1.04 / np.sqrt(sketch.registers.size))
+
+def test_distinct_merge():
+    days = np.arange(1000, dtype="int64")
+    single = DistinctSketch()
+    single.update(days)
+    a = DistinctSketch()
+    a.update(days[:600])
+    b = DistinctSketch()
+    b.update(days[400:])
+
+    assert a.merge(b) == single
+    assert DistinctSketch.from_arrays(single.to_arrays()) == single
+    assert DistinctSketch().estimate() == 0
+
+# Test streaming percentiles
+def test_streaming_percentiles():
+    accs = []
+    for chunk in np.array_split(MILEAGE, 3):
+        acc = MileageAccumulator.MileageAccumulator()
+        acc.update({ "dates" : np.full(chunk.size, DATE, dtype="uint32"), "mileage" : chunk })
+        accs.append(acc)
+    ms = MileageStats.MileageStats(accumulators={ "test_activity" : accs[0].merge(accs[1]).merge(accs[2]) })
+
+    ret = ms.mileage_percentiles()
+    assert list(ret) == [ "test_activity (median)", "test_activity (p90)", "test_activity (p99)" ]
+    assert ret["test_activity (p90)"] == pytest.approx(exact_quantile(MILEAGE, 0.9), rel=ACCURACY)
@@ -0,0 +1,95 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+
+from Timeline import Timeline
+from StatExecutor import StatExecutor, make_processors, publish, attach
+from StatRegistry import STATS
+
+# Set up a data set with several hobbies of each type
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+
+def days(*offsets):
+    return [ DATE + (SECONDS_PER_DAY * o) for o in offsets ]
+
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : days(0, 1, 1, 30, 200, 365, 400),
+                    "mileage" : np.array([ 5.12, 10.0, 6.22, 3.5, 12.0, 26.2, 4.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_2":
+                {
+                    "dates" : days(1, 2, 3, 45, 366),
+                    "type" : "date"
+                },
+                "test_activity_3":
+                {
+                    "dates" : days(0, 181, 365),
+                    "weights" : [ 4, 6, 2 ],
+                    "type" : "tripcount"
+                },
+                "test_activity_4":
+                {
+                    "dates" : days(2, 30, 31, 500),
+                    "mileage" : np.array([ 1.5, 2.0, 0.75, 3.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+                "test_activity_5":
+                {
+                    "dates" : days(30, 90, 91, 92),
+                    "type" : "date"
+                },
+                "test_activity_6":
+                {
+                    "dates" : days(7, 14, 21, 370),
+                    "mileage" : np.array([ 13.1, 6.2, 3.1, 8.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+            }
+
+def every_stat():
+    return [ ( t, i ) for t in STATS for i in range(len(STATS[t])) ]
+
+# Test concurrent runs
+def test_matches_serial():
+    serial = StatExecutor(make_processors(Timeline(TEST_DATA)), workers=1).run(every_stat())
+    parallel = StatExecutor(make_processors(Timeline(TEST_DATA)), workers=3).run(every_stat())
+
+    assert len(parallel) == len(serial)
+    for s, p in zip(serial, parallel):
+        assert list(p.items()) == list(s.items())
+
+def test_per_hobby_split():
+    executor = StatExecutor(make_processors(Timeline(TEST_DATA)), workers=3)
+    tasks, parts = executor.plan([ ( "trip", 0 ), ( "mileage", 2 ) ])
+
+    assert parts == [ None, 3 ]
+    assert [ t[2] for t in tasks[1:] ] == [ ( "test_activity", "test_activity_2" ), ( "test_activity_3", "test_activity_4" ), ( "test_activity_5", "test_activity_6" ) ]
+
+# Test shared arrays
+def test_publish_attach():
+    columns = { "a" : np.arange(5, dtype="int64"), "b" : np.array([ 1.5, 2.5 ], dtype="float32") }
+    shm, layout = publish(columns)
+    try:
+        views = attach(shm, layout)
+        assert np.array_equal(views["a"], columns["a"])
+        assert np.array_equal(views["b"], columns["b"])
+        assert not views["a"].flags.writeable
+        del views
+    finally:
+        shm.close()
+        shm.unlink()
+
+def test_timeline_from_columns():
+    timeline = Timeline(TEST_DATA)
+    info, columns = timeline.columns()
+    copy = Timeline.from_columns(info, columns)
+
+    assert copy.hobbies == timeline.hobbies
+    assert copy.total_trips() == timeline.total_trips()
+    assert copy.calendar().count_by_year() == timeline.calendar().count_by_year()
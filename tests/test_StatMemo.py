@@ -0,0 +1,60 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import StatMemo
+import TripStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ],
+                    "type" : "date"
+                },
+            }
+MORE_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE, DATE ],
+                    "type" : "date"
+                },
+            }
+
+# Test the memo itself
+def test_hits_and_misses():
+    memo = StatMemo.StatMemo()
+    memo.get("a", lambda: 1)
+    memo.get("a", lambda: 2)
+
+    assert memo.get("a", lambda: 3) == 1
+    assert memo.info() == { "hits" : 2, "misses" : 1, "entries" : 1 }
+
+def test_invalidate_cascades():
+    memo = StatMemo.StatMemo()
+    memo.get("outer", lambda: memo.get("inner", lambda: 1) + 1)
+    memo.get("other", lambda: 5)
+
+    assert memo.dependencies() == { "outer" : { "inner" } }
+    memo.invalidate("inner")
+    assert memo.info()["entries"] == 1
+
+# Test memoized stats
+def test_shared_intermediates():
+    ts = TripStats.TripStats(TEST_DATA)
+    ts.total_trips()
+    ts.total_trips_per_year()
+    misses = ts.memo.misses
+
+    assert ts.pct_year_total() == { 2022 : 100.0 }
+    assert ts.memo.misses == misses + 1
+    assert ts.memo.hits == 2
+
+def test_reload_clears():
+    ts = TripStats.TripStats(TEST_DATA)
+    assert ts.total_trips()["total trips"] == 3
+
+    ts.load_data(MORE_DATA)
+    assert ts.total_trips()["total trips"] == 2
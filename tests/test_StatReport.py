@@ -0,0 +1,58 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import json
+
+import pytest
+
+import numpy as np
+from Timeline import Timeline
+import DateStats
+import MileageStats
+import StatReport
+import TripStats
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_activity":
+                {
+                    "dates" : [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ],
+                    "mileage" : np.array([ 2.0, 2.0, 5.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+            }
+
+def make_report():
+    timeline = Timeline(TEST_DATA)
+    return StatReport.StatReport({
+                                    "trip" : TripStats.TripStats(TEST_DATA, timeline=timeline),
+                                    "mileage" : MileageStats.MileageStats(TEST_DATA, timeline=timeline),
+                                    "date" : DateStats.DateStats(TEST_DATA, timeline=timeline),
+                                 })
+
+# Test report building
+def test_all_stats():
+    report = make_report()
+    doc = json.loads(report.dumps())
+
+    assert len(doc["trip"]) == len(report.processors["trip"].funcs)
+    assert len(doc["mileage"]) == len(report.processors["mileage"].funcs)
+    assert doc["trip"][0]["result"] == { "total trips" : 3 }
+    assert doc["mileage"][0]["result"] == { "total mileage" : 9.0 }
+
+def test_selection():
+    report = make_report()
+    doc = report.build("trip:3,date")
+
+    assert [ s["index"] for s in doc["trip"] ] == [ 3 ]
+    assert doc["mileage"] == []
+    assert len(doc["date"]) == len(report.processors["date"].funcs)
+
+def test_bad_selection():
+    report = make_report()
+
+    with pytest.raises(ValueError):
+        report.build("trip:99")
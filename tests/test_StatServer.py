@@ -0,0 +1,96 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import http.client
+import json
+import os
+import threading
+
+import StatServer
+
+MILEAGE_LOG = "Date,Distance (mi)\n2022-01-01,2.0\n2022-01-02,3.5\n"
+DATE_LOG = "Date,Notes\n2022-01-01,a\n2022-01-05,b\n"
+
+def write_log(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+def make_server(tmp_path, rollups=True):
+    write_log(os.path.join(tmp_path, "trail_mtb.csv"), MILEAGE_LOG)
+    write_log(os.path.join(tmp_path, "board_games.csv"), DATE_LOG)
+    return StatServer.StatServer(str(tmp_path), poll_interval=0.01, rollups=rollups)
+
+def get(httpd, path):
+    conn = http.client.HTTPConnection(*httpd.server_address[:2])
+    conn.request("GET", path)
+    resp = conn.getresponse()
+    body = json.loads(resp.read())
+    conn.close()
+    return resp.status, body
+
+# Test serving
+def test_serve_stats(tmp_path):
+    server = make_server(tmp_path)
+    httpd = server.make_server("127.0.0.1", 0)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+
+    try:
+        status, body = get(httpd, "/stat/trip/0")
+        assert status == 200
+        assert body["result"] == { "total trips" : 4 }
+
+        status, body = get(httpd, "/report?select=mileage:0")
+        assert body["mileage"][0]["result"] == { "total mileage" : 5.5 }
+
+        assert get(httpd, "/stat/trip/99")[0] == 404
+        assert get(httpd, "/report?select=bogus")[0] == 400
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+# Test reloading
+def test_reload_changed_only(tmp_path):
+    server = make_server(tmp_path)
+    games = server.data["Board Games"]
+
+    assert server.check_changes() == []
+
+    with open(os.path.join(tmp_path, "trail_mtb.csv"), "a") as f:
+        f.write("2022-01-03,4.5\n")
+    changed = server.check_changes()
+
+    assert changed == [ os.path.join(str(tmp_path), "trail_mtb.csv") ]
+    assert server.data["Board Games"] is games
+    assert server.stat("mileage", 0)["result"] == { "total mileage" : 10.0 }
+
+def test_reload_keeps_rollups(tmp_path):
+    server = make_server(tmp_path)
+    games = server.rollup.day_sketches[server.rollup.ids["Board Games"]]
+
+    with open(os.path.join(tmp_path, "trail_mtb.csv"), "a") as f:
+        f.write("2022-01-03,4.5\n")
+    server.check_changes()
+
+    assert server.rollup.day_sketches[server.rollup.ids["Board Games"]] is games
+    assert server.rollup.hobby_trips("Trail Mtb") == 3
+    assert server.processors["trip"].timeline.rollup is server.rollup
+
+def test_no_rollups(tmp_path):
+    server = make_server(tmp_path, rollups=False)
+    assert server.processors["trip"].timeline.rollup is None
+
+    with open(os.path.join(tmp_path, "trail_mtb.csv"), "a") as f:
+        f.write("2022-01-03,4.5\n")
+    server.check_changes()
+
+    assert server.processors["trip"].timeline.rollup is None
+    assert server.stat("mileage", 0)["result"] == { "total mileage" : 10.0 }
+
+def test_reload_removed(tmp_path):
+    server = make_server(tmp_path)
+    os.remove(os.path.join(tmp_path, "board_games.csv"))
+    server.check_changes()
+
+    assert list(server.data) == [ "Trail Mtb" ]
+    assert server.stat("trip", 0)["result"] == { "total trips" : 2 }
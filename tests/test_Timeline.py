@@ -0,0 +1,93 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import numpy as np
+import pytest
+import Timeline
+
+# Set up a basic data set
+DATE = 1641013200 # Timestamp for Jan 1, 2022
+SECONDS_PER_DAY = 86400
+TEST_DATA = {
+                "test_trips":
+                {
+                    "dates" : [ DATE, DATE, DATE ],
+                    "type" : "tripcount"
+                },
+
+                "test_activity":
+                {
+                    "dates" : np.array([ DATE + (SECONDS_PER_DAY * 2), DATE, DATE + SECONDS_PER_DAY ], dtype="uint32"),
+                    "mileage" : np.array([ 5.0, 2.0, 3.0 ], dtype="float32"),
+                    "type" : "mileage"
+                },
+            }
+
+# Test the index layout
+def test_hobby_slices_sorted():
+    tl = Timeline.Timeline(TEST_DATA)
+
+    assert tl.hobbies == [ "test_trips", "test_activity" ]
+    assert list(tl.hobby_dates("test_activity")) == [ DATE, DATE + SECONDS_PER_DAY, DATE + (SECONDS_PER_DAY * 2) ]
+    assert list(tl.hobby_mileage("test_activity")) == [ 2.0, 3.0, 5.0 ]
+    assert list(tl.mileage_dates()) == list(tl.hobby_dates("test_activity"))
+
+def test_global_sort():
+    tl = Timeline.Timeline(TEST_DATA)
+
+    assert np.all(np.diff(tl.sorted_dates) >= 0)
+    assert tl.sorted_dates.size == 6
+    assert sorted(tl.sorted_ids[:4]) == [ 0, 0, 0, 1 ]
+    assert list(tl.sorted_dates_of([ "mileage" ])) == list(tl.hobby_dates("test_activity"))
+
+# Test filtering
+def filter_data(data, start, end, hobbies=None):
+    filtered = {}
+    for hobby, info in data.items():
+        if hobbies is not None and hobby not in hobbies:
+            continue
+        dates = np.asarray(info["dates"])
+        keep = (dates >= start) & (dates < end)
+        filtered[hobby] = { k : (np.asarray(v)[keep] if k in ( "dates", "mileage" ) else v) for k, v in info.items() }
+    return filtered
+
+def test_filter_matches_filtered_data():
+    tl = Timeline.Timeline(TEST_DATA)
+    start = DATE + SECONDS_PER_DAY
+    end = DATE + (SECONDS_PER_DAY * 3)
+    expected = Timeline.Timeline(filter_data(TEST_DATA, start, end))
+    filtered = tl.filter(start, end)
+
+    assert filtered.hobbies == expected.hobbies
+    for hobby in expected.hobbies:
+        assert list(filtered.hobby_dates(hobby)) == list(expected.hobby_dates(hobby))
+    assert list(filtered.hobby_mileage("test_activity")) == [ 3.0, 5.0 ]
+    assert list(filtered.sorted_dates) == list(expected.sorted_dates)
+    assert list(filtered.sorted_ids) == list(expected.sorted_ids)
+
+def test_filter_hobbies():
+    tl = Timeline.Timeline(TEST_DATA)
+    filtered = tl.filter(hobbies=[ "test_activity" ])
+
+    assert filtered.hobbies == [ "test_activity" ]
+    assert list(filtered.hobby_mileage("test_activity")) == [ 2.0, 3.0, 5.0 ]
+    assert list(filtered.sorted_ids) == [ 0, 0, 0 ]
+    assert list(filtered.mileage_dates()) == list(tl.hobby_dates("test_activity"))
+
+def test_filter_empty_window():
+    tl = Timeline.Timeline(TEST_DATA)
+    filtered = tl.filter(DATE + (SECONDS_PER_DAY * 10), DATE + (SECONDS_PER_DAY * 20))
+
+    assert filtered.dates.size == 0
+    assert filtered.sorted_dates.size == 0
+    assert filtered.hobby_dates("test_activity").size == 0
+
+def test_query():
+    tl = Timeline.Timeline(TEST_DATA)
+
+    assert tl.hobbies_matching([ "TEST_A*" ]) == [ "test_activity" ]
+    assert tl.query(hobbies=[ "*trips" ]).hobbies == [ "test_trips" ]
+    assert tl.query(last="2022-01-01").sorted_dates.size == 4
+    with pytest.raises(ValueError):
+        tl.query(hobbies=[ "climbing" ])
@@ -4,8 +4,11 @@
 #
 import time
 
-from npimporter import np
+import numpy as np
 import TripStats
+from HobbyFrame import HobbySet
+from Rollup import Rollup
+from Timeline import Timeline
 
 # Set up a basic data set
 DATE = 1641013200 # Timestamp for Jan 1, 2022
@@ -38,3 +41,28 @@ def test_total_years():
 
     assert ret["total years"] == 1
     
+
+# Trip count seasons stored as weighted dates count the same as repeated dates
+def test_weighted_trips():
+    weighted = dict(TEST_DATA)
+    weighted["test_activity_2"] = { "dates" : np.array([ DATE ], dtype="uint32"), "weights" : np.array([ 3 ], dtype="uint32"), "type" : "tripcount" }
+    expanded = TripStats.TripStats(TEST_DATA)
+    ms = TripStats.TripStats(weighted)
+
+    for i in range(len(ms.funcs)):
+        assert ms.funcs[i][1]() == expanded.funcs[i][1]()
+
+# Trip count seasons only have a year, so they're left out of months and weeks
+def test_months_weeks_dated_only():
+    ms = TripStats.TripStats(TEST_DATA)
+
+    assert sum(ms.total_trips_per_year().values()) == 6
+    assert sum(ms.total_trips_per_month().values()) == 3
+    assert sum(ms.total_trips_per_week().values()) == 3
+
+def test_months_dated_only_rollup():
+    frames = HobbySet.from_dict(TEST_DATA)
+    rollup = Rollup.merge([ Rollup.build(frames[h]) for h in frames ], frames.names())
+    ms = TripStats.TripStats(frames, timeline=Timeline(frames, rollup=rollup))
+
+    assert ms.total_trips_per_month() == TripStats.TripStats(TEST_DATA).total_trips_per_month()
@@ -0,0 +1,40 @@
+# This file contains unit tests for some HobbyStats functionality
+#
+# Author: Josh McIntyre
+#
+import json
+import os
+import subprocess
+import sys
+
+# Set up a basic data set, with a bad date and a bad distance
+MILEAGE_LOG = "Date,Location,Distance (mi)\n6/1/2019,Local Trails,5.12\nnot a date,State Park,10\n6/3/2019,State Park,n/a\n"
+HOBBYSTATS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "ui", "hobbystats.py")
+
+# Run the command line in a directory holding the logs
+def run(tmp_path, *args):
+    return subprocess.run([ sys.executable, HOBBYSTATS ] + list(args), cwd=str(tmp_path), capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+
+# Test that a batch report is one JSON document, with diagnostics kept on stderr
+def test_all_is_json_with_bad_rows(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "trail_mtb.csv").write_text(MILEAGE_LOG)
+
+    out = run(tmp_path, "--all")
+    report = json.loads(out.stdout)
+
+    assert report["mileage"][0]["result"] == { "total mileage" : 5.12 }
+    assert report["trip"][0]["result"] == { "total trips" : 2 }
+    assert "Bad date" in out.stderr
+    assert "Bad data" in out.stderr
+
+# Test that percentiles are exact unless asked to be estimated
+def test_exact_by_default(tmp_path):
+    (tmp_path / "logs").mkdir()
+    (tmp_path / "logs" / "trail_mtb.csv").write_text("Date,Location,Distance (mi)\n" + "".join( "6/{}/2019,Local Trails,{}.12\n".format(d, d) for d in range(1, 6) ))
+
+    exact = json.loads(run(tmp_path, "--select", "mileage:8").stdout)
+    estimated = json.loads(run(tmp_path, "--select", "mileage:8", "--approximate").stdout)
+
+    assert exact["mileage"][0]["result"]["Trail Mtb (median)"] == 3.12
+    assert estimated["mileage"][0]["result"]["Trail Mtb (median)"] != 3.12
@@ -0,0 +1,46 @@
+# This file contains a startup benchmark for the HobbyStats command line
+# Listing stats shouldn't load any data or heavy modules, so it has a budget
+#
+# Author: Josh McIntyre
+#
+import json
+import os
+import subprocess
+import sys
+
+# Wall clock budget for `hobbystats.py --stats`, including interpreter startup
+STARTUP_BUDGET = 0.5
+
+# Modules that must not be imported just to list stats
+HEAVY_MODULES = [ "numpy", "matplotlib", "dateutil", "LogReader", "TripStats", "MileageStats", "DateStats" ]
+
+# Run `hobbystats.py --stats` in a fresh interpreter and report what it loaded
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+sys.argv = [ "hobbystats.py", "--stats" ]
+import hobbystats
+try:
+    hobbystats.main()
+except SystemExit:
+    pass
+print(json.dumps({ "elapsed" : time.perf_counter() - start, "modules" : sorted(sys.modules) }))
+"""
+
+def run_probe():
+    start = os.times().elapsed
+    out = subprocess.run([ sys.executable, "-c", PROBE ], capture_output=True, text=True, check=True, env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+    wall = os.times().elapsed - start
+    return wall, json.loads(out.stdout.splitlines()[-1])
+
+# Test startup
+def test_stats_listing_is_light():
+    wall, probe = run_probe()
+
+    loaded = [ m for m in HEAVY_MODULES if m in probe["modules"] ]
+    assert loaded == []
+
+def test_stats_listing_budget():
+    wall, probe = run_probe()
+
+    assert wall < STARTUP_BUDGET, "--stats took {:.3f}s, budget is {}s".format(wall, STARTUP_BUDGET)